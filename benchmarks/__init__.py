@@ -0,0 +1,3 @@
+"""
+This file marks benchmarks as a Python package.
+"""
@@ -0,0 +1,130 @@
+"""
+Microbenchmark for the streaming citation rewriter.
+
+Compares utils.chat.citations.CitationRewriter against the previous per-delta
+regex approach and against naively rescanning the accumulated message on every
+delta. Streams are either synthesized (answers with citation markers split into
+token-sized deltas) or loaded from JSON files containing a list of text deltas.
+
+Usage:
+    uv run python -m benchmarks.bench_citations [--messages 200] [--repeat 5] [deltas.json ...]
+"""
+import re
+import json
+import time
+import random
+import argparse
+from typing import Callable, List, Optional
+from utils.chat.citations import CitationRewriter
+
+CITATION_PATTERN = re.compile(r'【.*?†(.*?)】')
+
+# Synthetic citation table standing in for the database-backed citation index
+DOCUMENT_IDS = [f"dl_{i:03d}" for i in range(1, 235)]
+CITATIONS = {
+    document_id: f' ([WBG, "CCDR {document_id}", 2022](https://openknowledge.worldbank.org/{document_id}))'
+    for document_id in DOCUMENT_IDS
+}
+
+
+def resolve_citation(document_id: str) -> Optional[str]:
+    return CITATIONS.get(document_id)
+
+
+WORDS = (
+    "climate adaptation resilience investment transport energy water agriculture "
+    "financing emissions households poverty coastal urban infrastructure policy"
+).split()
+
+
+def synthesize_stream(rng: random.Random, words: int = 400, citations: int = 8) -> List[str]:
+    """Builds an answer with citation markers and splits it into deltas of 1-8 characters."""
+    document_ids = DOCUMENT_IDS
+    tokens = [rng.choice(WORDS) for _ in range(words)]
+    for _ in range(citations):
+        marker = f"【{rng.randint(1, 9)}:{rng.randint(0, 20)}†{rng.choice(document_ids)}.pdf】"
+        tokens.insert(rng.randrange(len(tokens)), marker)
+    text = " ".join(tokens)
+
+    deltas = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 8)
+        deltas.append(text[position:position + size])
+        position += size
+    return deltas
+
+
+def run_rewriter(deltas: List[str]) -> str:
+    rewriter = CitationRewriter(resolve_citation)
+    return "".join(rewriter.feed(delta) for delta in deltas) + rewriter.flush()
+
+
+def run_per_delta_regex(deltas: List[str]) -> str:
+    """The previous approach: only markers contained in a single delta are rewritten."""
+    output = []
+    for delta in deltas:
+        match = CITATION_PATTERN.search(delta)
+        if match:
+            replacement = resolve_citation(match.group(1).split(".")[0])
+            output.append(replacement if replacement is not None else delta)
+        else:
+            output.append(delta)
+    return "".join(output)
+
+
+def run_rescan(deltas: List[str]) -> str:
+    """Correct but quadratic: rewrite the whole accumulated message on every delta."""
+    accumulated = ""
+    rewritten = ""
+    for delta in deltas:
+        accumulated += delta
+        rewritten = CITATION_PATTERN.sub(
+            lambda m: resolve_citation(m.group(1).split(".")[0]) or m.group(0), accumulated
+        )
+    return rewritten
+
+
+def benchmark(name: str, function: Callable[[List[str]], str], streams: List[List[str]], repeat: int) -> None:
+    total_chars = sum(len(delta) for deltas in streams for delta in deltas)
+    total_deltas = sum(len(deltas) for deltas in streams)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [function(deltas) for deltas in streams]
+        best = min(best, time.perf_counter() - start)
+    resolved = sum(output.count("](") for output in outputs)
+    print(
+        f"{name:<16} {best * 1000:9.2f} ms  {best / total_deltas * 1e6:7.3f} us/delta  "
+        f"{total_chars / best / 1e6:7.2f} Mchar/s  {resolved:6d} citations resolved"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="JSON files each containing a list of text deltas")
+    parser.add_argument("--messages", type=int, default=200, help="Number of synthetic messages")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best time is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.files:
+        streams = []
+        for path in args.files:
+            with open(path) as f:
+                streams.append(json.load(f))
+    else:
+        rng = random.Random(args.seed)
+        streams = [synthesize_stream(rng) for _ in range(args.messages)]
+
+    print(
+        f"{len(streams)} streams, {sum(map(len, streams))} deltas, "
+        f"{sum(len(d) for s in streams for d in s)} characters"
+    )
+    benchmark("rewriter", run_rewriter, streams, args.repeat)
+    benchmark("per-delta regex", run_per_delta_regex, streams, args.repeat)
+    benchmark("rescan", run_rescan, streams, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
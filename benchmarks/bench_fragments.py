@@ -0,0 +1,90 @@
+"""
+Microbenchmark for rendering the chat fragments sent with every message
+exchange (user-message.html, assistant-run.html) and assistant step
+(assistant-step.html, once per messageCreated and toolCallCreated event).
+
+Compares three ways of rendering each fragment:
+    get_template   templates.get_template(name).render(...), the previous per-event path
+    template       a Template looked up once, rendered through Jinja per call
+    fragment       utils.chat.fragments.FragmentRenderer, precompiled into literal text and slots
+
+Usage:
+    uv run python -m benchmarks.bench_fragments [--renders 20000] [--repeat 5]
+"""
+import time
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+from fastapi.templating import Jinja2Templates
+from starlette.requests import Request
+from starlette.routing import Route, Router
+from utils.chat.fragments import FragmentRenderer
+
+templates = Jinja2Templates(directory="templates")
+
+
+def make_request() -> Request:
+    """A request to an app with the stream_response route, so that url_for works in assistant-run.html."""
+    router = Router(routes=[Route("/chat/{thread_id}/receive", lambda request: None, name="stream_response")])
+    return Request({
+        "type": "http", "method": "POST", "path": "/chat/thread_1/send", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost:8000")], "scheme": "http", "server": ("localhost", 8000), "router": router,
+    })
+
+
+def fragment_cases(request: Request) -> List[Tuple[str, List[str], List[Dict[str, Any]]]]:
+    """(template name, slots, a context per render) for each fragment."""
+    return [
+        ("chat/assistant-step.html", ["step_id"], [
+            {"step_type": "assistantMessage" if index % 2 else "toolCall", "step_id": f"msg_{index:024x}"}
+            for index in range(64)
+        ]),
+        ("chat/user-message.html", ["user_input"], [
+            {"user_input": f"What are the adaptation priorities for country {index} & its <coastal> cities?"}
+            for index in range(64)
+        ]),
+        ("chat/assistant-run.html", ["thread_id"], [
+            {"request": request, "thread_id": f"thread_{index:024x}"}
+            for index in range(64)
+        ]),
+    ]
+
+
+def benchmark(name: str, render: Callable[..., str], contexts: List[Dict[str, Any]], renders: int, repeat: int) -> float:
+    best = float("inf")
+    rounds = max(renders // len(contexts), 1)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for context in contexts:
+                render(**context)
+        best = min(best, time.perf_counter() - start)
+    per_render = best / (rounds * len(contexts))
+    print(f"  {name:<14} {per_render * 1e6:8.2f} us/render")
+    return per_render
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=20000, help="Renders per fragment and method")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best time is reported)")
+    args = parser.parse_args()
+
+    for template_name, slots, contexts in fragment_cases(make_request()):
+        template = templates.get_template(template_name)
+        fragment = FragmentRenderer(templates.env, template_name, slots=slots)
+        # The fast path must produce exactly what Jinja produces
+        for context in contexts:
+            assert fragment.render(**context) == template.render(**context), template_name
+
+        print(template_name)
+        baseline = benchmark(
+            "get_template", lambda **context: templates.get_template(template_name).render(**context),
+            contexts, args.renders, args.repeat
+        )
+        benchmark("template", template.render, contexts, args.renders, args.repeat)
+        compiled = benchmark("fragment", fragment.render, contexts, args.renders, args.repeat)
+        print(f"  {baseline / compiled:.1f}x faster than get_template")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Microbenchmark for SSE frame encoding, which runs once per frame for every
+open stream (once per token when delta coalescing is disabled).
+
+Compares utils.chat.sse.encode_sse against the previous approach, which built
+each frame by string concatenation over data.splitlines() and left encoding to
+the response, and against writing frames into a reused bytearray. Payloads are
+single-line textDelta frames, as sent for every token, and multi-line rendered
+HTML, as sent for messageCreated and toolOutput events.
+
+Usage:
+    uv run python -m benchmarks.bench_sse [--frames 100000] [--repeat 5]
+"""
+import time
+import random
+import argparse
+from typing import Callable, List, Tuple
+from utils.chat.sse import encode_sse, split_sse_lines, wrap_for_oob_swap
+
+WORDS = (
+    "climate adaptation resilience investment transport energy water agriculture "
+    "financing emissions households poverty coastal urban infrastructure policy"
+).split()
+
+STEP_HTML = (
+    '<!-- assistant-step.html -->\n<div\n  class="mb-2 text-start  alert alert-secondary w-75"\n'
+    '    \n  id="step-msg_abc123"></div>'
+)
+
+
+def legacy_sse_format(event: str, data: str) -> bytes:
+    """The previous sse_format, followed by the encoding Starlette did for str frames."""
+    output = f"event: {event}\n"
+    for line in data.splitlines():
+        output += f"data: {line}\n"
+    output += "\n"
+    return output.encode("utf-8")
+
+
+BUFFER = bytearray()
+
+
+def bytearray_sse_format(event: str, data: str) -> bytes:
+    """Writes the frame into one reused bytearray, then copies it out."""
+    buffer = BUFFER
+    buffer.clear()
+    buffer += b"event: "
+    buffer += event.encode()
+    buffer += b"\n"
+    for line in split_sse_lines(data):
+        buffer += b"data: "
+        buffer += line.encode()
+        buffer += b"\n"
+    buffer += b"\n"
+    return bytes(buffer)
+
+
+def synthesize_frames(rng: random.Random, count: int) -> List[Tuple[str, str]]:
+    """Token-sized textDelta payloads, with one multi-line messageCreated frame per 50 deltas."""
+    frames = []
+    for index in range(count):
+        if index % 50 == 0:
+            frames.append(("messageCreated", STEP_HTML))
+        else:
+            token = rng.choice(WORDS)[:rng.randint(1, 8)] + " "
+            frames.append(("textDelta", wrap_for_oob_swap("msg_abc123", token)))
+    return frames
+
+
+def benchmark(name: str, function: Callable[[str, str], bytes], frames: List[Tuple[str, str]], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = [function(event, data) for event, data in frames]
+        best = min(best, time.perf_counter() - start)
+    emitted = sum(len(frame) for frame in output)
+    print(f"{name:<16} {best * 1000:9.2f} ms  {best / len(frames) * 1e9:7.0f} ns/frame  {emitted:10d} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100000, help="Number of synthetic frames")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best time is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = synthesize_frames(random.Random(args.seed), args.frames)
+    single_line = [frame for frame in frames if frame[0] == "textDelta"]
+    multi_line = [frame for frame in frames if frame[0] != "textDelta"]
+
+    for label, subset in (("all frames", frames), ("single-line", single_line), ("multi-line", multi_line)):
+        print(f"{label}: {len(subset)} frames")
+        benchmark("encode_sse", encode_sse, subset, args.repeat)
+        benchmark("legacy", legacy_sse_format, subset, args.repeat)
+        benchmark("bytearray", bytearray_sse_format, subset, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
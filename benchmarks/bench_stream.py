@@ -0,0 +1,242 @@
+"""
+Offline benchmark for the assistant SSE stream.
+
+Replays recorded assistant runs (see ASSISTANT_STREAM_RECORD_DIR) through the
+chat router's stream_response, exactly as a live run would be streamed, with a
+ReplayClient standing in for the OpenAI API. Tool calls requested by a
+recording are executed by the tool registry and answered from the next
+recorded segment. Without recordings, synthetic runs with citation markers and
+a get_weather tool call are generated.
+
+Reports events/sec, SSE frames and bytes emitted, and the CPU time per event
+spent in encode_sse, template rendering and citation rewriting. With
+--format ndjson, runs are streamed as structured JSON events instead, as
+requested by programmatic clients.
+
+Usage:
+    uv run python -m benchmarks.bench_stream [--runs 50] [--repeat 3] [--format ndjson] [recording.jsonl.gz | directory ...]
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import functools
+from pathlib import Path
+from types import SimpleNamespace
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+import jinja2
+
+# The chat router refuses to import without these; a replay never calls the API
+os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+os.environ.setdefault("ASSISTANT_ID", "asst_replay")
+
+import routers.chat as chat  # noqa: E402
+import utils.chat.sse as sse  # noqa: E402
+import utils.chat.answers as answers  # noqa: E402
+import utils.chat.recording as recording_module  # noqa: E402
+from utils.chat.citations import CitationRewriter, citation_index  # noqa: E402
+from utils.chat.recording import Recording, ReplayClient, parse_event  # noqa: E402
+
+# Synthetic citation table standing in for the database-backed citation index
+DOCUMENT_IDS = [f"dl_{i:03d}" for i in range(1, 235)]
+
+WORDS = (
+    "climate adaptation resilience investment transport energy water agriculture "
+    "financing emissions households poverty coastal urban infrastructure policy"
+).split()
+
+
+# --- Synthetic runs ---
+
+
+def run_data(run_id: str, status: str, **fields: Any) -> Dict[str, Any]:
+    return {
+        "id": run_id, "object": "thread.run", "assistant_id": "asst_replay", "created_at": 0,
+        "instructions": "", "model": "gpt-4o", "parallel_tool_calls": True, "status": status,
+        "thread_id": "thread_replay", "tools": [], **fields
+    }
+
+
+def message_data(message_id: str) -> Dict[str, Any]:
+    return {
+        "id": message_id, "object": "thread.message", "created_at": 0, "thread_id": "thread_replay",
+        "role": "assistant", "content": [], "status": "in_progress"
+    }
+
+
+def synthesize_recording(rng: random.Random, words: int = 300, citations: int = 6) -> Recording:
+    """Builds a run that calls get_weather, then answers in token-sized deltas with citation markers."""
+    run_id = f"run_{rng.getrandbits(32):08x}"
+    tokens = [rng.choice(WORDS) for _ in range(words)]
+    for _ in range(citations):
+        marker = f"【{rng.randint(1, 9)}:{rng.randint(0, 20)}†{rng.choice(DOCUMENT_IDS)}.pdf】"
+        tokens.insert(rng.randrange(len(tokens)), marker)
+    text = " ".join(tokens)
+    deltas = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 8)
+        deltas.append(text[position:position + size])
+        position += size
+
+    required_action = {
+        "type": "submit_tool_outputs",
+        "submit_tool_outputs": {"tool_calls": [{
+            "id": "call_1", "type": "function",
+            "function": {"name": "get_weather", "arguments": '{"location": "Nairobi"}'}
+        }]}
+    }
+    first = [
+        {"event": "thread.run.created", "data": run_data(run_id, "queued")},
+        {"event": "thread.run.requires_action", "data": run_data(run_id, "requires_action", required_action=required_action)},
+    ]
+    second = [{"event": "thread.message.created", "data": message_data("msg_1")}]
+    second += [
+        {"event": "thread.message.delta", "data": {
+            "id": "msg_1", "object": "thread.message.delta",
+            "delta": {"content": [{"index": 0, "type": "text", "text": {"value": delta}}]}
+        }}
+        for delta in deltas
+    ]
+    second += [
+        {"event": "thread.message.completed", "data": {**message_data("msg_1"), "status": "completed"}},
+        {"event": "thread.run.completed", "data": run_data(
+            run_id, "completed", usage={"completion_tokens": len(deltas), "prompt_tokens": 1000, "total_tokens": 1000 + len(deltas)}
+        )},
+    ]
+    return Recording([[parse_event(record) for record in first], [parse_event(record) for record in second]])
+
+
+def load_recordings(paths: List[str]) -> List[Recording]:
+    files: List[Path] = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob("*.jsonl.gz")) if path.is_dir() else [path])
+    return [Recording.load(file) for file in files]
+
+
+# --- Instrumentation ---
+
+
+class StageTimer:
+    """Accumulates the thread CPU time and call count of instrumented functions, by stage."""
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def wrap(self, stage: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        self.seconds.setdefault(stage, 0.0)
+        self.calls.setdefault(stage, 0)
+
+        @functools.wraps(function)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.thread_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.thread_time() - start
+                self.calls[stage] += 1
+        return timed
+
+
+@contextmanager
+def instrumented(timer: StageTimer) -> Iterator[None]:
+    patches = [
+        (chat, "encode_sse", "encode_sse"),
+        (sse, "encode_sse", "encode_sse"),
+        (answers, "encode_event", "encode_event"),
+        (jinja2.Template, "render", "template rendering"),
+        (CitationRewriter, "feed", "citation rewriting"),
+        (CitationRewriter, "flush", "citation rewriting"),
+    ]
+    with ExitStack() as stack:
+        for target, attribute, stage in patches:
+            stack.enter_context(mock.patch.object(target, attribute, timer.wrap(stage, getattr(target, attribute))))
+        yield
+
+
+# --- Replay driver ---
+
+
+async def replay(recording: Recording, thread_id: str, stream_format: Optional[str]) -> List[bytes]:
+    """Streams a recording through stream_response and returns the frames it emits."""
+    response = await chat.stream_response(
+        thread_id,
+        user=SimpleNamespace(id=0, roles=[]),  # type: ignore[arg-type]
+        session=None,  # type: ignore[arg-type]
+        client=ReplayClient(recording),  # type: ignore[arg-type]
+        last_event_id=None,
+        accept_encoding=None,
+        accept=None,
+        stream_format=stream_format
+    )
+    return [frame async for frame in response.body_iterator]  # type: ignore[misc]
+
+
+async def replay_all(
+    recordings: List[Recording],
+    label: str,
+    stream_format: Optional[str]
+) -> Tuple[List[bytes], float, float]:
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    frames: List[bytes] = []
+    for index, recording in enumerate(recordings):
+        frames.extend(await replay(recording, f"{label}_{index}", stream_format))
+    return frames, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="Recordings, or directories of recordings, to replay")
+    parser.add_argument("--runs", type=int, default=50, help="Number of synthetic runs")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions (best time is reported)")
+    parser.add_argument("--no-coalesce", action="store_true", help="Disable textDelta/toolDelta coalescing")
+    parser.add_argument("--format", choices=["ndjson", "sse"], help="Stream structured JSON events instead of htmx markup")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Never record the replays themselves
+    recording_module.ASSISTANT_STREAM_RECORD_DIR = ""
+    if args.no_coalesce:
+        chat.SSE_COALESCE_MS = 0
+    citation_index.update({
+        document_id: (f"https://openknowledge.worldbank.org/{document_id}", f'WBG, "CCDR {document_id}", 2022')
+        for document_id in DOCUMENT_IDS
+    })
+
+    if args.paths:
+        recordings = load_recordings(args.paths)
+    else:
+        rng = random.Random(args.seed)
+        recordings = [synthesize_recording(rng) for _ in range(args.runs)]
+    total_events = sum(len(recording) for recording in recordings)
+    print(f"{len(recordings)} runs, {total_events} assistant events")
+
+    best: Tuple[List[bytes], float, float, StageTimer] | None = None
+    for attempt in range(args.repeat):
+        timer = StageTimer()
+        with instrumented(timer):
+            frames, wall, cpu = asyncio.run(replay_all(recordings, f"replay_{attempt}", args.format))
+        if best is None or wall < best[1]:
+            best = (frames, wall, cpu, timer)
+    assert best is not None
+    frames, wall, cpu, timer = best
+
+    emitted_bytes = sum(len(frame) for frame in frames)
+    print(
+        f"{total_events / wall:12.0f} events/s  {wall * 1000:9.2f} ms wall  {cpu * 1000:9.2f} ms CPU  "
+        f"{cpu / total_events * 1e6:7.2f} us CPU/event"
+    )
+    print(f"{len(frames):12d} frames     {emitted_bytes:9d} bytes emitted  {emitted_bytes / total_events:9.1f} bytes/event")
+    for stage, seconds in timer.seconds.items():
+        print(
+            f"{stage:<20} {timer.calls[stage]:8d} calls  {seconds * 1000:9.2f} ms  "
+            f"{seconds / total_events * 1e6:7.3f} us/event  {seconds / cpu * 100:5.1f}% of CPU"
+        )
+
+
+if __name__ == "__main__":
+    main()
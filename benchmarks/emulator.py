@@ -0,0 +1,370 @@
+"""
+Local stand-in for the parts of the OpenAI Assistants API used by the chat
+router: threads, messages, streaming runs, submit_tool_outputs and run
+cancellation. Runs stream a synthetic answer at a configurable token rate, may
+request a get_weather tool call, and can be made to fail, so the chat stack can
+be load tested without calling OpenAI.
+
+Start the emulator, then point the app at it:
+    uv run uvicorn benchmarks.emulator:app --port 8001
+    OPENAI_BASE_URL=http://localhost:8001/v1 uv run python main.py
+
+The configuration is read from EMULATOR_* environment variables at startup and
+can be changed at runtime with PUT /emulator/config, e.g.
+    curl -X PUT localhost:8001/emulator/config -H 'Content-Type: application/json' \\
+        -d '{"tokens_per_second": 100, "failure_rate": 0.05, "failure_mode": "disconnect"}'
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import secrets
+from typing import Any, AsyncGenerator, Dict, List, Literal, Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+load_dotenv(override=True)
+
+WORDS = (
+    "climate adaptation resilience investment transport energy water agriculture "
+    "financing emissions households poverty coastal urban infrastructure policy"
+).split()
+
+
+# --- Configuration ---
+
+
+class EmulatorConfig(BaseModel):
+    # Streaming speed of the answer, in tokens (text deltas) per second
+    tokens_per_second: float = Field(default=float(os.getenv("EMULATOR_TOKENS_PER_SECOND") or "50"), gt=0)
+    # Length of each answer, in tokens
+    answer_tokens: int = Field(default=int(os.getenv("EMULATOR_ANSWER_TOKENS") or "200"), ge=1)
+    # Latency added to every request before it responds
+    latency_ms: float = Field(default=float(os.getenv("EMULATOR_LATENCY_MS") or "50"), ge=0)
+    # Additional delay between a run starting and its first event after queueing
+    first_token_ms: float = Field(default=float(os.getenv("EMULATOR_FIRST_TOKEN_MS") or "500"), ge=0)
+    # Share of runs that request a get_weather tool call before answering
+    tool_call_rate: float = Field(default=float(os.getenv("EMULATOR_TOOL_CALL_RATE") or "0.2"), ge=0, le=1)
+    # Number of parallel tool calls in a tool call step
+    tool_calls_per_step: int = Field(default=int(os.getenv("EMULATOR_TOOL_CALLS_PER_STEP") or "1"), ge=1)
+    # Share of answers that contain file citation markers
+    citation_rate: float = Field(default=float(os.getenv("EMULATOR_CITATION_RATE") or "0.5"), ge=0, le=1)
+    # Share of run streams that fail, and how: an HTTP 500 response, a thread.run.failed
+    # event halfway through the answer, or the connection dropping halfway through
+    failure_rate: float = Field(default=float(os.getenv("EMULATOR_FAILURE_RATE") or "0"), ge=0, le=1)
+    failure_mode: Literal["http_error", "run_failed", "disconnect"] = Field(
+        default=os.getenv("EMULATOR_FAILURE_MODE") or "run_failed"  # type: ignore[arg-type]
+    )
+
+
+config = EmulatorConfig()
+
+
+# --- State ---
+
+
+threads: Dict[str, Dict[str, Any]] = {}
+messages: Dict[str, List[Dict[str, Any]]] = {}
+runs: Dict[str, Dict[str, Any]] = {}
+stats: Dict[str, int] = {"threads": 0, "messages": 0, "runs": 0, "tool_calls": 0, "failures": 0, "cancelled": 0}
+
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{secrets.token_hex(12)}"
+
+
+def message_object(thread_id: str, role: str, text: str, run_id: Optional[str] = None, status: str = "completed") -> Dict[str, Any]:
+    return {
+        "id": new_id("msg"), "object": "thread.message", "created_at": int(time.time()),
+        "thread_id": thread_id, "role": role, "status": status, "assistant_id": None if role == "user" else "asst_emulator",
+        "run_id": run_id, "attachments": [], "metadata": {}, "completed_at": None, "incomplete_at": None,
+        "incomplete_details": None,
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}] if text else []
+    }
+
+
+def run_object(run: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+    return {
+        "id": run["id"], "object": "thread.run", "created_at": run["created_at"], "thread_id": run["thread_id"],
+        "assistant_id": run["assistant_id"], "status": run["status"], "required_action": None, "last_error": None,
+        "expires_at": None, "started_at": run["created_at"], "cancelled_at": None, "failed_at": None,
+        "completed_at": None, "incomplete_details": None, "model": "gpt-4o-emulator", "instructions": "",
+        "tools": [], "metadata": {}, "usage": None, "temperature": 1.0, "top_p": 1.0,
+        "max_prompt_tokens": None, "max_completion_tokens": None, "truncation_strategy": None,
+        "response_format": "auto", "tool_choice": "auto", "parallel_tool_calls": True, **fields
+    }
+
+
+def step_object(run: Dict[str, Any], step_id: str, status: str, step_details: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": step_id, "object": "thread.run.step", "created_at": int(time.time()), "run_id": run["id"],
+        "assistant_id": run["assistant_id"], "thread_id": run["thread_id"], "type": step_details["type"],
+        "status": status, "step_details": step_details, "last_error": None, "expired_at": None,
+        "cancelled_at": None, "failed_at": None, "completed_at": None, "metadata": {}, "usage": None
+    }
+
+
+def synthesize_answer(rng: random.Random) -> List[str]:
+    """Returns the answer as a list of tokens, with an occasional citation marker."""
+    tokens = [f"{rng.choice(WORDS)} " for _ in range(config.answer_tokens)]
+    if rng.random() < config.citation_rate:
+        for _ in range(max(config.answer_tokens // 50, 1)):
+            # Markers arrive split across several deltas, as they do from the API
+            position = rng.randrange(len(tokens))
+            tokens[position:position] = ["【4:", f"{rng.randint(0, 20)}†", f"dl_{rng.randint(1, 234):03d}", ".pdf】"]
+    return tokens
+
+
+# --- Streaming ---
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def delay(milliseconds: float) -> None:
+    if milliseconds:
+        await asyncio.sleep(milliseconds / 1000)
+
+
+async def stream_run(run: Dict[str, Any], resumed: bool) -> AsyncGenerator[str, None]:
+    """Streams a run from its start, or, if resumed, from the submission of its tool outputs."""
+    rng = random.Random()
+    # HTTP errors are emulated before the stream starts, by streaming_response
+    fail = config.failure_mode != "http_error" and rng.random() < config.failure_rate
+    if fail:
+        stats["failures"] += 1
+
+    if not resumed:
+        run["status"] = "queued"
+        yield sse_event("thread.run.created", run_object(run))
+        yield sse_event("thread.run.queued", run_object(run))
+    await delay(config.first_token_ms)
+    run["status"] = "in_progress"
+    yield sse_event("thread.run.in_progress", run_object(run))
+
+    if not resumed and rng.random() < config.tool_call_rate:
+        step_id = new_id("step")
+        tool_calls: List[Dict[str, Any]] = [
+            {
+                "index": index, "id": new_id("call"), "type": "function",
+                "function": {"name": "get_weather", "arguments": json.dumps({"location": rng.choice(["Nairobi", "Accra", "Lima"])}), "output": None}
+            }
+            for index in range(config.tool_calls_per_step)
+        ]
+        stats["tool_calls"] += len(tool_calls)
+        yield sse_event("thread.run.step.created", step_object(run, step_id, "in_progress", {"type": "tool_calls", "tool_calls": []}))
+        for tool_call in tool_calls:
+            yield sse_event("thread.run.step.delta", {
+                "id": step_id, "object": "thread.run.step.delta",
+                "delta": {"step_details": {"type": "tool_calls", "tool_calls": [tool_call]}}
+            })
+        run["status"] = "requires_action"
+        run["pending_tool_calls"] = [tool_call["id"] for tool_call in tool_calls]
+        required_action = {
+            "type": "submit_tool_outputs",
+            "submit_tool_outputs": {"tool_calls": [
+                {"id": tool_call["id"], "type": "function", "function": {
+                    "name": tool_call["function"]["name"], "arguments": tool_call["function"]["arguments"]
+                }}
+                for tool_call in tool_calls
+            ]}
+        }
+        yield sse_event("thread.run.requires_action", run_object(run, required_action=required_action))
+        yield "event: done\ndata: [DONE]\n\n"
+        return
+
+    step_id = new_id("step")
+    message = message_object(run["thread_id"], "assistant", "", run_id=run["id"], status="in_progress")
+    yield sse_event("thread.run.step.created", step_object(
+        run, step_id, "in_progress", {"type": "message_creation", "message_creation": {"message_id": message["id"]}}
+    ))
+    yield sse_event("thread.message.created", message)
+    yield sse_event("thread.message.in_progress", message)
+
+    tokens = synthesize_answer(rng)
+    fail_at = len(tokens) // 2 if fail else None
+    interval = 1 / config.tokens_per_second
+    next_token_at = time.monotonic()
+    for index, token in enumerate(tokens):
+        if run["status"] == "cancelling":
+            run["status"] = "cancelled"
+            yield sse_event("thread.run.cancelled", run_object(run, cancelled_at=int(time.time())))
+            yield "event: done\ndata: [DONE]\n\n"
+            return
+        if index == fail_at:
+            if config.failure_mode == "disconnect":
+                # Drop the connection without a terminal event
+                raise RuntimeError("Emulated connection failure")
+            run["status"] = "failed"
+            yield sse_event("thread.run.failed", run_object(
+                run, failed_at=int(time.time()), last_error={"code": "server_error", "message": "Emulated run failure"}
+            ))
+            yield "event: done\ndata: [DONE]\n\n"
+            return
+        # Sleep to the next token's scheduled time, so the rate holds regardless of per-event overhead
+        next_token_at += interval
+        await asyncio.sleep(max(next_token_at - time.monotonic(), 0))
+        yield sse_event("thread.message.delta", {
+            "id": message["id"], "object": "thread.message.delta",
+            "delta": {"content": [{"index": 0, "type": "text", "text": {"value": token}}]}
+        })
+
+    text = "".join(tokens)
+    message = {**message, "status": "completed", "completed_at": int(time.time()),
+               "content": [{"type": "text", "text": {"value": text, "annotations": []}}]}
+    messages.setdefault(run["thread_id"], []).append(message)
+    yield sse_event("thread.message.completed", message)
+    yield sse_event("thread.run.step.completed", step_object(
+        run, step_id, "completed", {"type": "message_creation", "message_creation": {"message_id": message["id"]}}
+    ))
+    run["status"] = "completed"
+    usage = {"prompt_tokens": 1000, "completion_tokens": len(tokens), "total_tokens": 1000 + len(tokens)}
+    yield sse_event("thread.run.completed", run_object(run, completed_at=int(time.time()), usage=usage))
+    yield "event: done\ndata: [DONE]\n\n"
+
+
+def streaming_response(run: Dict[str, Any], resumed: bool) -> Response:
+    if config.failure_mode == "http_error" and random.random() < config.failure_rate:
+        stats["failures"] += 1
+        return JSONResponse(
+            {"error": {"message": "Emulated server error", "type": "server_error", "param": None, "code": None}},
+            status_code=500
+        )
+    return StreamingResponse(stream_run(run, resumed), media_type="text/event-stream")
+
+
+# --- Routes ---
+
+
+app = FastAPI(title="Assistants API emulator")
+
+
+@app.middleware("http")
+async def add_latency(request: Request, call_next: Any) -> Response:
+    await delay(config.latency_ms)
+    return await call_next(request)
+
+
+def get_thread(thread_id: str) -> Dict[str, Any]:
+    thread = threads.get(thread_id)
+    if thread is None:
+        raise HTTPException(status_code=404, detail=f"No thread found with id '{thread_id}'")
+    return thread
+
+
+def get_run(thread_id: str, run_id: str) -> Dict[str, Any]:
+    run = runs.get(run_id)
+    if run is None or run["thread_id"] != thread_id:
+        raise HTTPException(status_code=404, detail=f"No run found with id '{run_id}'")
+    return run
+
+
+@app.post("/v1/threads")
+async def create_thread(request: Request) -> Dict[str, Any]:
+    body = await request.json() if await request.body() else {}
+    thread: Dict[str, Any] = {"id": new_id("thread"), "object": "thread", "created_at": int(time.time()), "metadata": body.get("metadata") or {}, "tool_resources": None}
+    threads[thread["id"]] = thread
+    messages[thread["id"]] = [
+        message_object(thread["id"], message.get("role", "user"), str(message.get("content", "")))
+        for message in body.get("messages") or []
+    ]
+    stats["threads"] += 1
+    stats["messages"] += len(messages[thread["id"]])
+    return thread
+
+
+@app.get("/v1/threads/{thread_id}")
+async def retrieve_thread(thread_id: str) -> Dict[str, Any]:
+    return get_thread(thread_id)
+
+
+@app.post("/v1/threads/{thread_id}/messages")
+async def create_message(thread_id: str, request: Request) -> Dict[str, Any]:
+    get_thread(thread_id)
+    body = await request.json()
+    message = message_object(thread_id, body.get("role", "user"), str(body.get("content", "")))
+    messages[thread_id].append(message)
+    stats["messages"] += 1
+    return message
+
+
+@app.get("/v1/threads/{thread_id}/messages")
+async def list_messages(
+    thread_id: str,
+    limit: int = 20,
+    order: str = "desc",
+    after: Optional[str] = None,
+    before: Optional[str] = None
+) -> Dict[str, Any]:
+    get_thread(thread_id)
+    ordered = list(reversed(messages[thread_id])) if order == "desc" else list(messages[thread_id])
+    ids = [message["id"] for message in ordered]
+    if after in ids:
+        ordered = ordered[ids.index(after) + 1:]
+    elif before in ids:
+        ordered = ordered[:ids.index(before)]
+    page = ordered[:limit]
+    return {
+        "object": "list", "data": page, "has_more": len(ordered) > limit,
+        "first_id": page[0]["id"] if page else None, "last_id": page[-1]["id"] if page else None
+    }
+
+
+@app.post("/v1/threads/{thread_id}/runs")
+async def create_run(thread_id: str, request: Request) -> Response:
+    get_thread(thread_id)
+    body = await request.json()
+    if not body.get("stream"):
+        raise HTTPException(status_code=400, detail="The emulator only supports streaming runs")
+    run = {
+        "id": new_id("run"), "thread_id": thread_id, "assistant_id": body.get("assistant_id", "asst_emulator"),
+        "created_at": int(time.time()), "status": "queued"
+    }
+    runs[run["id"]] = run
+    stats["runs"] += 1
+    return streaming_response(run, resumed=False)
+
+
+@app.post("/v1/threads/{thread_id}/runs/{run_id}/submit_tool_outputs")
+async def submit_tool_outputs(thread_id: str, run_id: str, request: Request) -> Response:
+    run = get_run(thread_id, run_id)
+    body = await request.json()
+    if run["status"] != "requires_action":
+        raise HTTPException(status_code=400, detail=f"Runs in status {run['status']} do not accept tool outputs")
+    submitted = {tool_output.get("tool_call_id") for tool_output in body.get("tool_outputs") or []}
+    missing = set(run.get("pending_tool_calls", [])) - submitted
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing tool outputs for: {', '.join(sorted(missing))}")
+    return streaming_response(run, resumed=True)
+
+
+@app.post("/v1/threads/{thread_id}/runs/{run_id}/cancel")
+async def cancel_run(thread_id: str, run_id: str) -> Dict[str, Any]:
+    run = get_run(thread_id, run_id)
+    if run["status"] in ("completed", "failed", "cancelled", "expired"):
+        raise HTTPException(status_code=400, detail=f"Cannot cancel run with status '{run['status']}'")
+    # A run waiting on tool outputs has no stream to notice the cancellation
+    run["status"] = "cancelled" if run["status"] == "requires_action" else "cancelling"
+    stats["cancelled"] += 1
+    return run_object(run)
+
+
+@app.get("/emulator/config")
+async def get_config() -> EmulatorConfig:
+    return config
+
+
+@app.put("/emulator/config")
+async def update_config(update: Dict[str, Any]) -> EmulatorConfig:
+    global config
+    config = EmulatorConfig.model_validate({**config.model_dump(), **update})
+    return config
+
+
+@app.get("/emulator/stats")
+async def get_stats() -> Dict[str, int]:
+    return stats
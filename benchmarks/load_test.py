@@ -0,0 +1,227 @@
+"""
+Load test for the chat stack. Simulates concurrent conversations against a
+running app: each conversation posts a first message to /chat/send, streams the
+answer from /chat/{thread_id}/receive, and optionally continues with follow-up
+turns via /chat/{thread_id}/send. Run the app against benchmarks.emulator to
+avoid calling OpenAI.
+
+Conversations are spread round-robin over the given accounts and cycle through
+the given questions. Each question is suffixed with its conversation and turn
+number, so no two messages hit the same answer cache entry; pass
+--allow-cache-hits to send the questions verbatim and measure cached answers.
+
+The app's admission limits apply per user and per organization, so without
+raising them the run measures queueing rather than the stack. Set these on the
+app under test:
+
+    CHAT_MAX_RUNS_PER_USER          >= concurrency / number of accounts
+    CHAT_MAX_RUNS_PER_ORGANIZATION  >= concurrency (or spread accounts over organizations)
+    CHAT_MAX_CONCURRENT_RUNS        >= concurrency
+    CHAT_ADMISSION_MAX_QUEUE        >= concurrency, so excess runs queue instead of being refused
+    ANSWER_CACHE_ENABLED=false      unless measuring cached answers
+
+Reports p50/p95/p99 latency of the message POST, time to first byte and time to
+first textDelta of the stream (both measured from the start of the receive
+request), and stream completion time.
+
+Usage:
+    uv run python -m benchmarks.load_test --account user1@example.com:password \\
+        --account user2@example.com:password [--question ...] \\
+        [--base-url http://localhost:8000] [--conversations 200] [--concurrency 100] [--turns 1]
+"""
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import httpx
+
+DEFAULT_QUESTIONS = [
+    "What are Kenya's key adaptation priorities?",
+    "How is Bangladesh preparing for sea level rise?",
+    "What drives drought risk in the Sahel?",
+    "Which sectors dominate Indonesia's emissions?",
+    "How exposed is Vietnam's agriculture to flooding?",
+]
+
+
+@dataclass
+class Results:
+    send: List[float] = field(default_factory=list)
+    ttfb: List[float] = field(default_factory=list)
+    first_text: List[float] = field(default_factory=list)
+    completion: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def parse_account(value: str) -> Tuple[str, str]:
+    """Parses an EMAIL:PASSWORD account; the password may itself contain colons."""
+    email, separator, password = value.partition(":")
+    if not separator or not email or not password:
+        raise argparse.ArgumentTypeError(f"Expected EMAIL:PASSWORD, got {value!r}")
+    return email, password
+
+
+async def log_in(client: httpx.AsyncClient, email: str, password: str) -> str:
+    """
+    Logs in and returns a Cookie header with the auth cookies. They are sent
+    explicitly, because they are marked secure.
+    """
+    response = await client.post("/account/login", data={"email": email, "password": password})
+    client.cookies.clear()
+    if response.status_code >= 400 or "access_token" not in response.cookies:
+        raise SystemExit(f"Login as {email} failed with status {response.status_code}")
+    return "; ".join(
+        f"{name}={value}" for name, value in response.cookies.items() if name in ("access_token", "refresh_token")
+    )
+
+
+async def receive(client: httpx.AsyncClient, cookie: str, thread_id: str, results: Results) -> None:
+    start = time.perf_counter()
+    first_byte: Optional[float] = None
+    first_text: Optional[float] = None
+    headers = {"Accept": "text/event-stream", "Cookie": cookie}
+    async with client.stream("GET", f"/chat/{thread_id}/receive", headers=headers) as response:
+        if response.status_code != 200:
+            results.error(f"receive HTTP {response.status_code}")
+            return
+        async for line in response.aiter_lines():
+            now = time.perf_counter() - start
+            if first_byte is None:
+                first_byte = now
+            if first_text is None and line == "event: textDelta":
+                first_text = now
+            if line == "event: endStream":
+                break
+        else:
+            results.error("stream ended without endStream")
+            return
+    results.completion.append(time.perf_counter() - start)
+    if first_byte is not None:
+        results.ttfb.append(first_byte)
+    if first_text is not None:
+        results.first_text.append(first_text)
+    else:
+        results.error("no textDelta")
+
+
+async def conversation(
+    client: httpx.AsyncClient,
+    cookie: str,
+    index: int,
+    turns: int,
+    questions: List[str],
+    unique: bool,
+    results: Results
+) -> None:
+    thread_id: Optional[str] = None
+    for turn in range(turns):
+        path = f"/chat/{thread_id}/send" if thread_id else "/chat/send"
+        question = questions[(index + turn) % len(questions)]
+        if unique:
+            question = f"{question} (conversation {index}, turn {turn})"
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, data={"userInput": question}, headers={"Cookie": cookie})
+        except httpx.HTTPError as e:
+            results.error(type(e).__name__)
+            return
+        if response.status_code != 200:
+            results.error(f"send HTTP {response.status_code}")
+            return
+        results.send.append(time.perf_counter() - start)
+
+        if thread_id is None:
+            push_url = response.headers.get("HX-Push-Url", "")
+            thread_id = parse_qs(urlparse(push_url).query).get("thread_id", [""])[0]
+            if not thread_id:
+                results.error("no thread ID in HX-Push-Url")
+                return
+
+        try:
+            await receive(client, cookie, thread_id, results)
+        except httpx.HTTPError as e:
+            results.error(type(e).__name__)
+            return
+
+
+def report(name: str, values: List[float]) -> None:
+    if not values:
+        print(f"{name:<22} no samples")
+        return
+    print(
+        f"{name:<22} n={len(values):<6d} p50={percentile(values, 50) * 1000:9.1f} ms  "
+        f"p95={percentile(values, 95) * 1000:9.1f} ms  p99={percentile(values, 99) * 1000:9.1f} ms  "
+        f"max={max(values) * 1000:9.1f} ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    timeout = httpx.Timeout(args.timeout, connect=10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        cookies = [await log_in(client, email, password) for email, password in args.account]
+        questions = args.question or DEFAULT_QUESTIONS
+
+        results = Results()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited(index: int) -> None:
+            async with semaphore:
+                await conversation(
+                    client, cookies[index % len(cookies)], index, args.turns, questions,
+                    not args.allow_cache_hits, results
+                )
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(index) for index in range(args.conversations)))
+        elapsed = time.perf_counter() - start
+
+    streams = len(results.completion)
+    print(
+        f"{args.conversations} conversations x {args.turns} turns over {len(cookies)} accounts "
+        f"at concurrency {args.concurrency}: "
+        f"{streams} streams completed in {elapsed:.1f} s ({streams / elapsed:.1f} streams/s)"
+    )
+    report("send", results.send)
+    report("time to first byte", results.ttfb)
+    report("time to first text", results.first_text)
+    report("stream completion", results.completion)
+    for kind, count in sorted(results.errors.items()):
+        print(f"error: {kind} x {count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--account", type=parse_account, action="append", required=True, metavar="EMAIL:PASSWORD",
+        help="Account to send messages as; repeat to spread conversations over several users"
+    )
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=1, help="Messages per conversation")
+    parser.add_argument(
+        "--question", action="append", help="Question to ask; repeat for several (default: a built-in set)"
+    )
+    parser.add_argument(
+        "--allow-cache-hits", action="store_true",
+        help="Send questions verbatim instead of making each one unique, so repeats can hit the answer cache"
+    )
+    parser.add_argument("--timeout", type=float, default=300, help="Read timeout in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
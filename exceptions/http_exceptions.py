@@ -218,3 +218,30 @@ class InvitationProcessingError(HTTPException):
             status_code=500, # Internal Server Error
             detail=detail
         )
+
+
+class BatchJobNotFoundError(HTTPException):
+    """Raised when a batch question job does not exist, has expired, or belongs to another user."""
+    def __init__(self):
+        super().__init__(
+            status_code=404,
+            detail="Batch job not found or expired"
+        )
+
+
+class TooManyBatchJobsError(HTTPException):
+    """Raised when a user starts a batch question job while at their limit of running jobs."""
+    def __init__(self):
+        super().__init__(
+            status_code=429,
+            detail="Too many batch jobs are running; wait for one to finish"
+        )
+
+
+class ThreadNotFoundError(HTTPException):
+    """Raised when a chat thread does not exist or belongs to another user."""
+    def __init__(self):
+        super().__init__(
+            status_code=404,
+            detail="Chat thread not found"
+        )
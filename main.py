@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -10,7 +11,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from routers import account, files, chat, organization, role, user, static_pages, invitation
+from routers import account, admission, files, chat, metrics, organization, role, user, static_pages, invitation
 from utils.core.dependencies import (
     get_optional_user
 )
@@ -22,6 +23,8 @@ from exceptions.exceptions import (
     NeedsNewTokens
 )
 from utils.core.db import set_up_db
+from utils.chat.client import create_openai_client
+from utils.chat.citations import citation_index, CITATION_INDEX_REFRESH_SECONDS
 from utils.core.models import User
 
 logger = logging.getLogger("uvicorn.error")
@@ -79,8 +82,19 @@ async def lifespan(app: FastAPI):
         f"Static files last updated at: {actual_last_updated}. "
         "Cache-Control headers will be set accordingly."
     )
+    # Create the shared OpenAI client and its connection pool
+    app.state.openai_client = create_openai_client()
+    # Load the document citation index and keep it fresh in the background
+    citation_index.refresh()
+    citation_refresh_task = (
+        asyncio.create_task(citation_index.refresh_periodically())
+        if CITATION_INDEX_REFRESH_SECONDS > 0 else None
+    )
     yield
     # Optional shutdown logic
+    if citation_refresh_task:
+        citation_refresh_task.cancel()
+    await app.state.openai_client.close()
 
 
 # Initialize the FastAPI app
@@ -95,9 +109,11 @@ templates = Jinja2Templates(directory="templates")
 
 
 app.include_router(account.router)
+app.include_router(admission.router)
 app.include_router(chat.router)
 app.include_router(files.router)
 app.include_router(invitation.router)
+app.include_router(metrics.router)
 app.include_router(organization.router)
 app.include_router(role.router)
 app.include_router(static_pages.router)
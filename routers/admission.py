@@ -0,0 +1,58 @@
+import os
+import secrets
+from dataclasses import asdict
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel, Field
+from utils.chat.admission import admission_controller
+
+load_dotenv(override=True)
+
+# Operators must send "Authorization: Bearer <ADMISSION_TOKEN>"; the endpoints are disabled without it
+ADMISSION_TOKEN = os.getenv("ADMISSION_TOKEN") or ""
+
+router = APIRouter(prefix="/admission", tags=["admission"])
+
+
+class AdmissionLimitsUpdate(BaseModel):
+    """Limits to change; omitted limits are kept, and 0 means unlimited."""
+    max_runs: Optional[int] = Field(default=None, ge=0)
+    max_runs_per_organization: Optional[int] = Field(default=None, ge=0)
+    max_runs_per_user: Optional[int] = Field(default=None, ge=0)
+    max_queue: Optional[int] = Field(default=None, ge=0)
+    timeout_seconds: Optional[float] = Field(default=None, ge=0)
+    max_batch_runs_per_user: Optional[int] = Field(default=None, ge=0)
+
+
+def check_token(authorization: Optional[str]) -> None:
+    if not ADMISSION_TOKEN:
+        raise HTTPException(status_code=404, detail="Admission control endpoints are disabled")
+    if not secrets.compare_digest(authorization or "", f"Bearer {ADMISSION_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid admission token")
+
+
+def admission_state() -> Dict[str, Any]:
+    return {"limits": asdict(admission_controller.limits), **admission_controller.stats()}
+
+
+@router.get("/limits", name="read_admission_limits")
+async def read_admission_limits(authorization: Optional[str] = Header(default=None)) -> Dict[str, Any]:
+    """Returns this worker's assistant run limits and its active and queued runs."""
+    check_token(authorization)
+    return admission_state()
+
+
+@router.put("/limits", name="update_admission_limits")
+async def update_admission_limits(
+    update: AdmissionLimitsUpdate,
+    authorization: Optional[str] = Header(default=None)
+) -> Dict[str, Any]:
+    """
+    Changes this worker's assistant run limits until it restarts. Each worker
+    process has its own limits, so with several workers, update every worker
+    (or change the environment and restart to make the change permanent).
+    """
+    check_token(authorization)
+    admission_controller.configure(**update.model_dump(exclude_none=True))
+    return admission_state()
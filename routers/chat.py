@@ -1,36 +1,41 @@
 # TODO: These need to be authenticated routes, or else they could be intercepted and/or abused
 
 import os
-import json
-import re
+import time
+from contextlib import aclosing
 from datetime import datetime
-from logging import getLogger, Logger
-from typing import Optional, List, Dict, Any, AsyncGenerator, Union
+from logging import getLogger
+from typing import Any, Optional, List, Dict, AsyncGenerator, Callable, Iterable, Union
 from dotenv import load_dotenv
-from fastapi import APIRouter, Form, Depends, Request
+from fastapi import APIRouter, Form, Depends, Request, Header, Query
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import Response, HTMLResponse, StreamingResponse
+from fastapi.responses import Response, HTMLResponse, JSONResponse, StreamingResponse
 from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
 from sqlmodel import Session
-from openai.lib.streaming._assistants import AsyncAssistantStreamManager, AsyncAssistantEventHandler
-from openai.types.beta.assistant_stream_event import (
-    ThreadMessageCreated, ThreadMessageDelta, ThreadRunCompleted,
-    ThreadRunRequiresAction, ThreadRunStepCreated, ThreadRunStepDelta
-)
-from openai.types.beta.threads.text_delta import TextDelta
-from openai.types.beta import AssistantStreamEvent
-from openai.types.beta.threads.message_content_delta import MessageContentDelta
-from openai.types.beta.threads.text_delta_block import TextDeltaBlock
-from openai.types.beta.threads.run import RequiredAction
-
-from exceptions.http_exceptions import OpenAIError
-from utils.chat.functions import get_weather
-from utils.chat.sse import sse_format, post_tool_outputs
-from utils.chat.sse import AssistantStreamMetadata
-from utils.chat.files import FILE_PATHS, DOCUMENT_CITATIONS
+from openai.types.beta.threads.required_action_function_tool_call import RequiredActionFunctionToolCall
+from openai.types.beta.threads.runs import ToolCallDelta
+from openai.types.beta.thread_create_params import Message
+
+from exceptions.http_exceptions import OpenAIError, BatchJobNotFoundError, ThreadNotFoundError, TooManyBatchJobsError
+from utils.chat.tools import ToolResult
+import utils.chat.functions  # noqa: F401 (registers the assistant's function tools)
+from utils.chat.sse import encode_sse, with_event_id, wrap_for_oob_swap, coalesce_deltas, cancel_run
+from utils.chat.sse import SSEDelta, RunProgress
 from utils.core.dependencies import get_user_with_relations, get_authenticated_user, get_session
 from utils.core.models import User
-from utils.chat.threads import create_thread
+from utils.chat.threads import create_thread, get_thread_owner, is_thread_owner
+from utils.chat.client import get_openai_client
+from utils.chat.replay import run_streams
+from utils.chat.cache import answer_cache, organization_scope
+from utils.chat.recording import StreamRecorder
+from utils.chat.history import HistoryMessage, load_history_page
+from utils.chat.compression import SSE_COMPRESSION_ENABLED, negotiate_encoding, compress_stream
+from utils.chat.metrics import ADMISSION_WAIT_SECONDS, track_run, observe_send
+from utils.chat.admission import admission_controller, AdmissionRejected
+from utils.chat.answers import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, RunEmitter, encode_event, encode_events, requested_stream_format, stream_answer, stream_run
+from utils.chat.batch import BATCH_MAX_QUESTIONS, BatchJob, BatchJobLimitExceeded, batch_jobs
+from utils.chat.fragments import FragmentRenderer
 from routers.files import router as files_router
 
 logger = getLogger("uvicorn.error")
@@ -43,6 +48,14 @@ router: APIRouter = APIRouter(
 # Jinja2 templates
 templates = Jinja2Templates(directory="templates")
 
+# Fragments rendered for every message exchange or assistant step, precompiled into literal text and slots
+assistant_step_fragment = FragmentRenderer(templates.env, "chat/assistant-step.html", slots=("step_id",))
+user_message_fragment = FragmentRenderer(templates.env, "chat/user-message.html", slots=("user_input",))
+assistant_run_fragment = FragmentRenderer(templates.env, "chat/assistant-run.html", slots=("thread_id",))
+assistant_step_fragment.warm(step_type="assistantMessage")
+assistant_step_fragment.warm(step_type="toolCall")
+user_message_fragment.warm()
+
 # Check if environment variables are missing
 load_dotenv(override=True)
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -53,32 +66,280 @@ if openai_api_key and assistant_id_from_env:
 else:
     raise OpenAIError("OpenAI API key or assistant ID is missing")
 
+# Coalescing window for textDelta/toolDelta SSE frames (0 disables coalescing)
+SSE_COALESCE_MS = int(os.getenv("SSE_COALESCE_MS") or "50")
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES") or "2048")
+
+SSE_HEADERS = {
+    # no-transform and X-Accel-Buffering keep proxies from buffering or re-encoding the stream
+    "Cache-Control": "no-cache, no-transform",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
 
 # --- Authenticated Routes ---
 
 
+def format_user_message(user_input: str) -> str:
+    return f"System: Today's date is {datetime.today().strftime('%Y-%m-%d')}\n{user_input}"
+
+
+def render_message_exchange(request: Request, thread_id: str, user_input: str) -> str:
+    """Renders the user's message and the component that starts the assistant run stream."""
+    user_message_html = user_message_fragment.render(user_input=user_input)
+    assistant_run_html = assistant_run_fragment.render(request=request, thread_id=thread_id)
+    return user_message_html + assistant_run_html
+
+
+def event_stream_response(
+    frames: AsyncGenerator[bytes, None],
+    accept_encoding: Optional[str],
+    media_type: str = SSE_MEDIA_TYPE
+) -> StreamingResponse:
+    """Streams SSE frames (or NDJSON lines), compressed if SSE compression is enabled and the client accepts it."""
+    headers = dict(SSE_HEADERS)
+    if SSE_COMPRESSION_ENABLED:
+        headers["Vary"] = "Accept-Encoding"
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is not None:
+        frames = compress_stream(frames, encoding)
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(frames, media_type=media_type, headers=headers)
+
+
+def render_queue_status(position: int = 0, message: Optional[str] = None) -> bytes:
+    return encode_sse(
+        "queued",
+        templates.get_template("chat/queue-status.html").render(position=position, message=message)
+    )
+
+
+def structured_queue_status(media_type: str) -> Callable[..., bytes]:
+    """Returns a queue status encoder for structured (JSON) event streams."""
+    def render(position: int = 0, message: Optional[str] = None) -> bytes:
+        return encode_event({"type": "queued", "position": position, "message": message}, media_type)
+    return render
+
+
+async def admit_run(
+    user_id: Optional[int],
+    organization_ids: List[int],
+    frames: AsyncGenerator[bytes, None],
+    queue_status: Callable[..., bytes] = render_queue_status
+) -> AsyncGenerator[bytes, None]:
+    """
+    Holds a run back until admission control gives it a slot, sending queued
+    events with its position in line meanwhile, and frees the slot when the run
+    ends. The run's frames are not pulled before admission, so its upstream
+    stream is not opened while it waits.
+    """
+    ticket = admission_controller.enqueue(user_id, organization_ids)
+    outcome = "abandoned"
+    try:
+        queued = False
+        try:
+            async for position in admission_controller.wait(ticket):
+                queued = True
+                yield queue_status(position)
+        except AdmissionRejected as e:
+            outcome = "rejected"
+            logger.warning(f"Assistant run for user {user_id} was not admitted: {e}")
+            yield queue_status(message=str(e))
+            return
+        outcome = "admitted"
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - ticket.enqueued_at, outcome)
+        if queued:
+            yield queue_status()
+
+        async with aclosing(frames):
+            async for frame in frames:
+                yield frame
+    finally:
+        if outcome != "admitted":
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - ticket.enqueued_at, outcome)
+        admission_controller.release(ticket)
+
+
+def render_history(thread_id: str) -> Callable[[List[HistoryMessage], Optional[str]], str]:
+    """Returns a renderer for pages of a thread's history, linking each page to the next older one."""
+    def render(messages: List[HistoryMessage], before: Optional[str]) -> str:
+        older_url = f"{router.url_path_for('read_chat_history', thread_id=thread_id)}?before={before}" if before else None
+        return templates.get_template("chat/history-page.html").render(messages=messages, older_url=older_url)
+    return render
+
+
+def file_download_url(file_id: str) -> str:
+    return files_router.url_path_for('download_openai_file', file_id=file_id)
+
+
+class HTMLRunEmitter(RunEmitter[Union[SSEDelta, bytes]]):
+    """
+    Emits a run as htmx SSE events for the chat UI: message and tool call
+    components, text and tool deltas (as SSEDelta, for coalescing), tool output
+    widgets, code interpreter images, and links to sandbox files.
+    """
+    render_html = True
+
+    def message_created(self, message_id: str) -> Iterable[Union[SSEDelta, bytes]]:
+        logger.debug(f"Message Created - Step ID: {message_id}")
+        yield encode_sse("messageCreated", assistant_step_fragment.render(step_type="assistantMessage", step_id=message_id))
+
+    def text(self, message_id: str, text: str) -> Iterable[Union[SSEDelta, bytes]]:
+        # Use step_id (message_id) for OOB targeting the correct message container
+        yield SSEDelta("textDelta", message_id, text)
+
+    def file(self, message_id: str, file_id: str, replaces: str) -> Iterable[Union[SSEDelta, bytes]]:
+        # The sandbox link (e.g. "sandbox:/mnt/data/file.csv") is replaced with our download URL for the file
+        replacement_payload = f"{replaces}|{file_download_url(file_id)}"
+        logger.debug(f"Replacement payload: {replacement_payload}")
+        yield encode_sse("textReplacement", wrap_for_oob_swap(message_id, replacement_payload))
+
+    def tool_step_created(self, step_id: str) -> Iterable[Union[SSEDelta, bytes]]:
+        logger.debug(f"Tool Call Created - Step ID: {step_id}")
+        yield encode_sse("toolCallCreated", assistant_step_fragment.render(step_type="toolCall", step_id=step_id))
+
+    def tool_call_delta(self, step_id: str, tool_call: ToolCallDelta) -> Iterable[Union[SSEDelta, bytes]]:
+        if tool_call.type == "function":
+            if tool_call.function and tool_call.function.name:
+                yield SSEDelta("toolDelta", step_id, tool_call.function.name + "<br>")
+            if tool_call.function and tool_call.function.arguments:
+                yield SSEDelta("toolDelta", step_id, tool_call.function.arguments)
+
+        elif tool_call.type == "code_interpreter":
+            if tool_call.code_interpreter and tool_call.code_interpreter.input is not None:
+                if tool_call.code_interpreter.input == "":
+                    yield SSEDelta("toolDelta", step_id, "<em>Code Interpreter tool call</em><br>")
+                else:
+                    yield SSEDelta("toolDelta", step_id, str(tool_call.code_interpreter.input))
+            if tool_call.code_interpreter and tool_call.code_interpreter.outputs:
+                for output in tool_call.code_interpreter.outputs:
+                    logger.debug(f"Code Interpreter Output Type: {output.type}")
+                    if output.type == "logs" and output.logs:
+                        # Replace "\n" in the logs with "\n> " to format it as console output
+                        output_logs = "\n\n> " + str(output.logs).strip().replace("\n", "\n> ")
+                        yield SSEDelta("toolDelta", step_id, output_logs)
+                    elif output.type == "image" and output.image and output.image.file_id:
+                        logger.debug(f"Image Output - File ID: {output.image.file_id}")
+                        image_html = f'<img src="/chat/files/{output.image.file_id}/content" class="code-interpreter-image">'
+                        yield encode_sse("imageOutput", wrap_for_oob_swap(step_id, image_html))
+
+        elif tool_call.type == "file_search":
+            yield SSEDelta("toolDelta", step_id, "<em>File search tool call</em>")
+
+    def tool_output(self, tool_call: RequiredActionFunctionToolCall, result: ToolResult) -> Iterable[Union[SSEDelta, bytes]]:
+        yield encode_sse("toolOutput", result.output_html)
+
+    def done(self, outcome: str) -> Iterable[Union[SSEDelta, bytes]]:
+        if outcome == "completed":
+            yield encode_sse("endStream", "DONE")
+
+
 @router.get("/")
 async def read_chat(
     request: Request,
     user: Optional[User] = Depends(get_user_with_relations),
-    thread_id: Optional[str] = None,
-    messages: List[Dict[str, Any]] = []
+    client: AsyncOpenAI = Depends(get_openai_client),
+    thread_id: Optional[str] = None
 ) -> Response:    
-    # Create a new assistant chat thread if no thread ID is provided
-    if not thread_id or thread_id == "None" or thread_id == "null":
-        thread_id = await create_thread()
+    # Threads are created lazily when the first message is sent, so rendering
+    # a new chat never waits on the OpenAI API
+    if thread_id == "None" or thread_id == "null":
+        thread_id = None
+
+    # Revisiting a thread shows its newest messages; older pages load as the user scrolls up
+    history_html = ""
+    if thread_id and user:
+        owner = await get_thread_owner(client, thread_id)
+        if owner is None:
+            # Threads created before owners were recorded (or that no longer exist)
+            # cannot be checked, so they are not shown; the user starts a new chat
+            logger.info(f"Not showing thread {thread_id} to user {user.id}: it has no recorded owner")
+            thread_id = None
+        elif owner != user.id:
+            raise ThreadNotFoundError()
+    if thread_id and user:
+        history = await load_history_page(client, thread_id, user.id, render_history(thread_id), file_download_url)
+        history_html = history.html
 
     return templates.TemplateResponse(
         "chat/index.html",
         {
             "request": request,
             "user": user,
-            "messages": messages,
+            "history_html": history_html,
             "thread_id": thread_id
         }
     )
 
 
+@router.get("/{thread_id}/history")
+async def read_chat_history(
+    thread_id: str,
+    before: str,
+    user: User = Depends(get_authenticated_user),
+    client: AsyncOpenAI = Depends(get_openai_client)
+) -> HTMLResponse:
+    """Returns the page of messages preceding the message ID before, for infinite scroll."""
+    if not await is_thread_owner(client, thread_id, user.id):
+        raise ThreadNotFoundError()
+    history = await load_history_page(
+        client, thread_id, user.id, render_history(thread_id), file_download_url, before=before
+    )
+    return HTMLResponse(content=history.html)
+
+
+# Route to submit the first message of a conversation. Creates the thread and
+# its first message in a single request, mounts a component that will start an
+# assistant run stream, and points the chat form at the new thread
+@router.post("/send")
+async def send_first_message(
+    request: Request,
+    userInput: str = Form(...),
+    user: User = Depends(get_authenticated_user),
+    client: AsyncOpenAI = Depends(get_openai_client)
+) -> HTMLResponse:
+    messages: List[Message] = [{"role": "user", "content": format_user_message(userInput)}]
+
+    # Common opening questions can be answered from the cache instead of starting a run.
+    # The cached answer is added to the thread, so follow-up questions have its context
+    cache_key: Optional[str] = None
+    cached_answer = None
+    if answer_cache.enabled:
+        scope = organization_scope((role.organization_id for role in user.roles), user.id)
+        cache_key = answer_cache.make_key(scope, assistant_id, userInput)
+        cached_answer = answer_cache.get(cache_key)
+        if cached_answer is not None:
+            messages.append({"role": "assistant", "content": cached_answer.answer_text})
+
+    with observe_send("send_first_message"):
+        thread_id = await create_thread(client, messages=messages, user_id=user.id)
+        if not thread_id:
+            raise OpenAIError("Failed to create assistant chat thread")
+
+    if cached_answer is not None:
+        logger.info(f"Answering thread {thread_id} from the answer cache ({answer_cache.stats()})")
+        run_streams.start(
+            thread_id,
+            user.id,
+            coalesce_deltas(answer_cache.replay(cached_answer), SSE_COALESCE_MS, SSE_COALESCE_BYTES)
+        )
+    elif cache_key is not None:
+        answer_cache.expect(thread_id, cache_key)
+
+    chat_form_html = templates.get_template("chat/chat-form.html").render(
+        request=request,
+        thread_id=thread_id,
+        swap_oob=True,
+        inputDisabled=True
+    )
+
+    return HTMLResponse(
+        content=render_message_exchange(request, thread_id, userInput) + chat_form_html,
+        headers={"HX-Push-Url": f"{router.url_path_for('read_chat')}?thread_id={thread_id}"}
+    )
+
+
 # Route to submit a new user message to a thread and mount a component that
 # will start an assistant run stream
 @router.post("/{thread_id}/send")
@@ -87,33 +348,56 @@ async def send_message(
     thread_id: str,
     userInput: str = Form(...),
     user: User = Depends(get_authenticated_user),
-    client: AsyncOpenAI = Depends(lambda: AsyncOpenAI())
+    client: AsyncOpenAI = Depends(get_openai_client)
 ) -> HTMLResponse:
+    if not await is_thread_owner(client, thread_id, user.id):
+        raise ThreadNotFoundError()
+
     # Create a new message in the thread
-    await client.beta.threads.messages.create(
-        thread_id=thread_id,
-        role="user",
-        content=f"System: Today's date is {datetime.today().strftime('%Y-%m-%d')}\n{userInput}"
-    )
+    with observe_send("send_message"):
+        await client.beta.threads.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=format_user_message(userInput)
+        )
 
-    # Render the component templates with the context
-    user_message_html = templates.get_template("chat/user-message.html").render(user_input=userInput)
-    assistant_run_html = templates.get_template("chat/assistant-run.html").render(
-        request=request,
-        assistant_id=assistant_id,
-        thread_id=thread_id
-    )
+    return HTMLResponse(content=render_message_exchange(request, thread_id, userInput))
 
-    return HTMLResponse(
-        content=(
-            user_message_html +
-            assistant_run_html
-        )
-    )
 
+def structured_run_response(
+    client: AsyncOpenAI,
+    thread_id: str,
+    user: User,
+    media_type: str,
+    accept_encoding: Optional[str]
+) -> StreamingResponse:
+    """
+    Streams a new run as compact JSON events (see stream_answer), as NDJSON lines
+    or SSE messages, with no templates or markup involved. Runs go through
+    admission control as in the chat UI, but are not buffered for resuming: if
+    the client goes away, the run is cancelled.
+    """
+    run_progress = RunProgress()
+    organization_ids = [role.organization_id for role in user.roles if role.organization_id is not None]
+    events = stream_answer(client, thread_id, assistant_id, file_download_url, run_progress)
+    text_prefix = b'{"type":"text"' if media_type == NDJSON_MEDIA_TYPE else b"event: text\n"
+
+    async def frames() -> AsyncGenerator[bytes, None]:
+        run_frames = admit_run(
+            user.id,
+            organization_ids,
+            track_run(encode_events(events, media_type), run_progress, text_prefix),
+            queue_status=structured_queue_status(media_type)
+        )
+        try:
+            async with aclosing(run_frames):
+                async for frame in run_frames:
+                    yield frame
+        finally:
+            if run_progress.run_id and run_progress.finished_at is None:
+                await cancel_run(client, thread_id, run_progress)
 
-def wrap_for_oob_swap(step_id: str, text_value: str) -> str:
-    return f'<span hx-swap-oob="beforeend:#step-{step_id}">{text_value}</span>'
+    return event_stream_response(frames(), accept_encoding, media_type)
 
 
 # Route to stream the response from the assistant via server-sent events
@@ -122,284 +406,178 @@ async def stream_response(
     thread_id: str,
     user: User = Depends(get_authenticated_user),
     session: Session = Depends(get_session),
-    client: AsyncOpenAI = Depends(lambda: AsyncOpenAI())
+    client: AsyncOpenAI = Depends(get_openai_client),
+    last_event_id: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    stream_format: Optional[str] = Query(default=None, alias="format")
 ) -> StreamingResponse:
     """
     Streams the assistant response via Server-Sent Events (SSE). If the assistant requires
     a tool call, we capture that action, invoke the tool, and then re-run the stream
-    until completion. This is done in a DRY way by extracting the streaming logic 
-    into a helper function.
+    until completion. The run is processed by stream_run, the same loop behind the
+    structured stream, with HTMLRunEmitter rendering its steps as htmx events.
+
+    The run is drained in the background into a replay buffer. If the EventSource
+    reconnects while the thread's run is in flight (or shortly after it finished),
+    we resume from its Last-Event-ID instead of starting a second run. If the
+    client goes away for good, the background task is stopped and the run is
+    cancelled, so we stop paying for tokens and tool calls nobody will see.
+
+    A run stream that no client has subscribed to yet, such as the replay of a
+    cached answer started by send_first_message, is streamed from the start.
+
+    Frames are compressed per connection when SSE_COMPRESSION_ENABLED is set and
+    the client accepts gzip, deflate or (if installed) brotli.
+
+    New runs go through admission control, which bounds the concurrent runs per
+    user, per organization and overall; runs over a limit are sent queued events
+    with their position in line until a slot frees up.
+
+    Programmatic clients can ask for structured JSON events instead of htmx
+    markup, with Accept: application/x-ndjson or ?format=ndjson for NDJSON, or
+    ?format=sse for SSE messages with JSON data.
+
+    Only the user who created the thread can stream its runs; others get 404.
     """
+    if not await is_thread_owner(client, thread_id, user.id):
+        raise ThreadNotFoundError()
+
+    # The first request for a thread's run takes its pending cache key, so the key
+    # is dropped even if the run is structured, resumed, rejected or fails
+    cache_key = answer_cache.take_pending(thread_id)
+
+    media_type = requested_stream_format(accept, stream_format)
+    # EventSource always sends Accept: text/event-stream, so JSON over SSE must be asked for explicitly
+    if media_type == NDJSON_MEDIA_TYPE or (media_type is not None and stream_format is not None):
+        return structured_run_response(client, thread_id, user, media_type, accept_encoding)
+
+    run_stream = run_streams.get(thread_id)
+    if run_stream is not None and run_stream.user_id == user.id:
+        resume_after = run_stream.parse_event_id(last_event_id)
+        if resume_after is not None or not run_stream.done or not run_stream.subscribed:
+            logger.debug(f"Resuming run stream for thread {thread_id} after event {last_event_id}")
+            return event_stream_response(run_stream.subscribe(resume_after or 0), accept_encoding)
+
+    run_progress = RunProgress()
+    # Set ASSISTANT_STREAM_RECORD_DIR to record raw events for offline replay and benchmarks
+    recorder = StreamRecorder.for_thread(thread_id)
+    events: AsyncGenerator[Union[SSEDelta, bytes], None] = stream_run(
+        client, thread_id, assistant_id, HTMLRunEmitter(), run_progress, recorder
+    )
+    if cache_key is not None:
+        events = answer_cache.record(cache_key, events)
+
+    # Runs beyond the concurrency limits wait in a fair queue before opening the upstream stream
+    organization_ids = [role.organization_id for role in user.roles if role.organization_id is not None]
+    run_stream = run_streams.start(
+        thread_id,
+        user.id,
+        admit_run(user.id, organization_ids, track_run(coalesce_deltas(events, SSE_COALESCE_MS, SSE_COALESCE_BYTES), run_progress)),
+        on_abandon=lambda: cancel_run(client, thread_id, run_progress)
+    )
+    return event_stream_response(run_stream.subscribe(), accept_encoding)
 
-    async def handle_assistant_stream(
-        templates: Jinja2Templates,
-        logger: Logger,
-        stream_manager: AsyncAssistantStreamManager,
-        step_id: str = ""
-    ) -> AsyncGenerator[Union[AssistantStreamMetadata, str], None]:
-        """
-        Async generator to yield SSE events.
-        We yield a final AssistantStreamMetadata instance once we're done.
-        """
-        required_action: Optional[RequiredAction] = None
-        run_requires_action_event: Optional[ThreadRunRequiresAction] = None
-
-        event_handler: AsyncAssistantEventHandler
-        async with stream_manager as event_handler:
-            event: AssistantStreamEvent
-            async for event in event_handler:
-
-                if isinstance(event, ThreadMessageCreated):
-                    step_id = event.data.id
-                    logger.debug(f"Message Created - Step ID: {step_id}")
-
-                    yield sse_format(
-                        "messageCreated",
-                        templates.get_template("chat/assistant-step.html").render(
-                            step_type="assistantMessage",
-                            step_id=step_id
-                        )
-                    )
-
-                if isinstance(event, ThreadMessageDelta) and event.data.delta.content:
-                    delta_content_item: MessageContentDelta = event.data.delta.content[0]
-                    if isinstance(delta_content_item, TextDeltaBlock) and delta_content_item.text:
-                        step_id = event.data.id
-                        text_delta: TextDelta = delta_content_item.text
-                        current_delta_text_value: Optional[str] = text_delta.value
-                        annotations = text_delta.annotations
-
-                        # This will be the text actually sent in textDelta
-                        final_text_for_this_delta = current_delta_text_value
-
-                        # Check for file citation annotations
-                        if annotations:
-                            for annotation in annotations:
-                                logger.debug(f"Annotation: {str(annotation)}")
-                                if annotation.type == 'file_citation' and hasattr(annotation, 'file_citation') and annotation.file_citation:
-                                    if current_delta_text_value:
-                                        match = re.search(r'【.*?†(.*?)】', current_delta_text_value)
-                                        if match:
-                                            document_id = match.group(1).split(".")[0]
-                                            # Get the file URL from the FILE_PATHS dictionary
-                                            file_url = FILE_PATHS.get(document_id, None)
-                                            # Get the citation text from the DOCUMENT_CITATIONS dictionary
-                                            citation_text = DOCUMENT_CITATIONS.get(document_id, None)
-                                            if file_url and citation_text:
-                                                final_text_for_this_delta = f' ([{citation_text}]({file_url}))'
-                                            else:
-                                                # file_url not found for document_id
-                                                logger.warning(f"Could not find file URL or citation text for document ID: {document_id}")
-                                                # Keep original text_value if file_url is None
-                                                pass # text_value remains unchanged
-
-                                        else:
-                                            logger.warning(f"Could not find citation pattern in text: {current_delta_text_value}")
-                                    else:
-                                        # This case shouldn't occur
-                                        logger.warning(f"File citation annotation found, but text_delta.value is unexpectedly None.")
-                        
-                                # Handle file_path (code interpreter generated files)
-                                elif annotation.type == 'file_path' and hasattr(annotation, 'file_path') and annotation.file_path and annotation.file_path.file_id:
-                                    file_id = annotation.file_path.file_id
-                                    # annotation.text is the "key" for replacement (e.g., "sandbox:/mnt/data/file.csv")
-                                    sandbox_link_text_in_markdown = annotation.text 
-
-                                    # We will replace it with our app's download URL for the OpenAI-hosted file
-                                    download_url = files_router.url_path_for(
-                                        'download_openai_file', file_id=file_id
-                                    )
-
-                                    replacement_payload = f"{sandbox_link_text_in_markdown}|{download_url}"
-                                    logger.debug(f"Replacement payload: {replacement_payload}")
-                                    # Use step_id (message_id) for OOB targeting the correct message container
-                                    sse_replacement_data = wrap_for_oob_swap(step_id, replacement_payload)
-                                    yield sse_format("textReplacement", sse_replacement_data)
-                                    logger.debug(f"Sent textReplacement event for {sandbox_link_text_in_markdown} with {download_url}")
-
-                                    break
-
-                        # Only send SSE if there's a non-None text value to transmit
-                        if final_text_for_this_delta is not None:
-                            # Use step_id (message_id) for OOB targeting the correct message container
-                            sse_data = wrap_for_oob_swap(step_id, final_text_for_this_delta)
-                            yield sse_format("textDelta", sse_data)
-
-                if isinstance(event, ThreadRunStepCreated) and event.data.type == "tool_calls":
-                    logger.debug(f"Tool Call Created - Data: {str(event.data)}")
-                    step_id = event.data.id
-
-                    yield sse_format(
-                        f"toolCallCreated",
-                        templates.get_template('chat/assistant-step.html').render(
-                            step_type='toolCall',
-                            step_id=step_id
-                        )
-                    )
-
-                if isinstance(event, ThreadRunStepDelta) and event.data.delta.step_details and event.data.delta.step_details.type == "tool_calls":
-                    tool_calls = event.data.delta.step_details.tool_calls
-                    step_id = event.data.id
-                    if tool_calls:
-                        # TODO: Support parallel function calling
-                        tool_call = tool_calls[0]
-
-                        # Handle function tool call
-                        if tool_call.type == "function":
-                            if tool_call.function and tool_call.function.name:
-                                yield sse_format(
-                                    f"toolDelta",
-                                    wrap_for_oob_swap(step_id, tool_call.function.name + "<br>")
-                                )
-                            if tool_call.function and tool_call.function.arguments:
-                                yield sse_format(
-                                    f"toolDelta",
-                                    wrap_for_oob_swap(step_id, tool_call.function.arguments)
-                                )
-                        
-                        # Handle code interpreter tool calls
-                        elif tool_call.type == "code_interpreter":
-                            if tool_call.code_interpreter and tool_call.code_interpreter.input is not None:
-                                if tool_call.code_interpreter.input == "":
-                                    yield sse_format(
-                                        "toolDelta",
-                                        wrap_for_oob_swap(step_id, "<em>Code Interpreter tool call</em><br>")
-                                    )
-                                else:
-                                    yield sse_format(
-                                        "toolDelta",
-                                        wrap_for_oob_swap(step_id, str(tool_call.code_interpreter.input))
-                                    )
-                            if tool_call.code_interpreter and tool_call.code_interpreter.outputs:
-                                for output in tool_call.code_interpreter.outputs:
-                                    logger.debug(f"Code Interpreter Output Type: {output.type}")
-                                    if output.type == "logs" and output.logs:
-                                        # Replace "\n" in the logs with "\n> " to format it as console output
-                                        output_logs = "\n\n> " + str(output.logs).strip().replace("\n", "\n> ")
-                                        yield sse_format(
-                                            "toolDelta",
-                                            wrap_for_oob_swap(step_id, output_logs)
-                                        )
-                                    elif output.type == "image" and output.image and output.image.file_id:
-                                        logger.debug(f"Image Output - File ID: {output.image.file_id}")
-                                        # Create the image HTML on the backend
-                                        image_html = f'<img src="/chat/files/{output.image.file_id}/content" class="code-interpreter-image">'
-                                        yield sse_format(
-                                            f"imageOutput",
-                                            wrap_for_oob_swap(step_id, image_html)
-                                        )
-                        elif tool_call.type == "file_search":
-                            yield sse_format(
-                                f"toolDelta",
-                                wrap_for_oob_swap(step_id, "<em>File search tool call</em>")
-                            )
-
-                # If the assistant run requires an action (a tool call), break and handle it
-                if isinstance(event, ThreadRunRequiresAction):
-                    required_action = event.data.required_action
-                    run_requires_action_event = event
-                    logger.debug("Run Requires Action Event")
-                    if required_action and required_action.submit_tool_outputs:
-                        break
-
-                if isinstance(event, ThreadRunCompleted):
-                    yield sse_format("endStream", "DONE")
-
-        # At the end (or break) of this async generator, yield a final AssistantStreamMetadata
-        yield AssistantStreamMetadata.create(
-            required_action=required_action,
-            step_id=step_id,
-            run_requires_action_event=run_requires_action_event
-        )
+class BatchQuestions(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=BATCH_MAX_QUESTIONS)
 
-    async def event_generator() -> AsyncGenerator[str, None]:
-        """
-        Main generator for SSE events. We call our helper function to handle the assistant
-        stream, and if the assistant requests a tool call, we do it and then re-stream the stream.
-        """
-        step_id: str = ""
-        stream_manager: AsyncAssistantStreamManager[AsyncAssistantEventHandler] = client.beta.threads.runs.stream(
-            thread_id=thread_id,
-            assistant_id=assistant_id,
-            parallel_tool_calls=False
+
+def get_batch_job(job_id: str, user: User) -> BatchJob:
+    job = batch_jobs.get(job_id)
+    if job is None or job.user_id != user.id:
+        raise BatchJobNotFoundError()
+    return job
+
+
+async def batch_event_frames(job: BatchJob, after: int, media_type: str) -> AsyncGenerator[bytes, None]:
+    """Encodes a batch job's events; SSE events carry their position in the log as their ID, for resuming."""
+    position = after
+    async for event in job.subscribe(after):
+        position += 1
+        frame = encode_event(event, media_type)
+        yield with_event_id(frame, str(position)) if media_type == SSE_MEDIA_TYPE else frame
+
+
+# Route to answer a list of questions, each in a thread of its own
+@router.post("/batch")
+async def start_batch(
+    request: Request,
+    batch: BatchQuestions,
+    user: User = Depends(get_authenticated_user),
+    client: AsyncOpenAI = Depends(get_openai_client),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    stream_format: Optional[str] = Query(default=None, alias="format")
+) -> Response:
+    """
+    Starts a batch job that answers the questions concurrently, each in a new
+    thread, and runs to completion whether or not the client stays connected.
+
+    With Accept: text/event-stream or application/x-ndjson (or ?format=sse or
+    ?format=ndjson), the job's events are streamed back over this connection,
+    each tagged with the index of its question. Otherwise the job handle is
+    returned right away with status 202, for polling GET /chat/batch/{job_id}.
+
+    A user can have BATCH_MAX_JOBS_PER_USER jobs running at once; further jobs
+    are refused with status 429.
+    """
+    organization_ids = [role.organization_id for role in user.roles if role.organization_id is not None]
+    try:
+        job = batch_jobs.start(
+            client,
+            assistant_id,
+            batch.questions,
+            user_id=user.id,
+            organization_ids=organization_ids,
+            format_message=format_user_message,
+            file_url=file_download_url
         )
+    except BatchJobLimitExceeded as e:
+        logger.warning(f"Refused a batch job: {e}")
+        raise TooManyBatchJobsError()
+    logger.info(f"Started batch job {job.job_id} with {len(batch.questions)} questions for user {user.id}")
+
+    media_type = requested_stream_format(accept, stream_format)
+    if media_type is not None:
+        return event_stream_response(batch_event_frames(job, 0, media_type), accept_encoding, media_type)
+    return JSONResponse(
+        status_code=202,
+        content=job.snapshot(),
+        headers={"Location": str(request.url_for("read_batch", job_id=job.job_id))}
+    )
 
-        while True:
-            event: Union[AssistantStreamMetadata, str]
-            async for event in handle_assistant_stream(templates, logger, stream_manager, step_id):
-                if isinstance(event, AssistantStreamMetadata):
-                    # Use the helper methods from our class
-                    step_id = event.step_id
-                    if event.requires_tool_call():
-                        for tool_call in event.required_action.submit_tool_outputs.tool_calls:  # type: ignore
-                            if tool_call.type == "function":
-                                try:
-                                    args = json.loads(tool_call.function.arguments)
-                                    location = args.get("location", "Unknown")
-                                    dates_raw = args.get("dates", [datetime.today().strftime("%Y-%m-%d")])
-                                    dates = [
-                                        datetime.strptime(d, "%Y-%m-%d")
-                                        for d in dates_raw if isinstance(d, str)
-                                    ]
-                                except Exception as err:
-                                    logger.error(f"Failed to parse function arguments: {err}")
-                                    location = "Unknown"
-                                    dates = [datetime.today()]
-
-                                try:
-                                    weather_output: list = get_weather(location, dates)
-                                    logger.info(f"Weather output: {weather_output}")
-
-                                    # Render the weather widget
-                                    weather_widget_html = templates.get_template(
-                                        "chat/weather-widget.html"
-                                    ).render(
-                                        reports=weather_output
-                                    )
-
-                                    # Yield the rendered HTML
-                                    yield sse_format("toolOutput", weather_widget_html)
-
-                                    data_for_tool = {
-                                        "tool_outputs": {
-                                            "output": str(weather_output),
-                                            "tool_call_id": tool_call.id
-                                        },
-                                        "runId": event.get_run_id(),
-                                    }
-                                except Exception as err:
-                                    error_message = f"Failed to get weather output: {err}"
-                                    logger.error(error_message)
-                                    yield sse_format("toolOutput", error_message)
-                                    data_for_tool = {
-                                        "tool_outputs": {
-                                            "output": error_message,
-                                            "tool_call_id": tool_call.id
-                                        },
-                                        "runId": event.get_run_id(),
-                                    }
-
-                                # Afterwards, create a fresh stream_manager for the next iteration
-                                new_stream_manager = await post_tool_outputs(
-                                    client,
-                                    data_for_tool,
-                                    thread_id
-                                )
-                                stream_manager = new_stream_manager
-                                # proceed to rerun the loop
-                                break
-                    else:
-                        # No more tool calls needed; we're done streaming
-                        return
-                else:
-                    # Normal SSE events: yield them to the client
-                    yield str(event)
-
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
-    )
\ No newline at end of file
+
+@router.get("/batch/{job_id}")
+async def read_batch(job_id: str, user: User = Depends(get_authenticated_user)) -> Dict[str, Any]:
+    """Returns a batch job's status and the answers so far."""
+    return get_batch_job(job_id, user).snapshot()
+
+
+@router.get("/batch/{job_id}/events")
+async def stream_batch_events(
+    job_id: str,
+    user: User = Depends(get_authenticated_user),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    last_event_id: Optional[str] = Header(default=None),
+    stream_format: Optional[str] = Query(default=None, alias="format"),
+    after: int = Query(default=0, ge=0)
+) -> StreamingResponse:
+    """
+    Streams a batch job's events from the start, or after the event position
+    given by ?after or an SSE Last-Event-ID, until the job is done.
+    """
+    job = get_batch_job(job_id, user)
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+    media_type = requested_stream_format(accept, stream_format) or SSE_MEDIA_TYPE
+    return event_stream_response(batch_event_frames(job, after, media_type), accept_encoding, media_type)
+
+
+@router.delete("/batch/{job_id}")
+async def cancel_batch(job_id: str, user: User = Depends(get_authenticated_user)) -> Dict[str, Any]:
+    """Cancels a batch job, along with the runs of the questions being answered."""
+    job = get_batch_job(job_id, user)
+    job.cancel()
+    await job.wait()
+    return job.snapshot()
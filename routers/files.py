@@ -7,6 +7,7 @@ from fastapi.templating import Jinja2Templates
 from openai import AsyncOpenAI
 from exceptions.http_exceptions import OpenAIError
 from utils.chat.streaming import stream_file_content
+from utils.chat.client import get_openai_client
 from utils.core.dependencies import get_authenticated_user
 from utils.core.models import User
 
@@ -33,7 +34,7 @@ router = APIRouter(
 @router.get("/{file_id}/openai_content")
 async def download_openai_file(
     file_id: str = Path(..., description="The ID of the file stored in OpenAI"),
-    client: AsyncOpenAI = Depends(lambda: AsyncOpenAI())
+    client: AsyncOpenAI = Depends(get_openai_client)
 ) -> StreamingResponse:
     """This endpoint retrieves files created by the code interpreter"""
     try:
@@ -57,7 +58,7 @@ async def download_openai_file(
 async def get_file_content(
     file_id: str,
     user: User = Depends(get_authenticated_user),
-    client: AsyncOpenAI = Depends(lambda: AsyncOpenAI())
+    client: AsyncOpenAI = Depends(get_openai_client)
 ) -> StreamingResponse:
     """
     Streams file content from OpenAI API.
@@ -0,0 +1,28 @@
+import os
+import secrets
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+from utils.core.metrics import registry, CONTENT_TYPE
+import utils.chat.metrics  # noqa: F401 (registers the chat run metrics)
+
+load_dotenv(override=True)
+
+# Scrapers must send "Authorization: Bearer <METRICS_TOKEN>"; the endpoint is disabled without it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or ""
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", name="read_metrics")
+async def read_metrics(authorization: Optional[str] = Header(default=None)) -> Response:
+    """
+    Serves the in-process metrics in the Prometheus text exposition format.
+    Each worker process keeps its own metrics, so scrape every worker.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Metrics endpoint is disabled")
+    if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -25,6 +25,9 @@ function handleCustomSseEvents(evt) {
 	} else if (originalSSEEvent.type === 'textReplacement') {
 		evt.preventDefault();
 		processTextReplacement(originalSSEEvent);
+	} else if (originalSSEEvent.type === 'queued') {
+		evt.preventDefault();
+		processQueued(evt.target, originalSSEEvent);
 	}
 	// Other event types (messageCreated, toolCallCreated, etc.) will be handled by HTMX default swap
 }
@@ -51,6 +54,15 @@ function processTextDelta(sseEvent) {
 	renderMarkdown(targetElement, updatedMarkdown, markdownChunk); // Pass original chunk for fallback
 }
 
+function processQueued(runElement, sseEvent) {
+	// Each run component has its own status line, so earlier runs in the thread are left alone
+	const statusElement = runElement.querySelector(':scope > .queue-status');
+	if (!statusElement) {
+		return;
+	}
+	statusElement.outerHTML = sseEvent.data;
+}
+
 function processTextReplacement(sseEvent) {
 	const oobHTML = sseEvent.data;
 	const { targetElement, payload } = parseOobSwap(oobHTML, "textReplacement");
@@ -128,6 +140,46 @@ function escapeRegExp(string) {
 }
 
 // Extracted rendering logic
+function markdownToSafeHtml(markdown) {
+	const renderer = new marked.Renderer();
+	renderer.link = ({ href, title, text }) => {
+		const titleAttr = title ? ` title="${title}"` : '';
+		return `<a target="_blank" rel="noopener noreferrer" href="${href}"${titleAttr}>${text}</a>`;
+	};
+	const rawHtml = marked.parse(markdown, { renderer });
+	return DOMPurify.sanitize(rawHtml, {
+		USE_PROFILES: { html: true },
+		ADD_TAGS: ["a"],
+		ADD_ATTR: ["href", "target", "rel"],
+		ALLOWED_PROTOCOLS: ["http", "https", "mailto", "ftp"]
+	});
+}
+
+// Assistant messages loaded from the thread history arrive as escaped markdown text
+function renderHistoryMarkdown(root) {
+	if (typeof marked === 'undefined' || typeof DOMPurify === 'undefined') {
+		return;
+	}
+	root.querySelectorAll('.history-markdown').forEach((element) => {
+		element.classList.remove('history-markdown');
+		try {
+			element.innerHTML = markdownToSafeHtml(element.textContent);
+		} catch (e) {
+			console.error("Error processing markdown:", e);
+		}
+	});
+}
+
+htmx.onLoad((element) => {
+	const messagesContainer = document.getElementById('messages');
+	const isInitialLoad = element === document.body;
+	renderHistoryMarkdown(element);
+	// Rendering changes the height of the messages, so stay at the newest one on page load
+	if (isInitialLoad && messagesContainer) {
+		messagesContainer.scrollTop = messagesContainer.scrollHeight;
+	}
+});
+
 function renderMarkdown(targetElement, markdownToRender, fallbackChunkOnError) {
 	window._streamingMarkdown.set(targetElement, markdownToRender); 
 
@@ -137,19 +189,7 @@ function renderMarkdown(targetElement, markdownToRender, fallbackChunkOnError) {
 		return;
 	}
 	try {
-		const renderer = new marked.Renderer();
-		renderer.link = ({ href, title, text }) => {
-			const titleAttr = title ? ` title="${title}"` : '';
-			return `<a target="_blank" rel="noopener noreferrer" href="${href}"${titleAttr}>${text}</a>`;
-		};
-		const rawHtml = marked.parse(markdownToRender, { renderer });
-		const sanitizedHtml = DOMPurify.sanitize(rawHtml, {
-			USE_PROFILES: { html: true },
-			ADD_TAGS: ["a"],
-			ADD_ATTR: ["href", "target", "rel"],
-			ALLOWED_PROTOCOLS: ["http", "https", "mailto", "ftp"]
-		});
-		targetElement.innerHTML = sanitizedHtml;
+		targetElement.innerHTML = markdownToSafeHtml(markdownToRender);
 
 		const messagesContainer = document.getElementById('messages');
 		if (messagesContainer) {
@@ -0,0 +1,76 @@
+# test_chat.py
+
+import pytest
+from types import SimpleNamespace
+from typing import Any, Dict, Generator, List
+from fastapi.testclient import TestClient
+from utils.core.models import User
+from utils.chat.client import get_openai_client
+from main import app
+
+
+class FakeThreads:
+    """Records calls to the OpenAI threads API."""
+
+    def __init__(self) -> None:
+        self.created: List[Dict[str, Any]] = []
+
+    async def create(self, **kwargs: Any) -> SimpleNamespace:
+        self.created.append(kwargs)
+        return SimpleNamespace(id=f"thread_{len(self.created)}")
+
+    async def retrieve(self, thread_id: str) -> SimpleNamespace:
+        raise AssertionError(f"Unexpected retrieval of thread {thread_id}")
+
+
+@pytest.fixture
+def fake_threads() -> Generator[FakeThreads, None, None]:
+    threads = FakeThreads()
+    client = SimpleNamespace(beta=SimpleNamespace(threads=threads))
+    app.dependency_overrides[get_openai_client] = lambda: client
+    yield threads
+    app.dependency_overrides.pop(get_openai_client, None)
+
+
+def test_read_chat_does_not_create_a_thread(auth_client: TestClient, fake_threads: FakeThreads):
+    """Opening a new chat makes no OpenAI call, and the form posts the first message"""
+    response = auth_client.get(app.url_path_for("read_chat"))
+
+    assert response.status_code == 200
+    assert fake_threads.created == []
+    assert f'{app.url_path_for("send_first_message")}"' in response.text
+
+
+def test_first_message_creates_thread_owned_by_user(
+    auth_client: TestClient, test_user: User, fake_threads: FakeThreads
+):
+    """The first message creates the thread with it, owned by the sending user"""
+    response = auth_client.post(app.url_path_for("send_first_message"), data={"userInput": "Hello"})
+
+    assert response.status_code == 200
+    assert len(fake_threads.created) == 1
+    created = fake_threads.created[0]
+    assert created["metadata"] == {"user_id": str(test_user.id)}
+    assert created["messages"][0]["role"] == "user"
+    assert "Hello" in created["messages"][0]["content"]
+    assert response.headers["HX-Push-Url"] == f"{app.url_path_for('read_chat')}?thread_id=thread_1"
+
+
+def test_first_message_points_form_at_new_thread(auth_client: TestClient, fake_threads: FakeThreads):
+    """The response swaps in a chat form that posts follow-ups to the new thread"""
+    response = auth_client.post(app.url_path_for("send_first_message"), data={"userInput": "Hello"})
+
+    assert response.status_code == 200
+    assert 'id="chatForm"' in response.text
+    assert 'hx-swap-oob="true"' in response.text
+    assert f'{app.url_path_for("send_message", thread_id="thread_1")}"' in response.text
+
+
+def test_first_message_requires_authentication(unauth_client: TestClient, fake_threads: FakeThreads):
+    """Unauthenticated users cannot create threads"""
+    response = unauth_client.post(
+        app.url_path_for("send_first_message"), data={"userInput": "Hello"}, follow_redirects=False
+    )
+
+    assert response.status_code == 303
+    assert fake_threads.created == []
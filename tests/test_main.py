@@ -0,0 +1,22 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from openai import AsyncOpenAI
+import main
+
+
+def test_lifespan_creates_and_closes_the_openai_client(monkeypatch: pytest.MonkeyPatch):
+    """The lifespan creates the shared OpenAI client on startup and closes it on shutdown"""
+    monkeypatch.setattr(main, "set_up_db", lambda: None)
+    monkeypatch.setattr(main, "CITATION_INDEX_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(main.citation_index, "refresh", lambda: None)
+    app = FastAPI()
+
+    async def run() -> AsyncOpenAI:
+        async with main.lifespan(app):
+            client = app.state.openai_client
+            assert isinstance(client, AsyncOpenAI)
+            assert not client.is_closed()
+        return client
+
+    assert asyncio.run(run()).is_closed()
@@ -0,0 +1,156 @@
+import asyncio
+from typing import Dict, List
+import pytest
+from utils.chat.admission import AdmissionController, AdmissionLimits, AdmissionRejected
+
+
+def limits(**overrides: float) -> AdmissionLimits:
+    values: Dict[str, float] = dict(
+        max_runs=0, max_runs_per_organization=0, max_runs_per_user=0, max_queue=0, timeout_seconds=0,
+        max_batch_runs_per_user=0
+    )
+    values.update(overrides)
+    return AdmissionLimits(**values)  # type: ignore[arg-type]
+
+
+def test_admits_up_to_the_per_user_limit():
+    """A user's runs beyond their limit wait, while other users are admitted"""
+    controller = AdmissionController(limits(max_runs_per_user=1))
+    first = controller.enqueue(1, [10])
+    second = controller.enqueue(1, [10])
+    other_user = controller.enqueue(2, [10])
+
+    assert first.admitted and not second.admitted and other_user.admitted
+    assert controller.position(second) == 1
+
+    controller.release(first)
+    assert second.admitted
+    assert controller.active == 2 and controller.queued == 0
+
+
+def test_batch_runs_do_not_take_interactive_slots():
+    """A user's batch runs have their own per-user limit and queue, so their interactive runs are still admitted"""
+    controller = AdmissionController(limits(max_runs_per_user=1, max_batch_runs_per_user=2))
+    batch = [controller.enqueue(1, [10], batch=True) for _ in range(3)]
+    assert [ticket.admitted for ticket in batch] == [True, True, False]
+
+    interactive = controller.enqueue(1, [10])
+    assert interactive.admitted
+    assert not controller.enqueue(1, [10]).admitted
+    assert controller.stats()["active"] == 3 and controller.stats()["active_batch"] == 2
+
+    controller.release(batch[0])
+    assert batch[2].admitted
+
+
+def test_queued_batch_run_is_admitted_once_and_leaves_the_queue():
+    """A batch run queued behind its user's full batch lane is admitted once the lane frees, and no slot leaks"""
+    controller = AdmissionController(limits(max_batch_runs_per_user=1))
+    first = controller.enqueue(1, [10], batch=True)
+    second = controller.enqueue(1, [10], batch=True)
+    assert first.admitted and not second.admitted
+    assert controller.position(second) == 1
+
+    controller.release(first)
+    assert second.admitted and controller.queued == 0
+    assert controller.stats()["admitted_after_queueing"] == 1
+
+    controller.release(second)
+    assert controller.active == 0 and controller.queued == 0
+    assert controller.enqueue(2, [10]).admitted and controller.stats()["admitted_immediately"] == 2
+
+
+def test_organization_limit_applies_to_every_organization_of_the_user():
+    """A user in two organizations is held back if either of them is at its limit"""
+    controller = AdmissionController(limits(max_runs_per_organization=1))
+    controller.enqueue(1, [10])
+    assert not controller.enqueue(2, [20, 10]).admitted
+    assert controller.enqueue(3, [20]).admitted
+
+
+def test_queue_is_served_round_robin_across_organizations():
+    """A busy organization's backlog does not starve an organization that queued later"""
+    controller = AdmissionController(limits(max_runs=1))
+    running = controller.enqueue(0, [])
+    busy = [controller.enqueue(user_id, [10]) for user_id in range(1, 4)]
+    quiet = controller.enqueue(9, [20])
+
+    # Round-robin positions: busy[0], quiet, busy[1], busy[2]
+    assert [controller.position(ticket) for ticket in busy] == [1, 3, 4]
+    assert controller.position(quiet) == 2
+
+    order: List[int] = []
+    current = running
+    for _ in range(4):
+        controller.release(current)
+        current = next(ticket for ticket in (*busy, quiet) if ticket.admitted and not ticket.released)
+        order.append(current.user_id or 0)
+    assert order == [1, 9, 2, 3]
+
+
+def test_raising_limits_at_runtime_admits_waiting_runs():
+    """Waiting runs are admitted as soon as the limit they wait on is raised"""
+    controller = AdmissionController(limits(max_runs=1))
+    controller.enqueue(1, [])
+    waiting = controller.enqueue(2, [])
+    assert not waiting.admitted
+
+    controller.configure(max_runs=2)
+    assert waiting.admitted
+
+
+def test_full_queue_rejects_new_runs():
+    """Runs that find the queue full are turned away without waiting"""
+    controller = AdmissionController(limits(max_runs=1, max_queue=1))
+    controller.enqueue(1, [])
+    controller.enqueue(2, [])
+    rejected = controller.enqueue(3, [])
+
+    async def wait() -> None:
+        async for _ in controller.wait(rejected):
+            pass
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(wait())
+    assert controller.rejected == 1 and controller.queued == 1
+
+
+def test_wait_reports_positions_until_admitted():
+    """A waiting run sees its position move up, and the wait ends when it is admitted"""
+    async def run() -> List[int]:
+        controller = AdmissionController(limits(max_runs=1))
+        running = controller.enqueue(1, [])
+        ahead = controller.enqueue(2, [])
+        ticket = controller.enqueue(3, [])
+        positions: List[int] = []
+
+        async def release_later() -> None:
+            await asyncio.sleep(0.01)
+            controller.release(running)
+            await asyncio.sleep(0.01)
+            controller.release(ahead)
+
+        releaser = asyncio.create_task(release_later())
+        async for position in controller.wait(ticket):
+            positions.append(position)
+        await releaser
+        assert ticket.admitted
+        return positions
+
+    assert asyncio.run(run()) == [2, 1]
+
+
+def test_wait_times_out_and_leaves_the_queue():
+    """A run that waits longer than the timeout gives up its place in the queue"""
+    async def run() -> AdmissionController:
+        controller = AdmissionController(limits(max_runs=1, timeout_seconds=0.01))
+        controller.enqueue(1, [])
+        ticket = controller.enqueue(2, [])
+        with pytest.raises(AdmissionRejected):
+            async for _ in controller.wait(ticket):
+                pass
+        controller.release(ticket)
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.timed_out == 1 and controller.queued == 0 and controller.active == 1
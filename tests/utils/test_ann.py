@@ -0,0 +1,62 @@
+from pathlib import Path
+import numpy as np
+from utils.chat.ann import IVFIndex, recall_at_k
+from utils.chat.vectors import VectorIndex
+
+
+def clustered_index(rows: int = 2000, dimensions: int = 32, seed: int = 0) -> VectorIndex:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dimensions))
+    vectors = centers[rng.integers(0, 20, rows)] + rng.normal(size=(rows, dimensions)) * 0.5
+    return VectorIndex("m", [f"node_{row}" for row in range(rows)], vectors)
+
+
+def test_recall_at_k_counts_exact_neighbours_found():
+    """Recall is the share of exact neighbours returned, whatever their order"""
+    assert recall_at_k([["a", "b"], ["c", "x"]], [["b", "a"], ["c", "d"]]) == 0.75
+
+
+def test_probing_every_cluster_is_exact_search():
+    """With nprobe = nlist every member is scored, so results match exact search"""
+    exact = clustered_index()
+    ivf = IVFIndex.build(exact, nlist=16, iterations=5)
+    queries = exact.matrix[:20] + 0.1
+    assert [[node for node, _ in result] for result in ivf.search_many(queries, k=5, nprobe=16)] == \
+        [[node for node, _ in result] for result in exact.search_many(queries, k=5)]
+    report = ivf.evaluate(exact, queries, k=5, nprobes=(1, 16))
+    assert report[0]["nprobe"] == 0 and report[-1]["recall"] == 1.0 and report[1]["recall"] <= 1.0
+
+
+def test_saved_index_loads_by_memory_map(tmp_path: Path):
+    """A saved index maps its arrays read-only and returns the same results"""
+    exact = clustered_index()
+    ivf = IVFIndex.build(exact, nlist=16, iterations=5)
+    ivf.save(tmp_path / "ann")
+    loaded = IVFIndex.load(tmp_path / "ann")
+    assert isinstance(loaded.vectors, np.memmap) and loaded.codes is None
+    assert loaded.search(exact.matrix[3], k=5, nprobe=2) == ivf.search(exact.matrix[3], k=5, nprobe=2)
+
+
+def test_product_quantized_index_stores_codes_and_finds_neighbours(tmp_path: Path):
+    """With PQ each member is stored as one byte per subvector, and approximate scores stay close"""
+    exact = clustered_index()
+    ivf = IVFIndex.build(exact, nlist=16, pq_subvectors=8, iterations=5)
+    ivf.save(tmp_path / "ann")
+    loaded = IVFIndex.load(tmp_path / "ann")
+    assert loaded.vectors is None and loaded.codes is not None and loaded.codes.shape == (2000, 8)
+    assert loaded.codes.dtype == np.uint8
+
+    queries = exact.matrix[:50]
+    found = [[node for node, _ in result] for result in loaded.search_many(queries, k=10, nprobe=4)]
+    expected = [[node for node, _ in result] for result in exact.search_many(queries, k=10)]
+    assert recall_at_k(found, expected) > 0.3
+    assert abs(loaded.search(exact.matrix[7], k=1, nprobe=4)[0][1] - 1) < 0.2
+
+
+def test_queries_with_few_candidates_are_padded():
+    """A query whose probed clusters hold fewer than k members gets only the members that exist"""
+    exact = VectorIndex("m", ["a", "b", "c"], np.eye(3))
+    ivf = IVFIndex.build(exact, nlist=3, iterations=2)
+    rows, scores = ivf.search_rows(np.eye(3)[:1], k=3, nprobe=1)
+    assert rows[0].tolist()[1:] == [-1, -1] and np.isinf(scores[0, 1:]).all()
+    assert ivf.search([1, 0, 0], k=3, nprobe=1) == [("a", 1.0)]
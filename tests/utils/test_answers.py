@@ -0,0 +1,189 @@
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List
+import pytest
+from pydantic import BaseModel
+from utils.chat.answers import (
+    NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, RunEmitter, encode_event, requested_stream_format, stream_answer, stream_run
+)
+from utils.chat.citations import citation_index
+from utils.chat.recording import Recording, ReplayClient, StreamRecorder, parse_event
+from utils.chat.tools import ToolResult, tool_registry
+
+
+class SlowEchoArguments(BaseModel):
+    text: str
+
+
+def run_event(event: str, **fields: Any) -> Dict[str, Any]:
+    status = "queued" if event == "created" else event
+    return {"event": f"thread.run.{event}", "data": {
+        "id": "run_1", "object": "thread.run", "assistant_id": "asst_1", "created_at": 0, "instructions": "",
+        "model": "gpt-4o", "parallel_tool_calls": True, "status": status, "thread_id": "thread_1", "tools": [],
+        **fields
+    }}
+
+
+def delta(text: str, annotations: List[Dict[str, Any]] = []) -> Dict[str, Any]:
+    return {"event": "thread.message.delta", "data": {
+        "id": "msg_1", "object": "thread.message.delta",
+        "delta": {"content": [{"index": 0, "type": "text", "text": {"value": text, "annotations": annotations}}]}
+    }}
+
+
+def answer(segments: List[List[Dict[str, Any]]]) -> tuple[List[Dict[str, Any]], ReplayClient]:
+    client = ReplayClient(Recording([[parse_event(record) for record in segment] for segment in segments]))
+
+    async def run() -> List[Dict[str, Any]]:
+        return [event async for event in stream_answer(client, "thread_1", "asst_1", lambda file_id: f"/files/{file_id}")]  # type: ignore[arg-type]
+
+    return asyncio.run(run()), client
+
+
+def test_answer_is_streamed_as_text_citation_and_file_events():
+    """Citation markers are rewritten in the text and reported as citations, and sandbox files as file IDs"""
+    citation_index.update({"dl_001": ("https://example.org/dl_001", "WBG, \"CCDR\", 2022")})
+    events, _ = answer([[
+        run_event("created"),
+        delta("Rainfall is falling【4:0†dl_"),
+        delta("001.pdf】. See "),
+        delta("sandbox:/mnt/data/a.csv", [{
+            "index": 0, "type": "file_path", "text": "sandbox:/mnt/data/a.csv",
+            "start_index": 0, "end_index": 23, "file_path": {"file_id": "file_1"}
+        }]),
+        run_event("completed"),
+    ]])
+
+    text = "".join(event["text"] for event in events if event["type"] == "text")
+    assert text == 'Rainfall is falling ([WBG, "CCDR", 2022](https://example.org/dl_001)). See sandbox:/mnt/data/a.csv'
+    assert {"type": "citation", "message_id": "msg_1", "document_id": "dl_001",
+            "text": 'WBG, "CCDR", 2022', "url": "https://example.org/dl_001"} in events
+    assert {"type": "file", "message_id": "msg_1", "file_id": "file_1",
+            "url": "/files/file_1", "replaces": "sandbox:/mnt/data/a.csv"} in events
+    assert events[0] == {"type": "run", "run_id": "run_1"} and events[-1] == {"type": "done", "outcome": "completed"}
+
+
+def test_tool_calls_are_executed_and_reported():
+    """Requested function calls are executed, reported with their outcome, and the run continues"""
+    required_action = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [
+        {"id": "call_1", "type": "function", "function": {"name": "no_such_tool", "arguments": "{}"}}
+    ]}}
+    events, client = answer([
+        [run_event("created"), run_event("requires_action", required_action=required_action)],
+        [delta("Done"), run_event("completed")],
+    ])
+
+    tool_call = next(event for event in events if event["type"] == "tool_call")
+    assert tool_call["name"] == "no_such_tool" and tool_call["outcome"] == "unknown_tool"
+    assert client.runs.submitted_tool_outputs[0][0]["tool_call_id"] == "call_1"
+    assert events[-2:] == [{"type": "text", "message_id": "msg_1", "text": "Done"}, {"type": "done", "outcome": "completed"}]
+
+
+class TextEmitter(RunEmitter[str]):
+    """Emits only the text of a run, and its end."""
+
+    def text(self, message_id: str, text: str) -> List[str]:
+        return [text]
+
+    def done(self, outcome: str) -> List[str]:
+        return [f"<{outcome}>"]
+
+
+def test_run_loop_drives_any_emitter():
+    """The run loop is shared: another emitter sees every text block of a delta, and the run's end"""
+    two_blocks = {"event": "thread.message.delta", "data": {
+        "id": "msg_1", "object": "thread.message.delta", "delta": {"content": [
+            {"index": 0, "type": "text", "text": {"value": "one ", "annotations": []}},
+            {"index": 1, "type": "text", "text": {"value": "two", "annotations": []}},
+        ]}
+    }}
+    client = ReplayClient(Recording([[parse_event(record) for record in (run_event("created"), two_blocks, run_event("completed"))]]))
+
+    async def run() -> List[str]:
+        return [item async for item in stream_run(client, "thread_1", "asst_1", TextEmitter())]  # type: ignore[arg-type]
+
+    assert asyncio.run(run()) == ["one ", "two", "<completed>"]
+
+
+def test_structured_events_encode_as_ndjson_or_sse():
+    """Events are one JSON object per line in NDJSON, or an SSE message named after the event type"""
+    event = {"type": "text", "message_id": "msg_1", "text": "a\nb"}
+    line = encode_event(event, NDJSON_MEDIA_TYPE)
+    assert line.endswith(b"\n") and line.count(b"\n") == 1 and json.loads(line) == event
+    assert encode_event(event, SSE_MEDIA_TYPE) == b'event: text\ndata: {"type":"text","message_id":"msg_1","text":"a\\nb"}\n\n'
+
+
+def test_stream_format_is_chosen_by_query_parameter_then_accept_header():
+    """?format= takes precedence over the Accept header, and neither means no structured stream"""
+    assert requested_stream_format("application/x-ndjson") == NDJSON_MEDIA_TYPE
+    assert requested_stream_format("text/event-stream", "ndjson") == NDJSON_MEDIA_TYPE
+    assert requested_stream_format("application/x-ndjson", "sse") == SSE_MEDIA_TYPE
+    assert requested_stream_format("text/html,*/*") is None
+
+
+def test_parallel_tool_calls_run_concurrently_and_are_submitted_together(monkeypatch: pytest.MonkeyPatch):
+    """Every tool call of a run gets an output, even one whose executor raises, and all go in one submission"""
+    @tool_registry.register("test_slow_echo", SlowEchoArguments)
+    async def slow_echo(text: str) -> str:
+        await asyncio.sleep(0.2)
+        return text
+
+    execute = tool_registry.execute
+
+    async def execute_or_raise(tool_call: Any, render_html: bool = True) -> ToolResult:
+        if tool_call.function.name == "test_explode":
+            raise RuntimeError("boom")
+        return await execute(tool_call, render_html)
+
+    monkeypatch.setattr(tool_registry, "execute", execute_or_raise)
+    required_action = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [
+        {"id": "call_1", "type": "function", "function": {"name": "test_slow_echo", "arguments": '{"text": "a"}'}},
+        {"id": "call_2", "type": "function", "function": {"name": "test_slow_echo", "arguments": '{"text": "b"}'}},
+        {"id": "call_3", "type": "function", "function": {"name": "test_explode", "arguments": "{}"}},
+    ]}}
+    start = time.monotonic()
+    events, client = answer([
+        [run_event("created"), run_event("requires_action", required_action=required_action)],
+        [delta("Done"), run_event("completed")],
+    ])
+
+    assert time.monotonic() - start < 0.35
+    assert client.runs.submitted_tool_outputs == [[
+        {"output": "a", "tool_call_id": "call_1"},
+        {"output": "b", "tool_call_id": "call_2"},
+        {"output": "Failed to get test_explode output: boom", "tool_call_id": "call_3"},
+    ]]
+    assert [event["outcome"] for event in events if event["type"] == "tool_call"] == ["ok", "ok", "error"]
+    assert events[-1] == {"type": "done", "outcome": "completed"}
+
+
+def test_recording_is_saved_once_when_the_run_ends(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Every segment of a run with a tool call hop is recorded, in a single write at the end"""
+    required_action = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [
+        {"id": "call_1", "type": "function", "function": {"name": "no_such_tool", "arguments": "{}"}}
+    ]}}
+    segments = [
+        [run_event("created"), run_event("requires_action", required_action=required_action)],
+        [delta("Done"), run_event("completed")],
+    ]
+    client = ReplayClient(Recording([[parse_event(record) for record in segment] for segment in segments]))
+    recorder = StreamRecorder(tmp_path / "run.jsonl.gz")
+    save = StreamRecorder.save
+    saves: List[int] = []
+
+    def counting_save(self: StreamRecorder) -> None:
+        saves.append(len(self._records))
+        save(self)
+
+    monkeypatch.setattr(StreamRecorder, "save", counting_save)
+
+    async def run() -> None:
+        async for _ in stream_answer(client, "thread_1", "asst_1", recorder=recorder):  # type: ignore[arg-type]
+            pass
+
+    asyncio.run(run())
+
+    assert saves == [4]
+    assert [len(segment) for segment in Recording.load(recorder.path).segments] == [2, 2]
@@ -0,0 +1,165 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from pydantic import TypeAdapter
+from openai.types.beta import AssistantStreamEvent
+from utils.chat.admission import AdmissionController, AdmissionLimits
+import pytest
+from utils.chat.batch import BatchJob, BatchJobLimitExceeded, BatchJobRegistry
+
+EVENTS: TypeAdapter = TypeAdapter(AssistantStreamEvent)
+
+
+def make_run_events(run_id: str, text: str, status: str = "completed") -> List[Any]:
+    run = {
+        "id": run_id, "object": "thread.run", "assistant_id": "asst_1", "created_at": 0, "instructions": "",
+        "model": "gpt-4o", "parallel_tool_calls": True, "status": status, "thread_id": "thread_1", "tools": [],
+    }
+    message = {
+        "id": f"msg_{run_id}", "object": "thread.message", "created_at": 0, "thread_id": "thread_1",
+        "role": "assistant", "status": "in_progress", "content": [],
+    }
+    delta = {"id": f"msg_{run_id}", "object": "thread.message.delta", "delta": {
+        "content": [{"index": 0, "type": "text", "text": {"value": text}}]
+    }}
+    return [EVENTS.validate_python(event) for event in (
+        {"event": "thread.run.created", "data": {**run, "status": "queued"}},
+        {"event": "thread.message.created", "data": message},
+        {"event": "thread.message.delta", "data": delta},
+        {"event": f"thread.run.{status}", "data": run},
+    )]
+
+
+class FakeStream:
+    def __init__(self, events: List[Any], delay: float):
+        self.events = events
+        self.delay = delay
+
+    async def __aenter__(self) -> "FakeStream":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+    async def __aiter__(self) -> AsyncGenerator[Any, None]:
+        for event in self.events:
+            await asyncio.sleep(self.delay)
+            yield event
+
+
+class FakeClient:
+    """Answers each question with its own text, echoing the thread's first message."""
+
+    def __init__(self, delay: float = 0, failing: str = ""):
+        self.delay = delay
+        self.failing = failing
+        self.questions: Dict[str, str] = {}
+        self.cancelled: List[str] = []
+        runs = SimpleNamespace(stream=self.stream, cancel=self.cancel)
+        self.beta = SimpleNamespace(threads=SimpleNamespace(create=self.create, runs=runs))
+
+    async def create(self, messages: List[Dict[str, str]], metadata: Optional[Dict[str, str]] = None) -> SimpleNamespace:
+        thread_id = f"thread_{len(self.questions)}"
+        self.questions[thread_id] = messages[0]["content"]
+        return SimpleNamespace(id=thread_id)
+
+    def stream(self, thread_id: str, assistant_id: str, parallel_tool_calls: bool) -> FakeStream:
+        question = self.questions[thread_id]
+        status = "failed" if question == self.failing else "completed"
+        return FakeStream(make_run_events(f"run_{thread_id}", f"answer to {question}", status), self.delay)
+
+    async def cancel(self, run_id: str, thread_id: str) -> None:
+        self.cancelled.append(run_id)
+
+
+def unlimited() -> AdmissionController:
+    return AdmissionController(AdmissionLimits(0, 0, 0, 0, 0, 0))
+
+
+def start_job(client: Any, questions: List[str], **kwargs: Any) -> BatchJob:
+    return BatchJob(client, "asst_1", questions, **kwargs)
+
+
+def test_batch_answers_every_question_tagged_by_index():
+    """Each question is answered in its own thread, and results are tagged with the question's index"""
+    async def run() -> tuple[BatchJob, List[Dict[str, Any]]]:
+        job = start_job(FakeClient(), ["a", "b", "c"], format_message=str.upper, controller=unlimited())
+        events = [event async for event in job.subscribe()]
+        return job, events
+
+    job, events = asyncio.run(run())
+    answers = {event["index"]: event["text"] for event in events if event["type"] == "answer"}
+    assert answers == {0: "answer to A", 1: "answer to B", 2: "answer to C"}
+    assert events[0]["type"] == "job" and events[-1] == {"type": "done", "status": "completed", "completed": 3, "failed": 0}
+    assert len({question.thread_id for question in job.questions}) == 3
+
+
+def test_batch_concurrency_is_bounded_by_the_per_user_batch_run_limit():
+    """A batch never holds more admission slots than its user may use for batch runs at once"""
+    async def run() -> int:
+        controller = AdmissionController(AdmissionLimits(0, 0, 1, 0, 0, max_batch_runs_per_user=2))
+        job = start_job(FakeClient(delay=0.001), list("abcdef"), user_id=1, concurrency=5, controller=controller)
+        peak = 0
+        while not job.done:
+            peak = max(peak, controller.active)
+            await asyncio.sleep(0.001)
+        return peak
+
+    assert asyncio.run(run()) == 2
+
+
+def test_failed_runs_are_reported_without_stopping_the_batch():
+    """A question whose run fails is marked failed, and the other questions are still answered"""
+    async def run() -> Dict[str, Any]:
+        job = start_job(FakeClient(failing="b"), ["a", "b"], controller=unlimited())
+        await job.wait()
+        return job.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["status"] == "completed" and snapshot["completed"] == 1 and snapshot["failed"] == 1
+    assert [question["outcome"] for question in snapshot["questions"]] == ["completed", "failed"]
+
+
+def test_subscribers_can_leave_and_resume_from_an_event_position():
+    """The job keeps running without subscribers, and a new subscriber replays the events after its position"""
+    async def run() -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        registry = BatchJobRegistry()
+        job = registry.start(FakeClient(delay=0.001), "asst_1", ["a", "b"], controller=unlimited())
+        async for first in job.subscribe():
+            break
+        await job.wait()
+        resumed = [event async for event in registry.get(job.job_id).subscribe(after=1)]  # type: ignore[union-attr]
+        return [first], resumed
+
+    first, resumed = asyncio.run(run())
+    assert first[0]["type"] == "job"
+    assert [event["type"] for event in resumed].count("answer") == 2 and resumed[-1]["type"] == "done"
+
+
+def test_cancelling_a_batch_cancels_runs_in_flight():
+    """Cancelling a job stops its questions and cancels their runs on the API side"""
+    async def run() -> tuple[BatchJob, FakeClient]:
+        client = FakeClient(delay=0.05)
+        job = start_job(client, ["a"], controller=unlimited())
+        await asyncio.sleep(0.08)
+        job.cancel()
+        await job.wait()
+        return job, client
+
+    job, client = asyncio.run(run())
+    assert job.status == "cancelled" and job.events[-1]["status"] == "cancelled"
+    assert client.cancelled == ["run_thread_0"]
+
+
+def test_running_jobs_per_user_are_limited():
+    """A user at their limit of running jobs cannot start another until one finishes"""
+    async def run() -> None:
+        registry = BatchJobRegistry(max_jobs_per_user=1)
+        job = registry.start(FakeClient(delay=0.001), "asst_1", ["a"], user_id=1, controller=unlimited())
+        with pytest.raises(BatchJobLimitExceeded):
+            registry.start(FakeClient(), "asst_1", ["b"], user_id=1, controller=unlimited())
+        registry.start(FakeClient(), "asst_1", ["c"], user_id=2, controller=unlimited())
+        await job.wait()
+        registry.start(FakeClient(), "asst_1", ["d"], user_id=1, controller=unlimited())
+
+    asyncio.run(run())
@@ -0,0 +1,128 @@
+import asyncio
+from typing import AsyncGenerator, List, Union
+from utils.chat.sse import SSEDelta, encode_sse
+from utils.chat.cache import AnswerCache, CachedAnswer, normalize_question, organization_scope
+
+Event = Union[SSEDelta, bytes]
+
+
+async def events_from(items: List[Event]) -> AsyncGenerator[Event, None]:
+    for item in items:
+        yield item
+
+
+async def collect(events: AsyncGenerator[Event, None]) -> List[Event]:
+    return [event async for event in events]
+
+
+def completed_run(step_id: str = "msg_1") -> List[Event]:
+    return [
+        encode_sse("messageCreated", f'<div id="step-{step_id}"></div>'),
+        SSEDelta("textDelta", step_id, "Kenya "),
+        SSEDelta("textDelta", step_id, "adapts."),
+        encode_sse("endStream", "DONE")
+    ]
+
+
+def test_normalize_question():
+    """Case, punctuation and whitespace differences map to the same question"""
+    assert normalize_question("  What are Kenya's key adaptation priorities?? ") == (
+        normalize_question("what are kenya s KEY adaptation priorities")
+    )
+
+
+def test_key_is_scoped_by_organization_and_assistant():
+    """The same question gets different keys in different scopes"""
+    key = AnswerCache.make_key(organization_scope([1], 7), "asst_1", "Hello?")
+    assert key == AnswerCache.make_key(organization_scope([1, None], 8), "asst_1", "hello")
+    assert key != AnswerCache.make_key(organization_scope([2], 7), "asst_1", "hello")
+    assert key != AnswerCache.make_key(organization_scope([1], 7), "asst_2", "hello")
+
+
+def test_users_without_an_organization_do_not_share_answers():
+    """Each user without an organization gets a scope of their own"""
+    assert organization_scope([None], 1) != organization_scope([], 2)
+    assert organization_scope([], 1) == organization_scope([None], 1)
+    assert organization_scope([], 1) != organization_scope([1], 1)
+
+
+def test_near_duplicate_questions_share_an_entry():
+    """Above the similarity threshold, a rephrased question in the same scope is answered from the cache"""
+    cache = AnswerCache(enabled=True, min_similarity=0.9)
+    key = AnswerCache.make_key("1", "asst_1", "What are Kenya's key adaptation priorities?")
+    asyncio.run(collect(cache.record(key, events_from(completed_run()))))
+
+    rephrased = "Tell me the key adaptation priorities of Kenya"
+    assert cache.get(AnswerCache.make_key("1", "asst_1", rephrased)) is not None
+    assert cache.get(AnswerCache.make_key("2", "asst_1", rephrased)) is None
+    assert cache.get(AnswerCache.make_key("1", "asst_1", "What are Ghana's key adaptation priorities?")) is None
+    assert cache.stats()["near_hits"] == 1
+
+    exact = AnswerCache(enabled=True)
+    asyncio.run(collect(exact.record(key, events_from(completed_run()))))
+    assert exact.get(AnswerCache.make_key("1", "asst_1", rephrased)) is None
+
+
+def test_record_stores_completed_run():
+    """A completed run is stored and counted as a hit when looked up"""
+    cache = AnswerCache(enabled=True)
+    events = asyncio.run(collect(cache.record("k", events_from(completed_run()))))
+
+    assert events == completed_run()
+    entry = cache.get("k")
+    assert entry is not None and entry.answer_text == "Kenya adapts."
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_runs_with_function_tools_are_not_cached():
+    """Answers that depend on a function tool's output are never stored"""
+    cache = AnswerCache(enabled=True)
+    run = completed_run()
+    run.insert(1, encode_sse("toolOutput", "<p>Sunny</p>"))
+    asyncio.run(collect(cache.record("k", events_from(run))))
+    assert len(cache) == 0
+
+
+def test_lru_eviction_and_ttl():
+    """The least recently used entry is evicted when full, and expired entries are misses"""
+    cache = AnswerCache(max_entries=2, enabled=True)
+    for key in ("a", "b"):
+        cache.put(key, CachedAnswer([], key, []))
+    cache.get("a")
+    cache.put("c", CachedAnswer([], "c", []))
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.evictions == 1
+
+    expiring = AnswerCache(ttl_seconds=0, enabled=True)
+    expiring.put("a", CachedAnswer([], "a", []))
+    assert expiring.get("a") is None
+
+
+def test_replay_renames_step_ids():
+    """Replayed events target fresh step IDs so repeated answers don't collide"""
+    cache = AnswerCache(enabled=True)
+    asyncio.run(collect(cache.record("k", events_from(completed_run()))))
+    entry = cache.get("k")
+    assert entry is not None
+
+    replayed = asyncio.run(collect(AnswerCache.replay(entry)))
+    delta = replayed[1]
+    assert isinstance(delta, SSEDelta) and delta.step_id.startswith("msg_1-")
+    assert f'id="step-{delta.step_id}"'.encode() in replayed[0]
+
+
+def test_pending_keys_are_bounded_and_expire():
+    """Keys of first messages whose run is never streamed do not accumulate"""
+    cache = AnswerCache(max_entries=2, pending_ttl_seconds=60, enabled=True)
+    for index in range(5):
+        cache.expect(f"thread_{index}", f"key_{index}")
+    assert cache.stats()["pending"] == 2
+    assert cache.take_pending("thread_0") is None
+    assert cache.take_pending("thread_4") == "key_4"
+    assert cache.take_pending("thread_4") is None
+
+    cache.pending_ttl_seconds = 0
+    assert cache.take_pending("thread_3") is None
+    cache.expect("thread_5", "key_5")
+    assert cache.stats()["pending"] == 1
@@ -0,0 +1,91 @@
+from datetime import date
+from typing import List, Optional
+from sqlmodel import Session
+from utils.chat.citations import CitationIndex, CitationRewriter
+from utils.chat.models import Document, DocumentType, Publication
+
+
+def resolve(document_id: str) -> Optional[str]:
+    return {"dl_001": " ([WBG, \"Kenya CCDR\", 2023](https://example.com/dl_001))"}.get(document_id)
+
+
+def rewrite(deltas: List[str], rewriter: Optional[CitationRewriter] = None) -> List[str]:
+    rewriter = rewriter or CitationRewriter(resolve)
+    return [rewriter.feed(delta) for delta in deltas] + [rewriter.flush()]
+
+
+def test_marker_in_single_delta():
+    """A complete marker is replaced by its citation"""
+    assert "".join(rewrite(["Adaptation【4:0†dl_001.pdf】 matters."])) == (
+        "Adaptation ([WBG, \"Kenya CCDR\", 2023](https://example.com/dl_001)) matters."
+    )
+
+
+def test_marker_split_across_deltas():
+    """Partial markers are held back until they close, then emitted immediately"""
+    outputs = rewrite(["Adaptation【4", ":0†dl_", "001.pdf", "】 matters."])
+    assert outputs[0] == "Adaptation"
+    assert outputs[1] == "" and outputs[2] == ""
+    assert "".join(outputs) == "Adaptation ([WBG, \"Kenya CCDR\", 2023](https://example.com/dl_001)) matters."
+
+
+def test_text_without_markers_passes_through():
+    """Deltas without markers are returned unchanged"""
+    assert rewrite(["Hello ", "world"]) == ["Hello ", "world", ""]
+
+
+def test_unknown_document_keeps_marker():
+    """Markers for unknown documents are kept as they are"""
+    assert "".join(rewrite(["See 【4:1†", "dl_999.pdf】."])) == "See 【4:1†dl_999.pdf】."
+
+
+def test_unclosed_marker_is_flushed():
+    """A marker that never closes is emitted as text at the end of the message"""
+    assert "".join(rewrite(["An open 【bracket", " and more"])) == "An open 【bracket and more"
+
+
+def test_stray_bracket_before_marker():
+    """A literal opening bracket does not swallow a following marker"""
+    assert "".join(rewrite(["【note ", "then【4:0†dl_001.pdf】"])) == (
+        "【note then ([WBG, \"Kenya CCDR\", 2023](https://example.com/dl_001))"
+    )
+
+
+def test_overlong_marker_is_released():
+    """Text after an opening bracket is released once it exceeds the marker length limit"""
+    rewriter = CitationRewriter(resolve, max_marker_length=8)
+    assert rewriter.feed("【") == ""
+    assert rewriter.feed("this is not a marker") == "【this is not a marker"
+    assert rewriter.flush() == ""
+
+
+def test_citation_index_loads_from_database(session: Session):
+    """The index maps document IDs to their file URL and publication citation"""
+    publication = Publication(
+        id="P000TEST", title="Kenya CCDR", citation="WBG 2023", authors="WBG",
+        publication_date=date(2023, 11, 1), source="World Bank",
+        source_url="https://example.com/source", uri="https://example.com/uri"
+    )
+    document = Document(
+        id="dl_test", publication_id=publication.id, type=DocumentType.MAIN,
+        download_url="https://example.com/dl_test", description="Main report",
+        mime_type="application/pdf", charset="binary",
+        storage_url="https://storage.example.com/dl_test.pdf"
+    )
+    session.add(publication)
+    session.add(document)
+    session.commit()
+
+    try:
+        index = CitationIndex()
+        assert index.load(session) is True
+        assert index.get("dl_test") == ("https://storage.example.com/dl_test.pdf", 'WBG, "Kenya CCDR", 2023')
+        version = index.version
+
+        # Reloading unchanged data keeps the version
+        assert index.load(session) is False
+        assert index.version == version
+    finally:
+        session.delete(document)
+        session.delete(publication)
+        session.commit()
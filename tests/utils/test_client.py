@@ -0,0 +1,35 @@
+import asyncio
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+from utils.chat.client import create_openai_client, get_openai_client
+
+
+def client_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/client")
+    def client_id(client: AsyncOpenAI = Depends(get_openai_client)) -> int:
+        return id(client)
+
+    return app
+
+
+def test_get_openai_client_returns_the_client_on_app_state():
+    """Every request gets the one client stored on app.state"""
+    app = client_app()
+    app.state.openai_client = create_openai_client()
+    with TestClient(app) as test_client:
+        ids = {test_client.get("/client").json() for _ in range(3)}
+    assert ids == {id(app.state.openai_client)}
+    asyncio.run(app.state.openai_client.close())
+
+
+def test_get_openai_client_creates_one_client_without_lifespan():
+    """Without a lifespan, the client is created on first use and then reused"""
+    app = client_app()
+    test_client = TestClient(app)
+    first = test_client.get("/client").json()
+    assert test_client.get("/client").json() == first
+    assert first == id(app.state.openai_client)
+    asyncio.run(app.state.openai_client.close())
@@ -0,0 +1,50 @@
+import zlib
+import asyncio
+from typing import AsyncGenerator, List
+from utils.chat.sse import encode_sse, wrap_for_oob_swap
+from utils.chat.compression import compress_stream, negotiate_encoding
+
+
+async def frames_from(items: List[bytes]) -> AsyncGenerator[bytes, None]:
+    for item in items:
+        yield item
+
+
+def token_frames(count: int) -> List[bytes]:
+    return [encode_sse("textDelta", wrap_for_oob_swap("msg_1", f"word{i % 7} ")) for i in range(count)]
+
+
+def test_negotiate_encoding():
+    """The accepted coding with the highest q-value wins; compression must be enabled"""
+    assert negotiate_encoding("gzip, deflate", enabled=True) == "gzip"
+    assert negotiate_encoding("gzip;q=0.5, deflate", enabled=True) == "deflate"
+    assert negotiate_encoding("gzip;q=0, identity", enabled=True) is None
+    assert negotiate_encoding("*", enabled=True) is not None
+    assert negotiate_encoding("gzip", enabled=False) is None
+    assert negotiate_encoding(None, enabled=True) is None
+
+
+def test_each_frame_decodes_as_soon_as_it_arrives():
+    """Every compressed chunk is flushed, so the client can decode each frame without waiting for more"""
+    frames = token_frames(20)
+
+    async def run() -> List[bytes]:
+        return [chunk async for chunk in compress_stream(frames_from(frames), "gzip")]
+
+    chunks = asyncio.run(run())
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for frame, chunk in zip(frames, chunks):
+        assert decoder.decompress(chunk) == frame
+    assert decoder.decompress(chunks[-1]) == b"" and decoder.eof
+
+
+def test_repetitive_frames_compress_well():
+    """The wrapper repeated on every token costs a few bytes once the compressor has seen it"""
+    frames = token_frames(500)
+
+    async def run() -> List[bytes]:
+        return [chunk async for chunk in compress_stream(frames_from(frames), "deflate")]
+
+    compressed = b"".join(asyncio.run(run()))
+    assert zlib.decompress(compressed) == b"".join(frames)
+    assert len(compressed) * 5 < sum(len(frame) for frame in frames)
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+import numpy as np
+from utils.chat.embedding_store import EmbeddingStore, append_embeddings, read_header
+from utils.chat.vectors import VectorIndex
+
+START = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def embedding_rows(node_ids: list[str], vectors: np.ndarray, minutes: int = 0) -> list[tuple[str, list[float], datetime]]:
+    return [
+        (node_id, vector.tolist(), START + timedelta(minutes=minutes + row))
+        for row, (node_id, vector) in enumerate(zip(node_ids, vectors))
+    ]
+
+
+def test_store_is_mapped_and_searched_like_an_in_memory_index(tmp_path: Path):
+    """A float32 store maps the normalized rows and finds the same neighbours as VectorIndex"""
+    vectors = np.random.default_rng(0).normal(size=(50, 8))
+    node_ids = [f"node_{row}" for row in range(50)]
+    header = append_embeddings(tmp_path / "embeddings.bin", "m", embedding_rows(node_ids, vectors), "float32", batch_size=7)
+
+    store = EmbeddingStore(tmp_path / "embeddings.bin")
+    assert isinstance(store.matrix, np.memmap) and not store.matrix.flags.writeable
+    assert header.count == len(store) == 50 and header.watermark == START + timedelta(minutes=49)
+    expected = VectorIndex("m", node_ids, vectors)
+    assert np.array_equal(store.matrix, expected.matrix)
+    assert store.index().search(vectors[3], k=5) == expected.search(vectors[3], k=5)
+
+
+def test_appends_add_new_nodes_and_update_reembedded_ones(tmp_path: Path):
+    """New nodes are appended after the existing rows, and a re-embedded node keeps its row with the new vector"""
+    path = tmp_path / "embeddings.bin"
+    append_embeddings(path, "m", embedding_rows(["a", "b"], np.eye(3)[:2]))
+    store = EmbeddingStore(path)
+    size = path.stat().st_size
+
+    append_embeddings(path, "m", embedding_rows(["b", "c"], np.array([[0, 0, 5.0], [1, 1, 0]]), minutes=10))
+    assert path.stat().st_size == size + 3 * 4
+    assert store.reload() and not store.reload()
+    assert [node_id.decode() for node_id in store.node_ids] == ["a", "b", "c"]
+    assert np.allclose(store.matrix[1], [0, 0, 1]) and read_header(path).watermark == START + timedelta(minutes=11)
+
+
+def test_updates_do_not_change_rows_a_reader_has_mapped(tmp_path: Path):
+    """A reader keeps the rows it mapped while a row is updated, and sees the update after reload()"""
+    path = tmp_path / "embeddings.bin"
+    append_embeddings(path, "m", embedding_rows(["a", "b"], np.eye(3)[:2]))
+    store = EmbeddingStore(path)
+    mapped = store.matrix
+
+    # Re-exporting unchanged rows appends in place without replacing the file
+    inode = path.stat().st_ino
+    append_embeddings(path, "m", embedding_rows(["b", "c"], np.array([[0, 1.0, 0], [0, 0, 1]]), minutes=1))
+    assert path.stat().st_ino == inode
+
+    append_embeddings(path, "m", embedding_rows(["a"], np.array([[0, 0, 2.0]]), minutes=10))
+    assert path.stat().st_ino != inode and not (tmp_path / "embeddings.bin.tmp").exists()
+    assert np.array_equal(mapped, np.eye(3)[:2]) and np.array_equal(store.matrix[0], [1, 0, 0])
+
+    assert store.reload()
+    assert [node_id.decode() for node_id in store.node_ids] == ["a", "b", "c"]
+    assert np.allclose(store.matrix, [[0, 0, 1], [0, 1, 0], [0, 0, 1]])
+
+
+def test_float16_store_halves_the_rows_and_keeps_scores_close(tmp_path: Path):
+    """Rows stored as float16 take half the space and give nearly the same cosine similarities"""
+    vectors = np.random.default_rng(1).normal(size=(20, 16))
+    node_ids = [f"node_{row}" for row in range(20)]
+    append_embeddings(tmp_path / "embeddings.bin", "m", embedding_rows(node_ids, vectors), "float16")
+
+    store = EmbeddingStore(tmp_path / "embeddings.bin")
+    assert store.matrix.dtype == np.float16 and store.matrix.nbytes == 20 * 16 * 2
+    [(node_id, score), *_] = store.index().search(vectors[7], k=3)
+    assert node_id == "node_7" and abs(score - 1) < 1e-3
@@ -0,0 +1,43 @@
+from jinja2 import DictLoader, Environment
+from fastapi.templating import Jinja2Templates
+from utils.chat.fragments import FragmentRenderer
+
+templates = Jinja2Templates(directory="templates")
+
+
+def environment(**sources: str) -> Environment:
+    return Environment(loader=DictLoader(sources), autoescape=True)
+
+
+def test_compiled_fragments_match_the_templates():
+    """Precompiled chat fragments render exactly what Jinja renders, escaping included"""
+    step = FragmentRenderer(templates.env, "chat/assistant-step.html", slots=("step_id",))
+    message = FragmentRenderer(templates.env, "chat/user-message.html", slots=("user_input",))
+    for step_type in ("assistantMessage", "toolCall", "other"):
+        context = {"step_type": step_type, "step_id": "msg_<1>"}
+        assert step.render(**context) == templates.get_template("chat/assistant-step.html").render(**context)
+    user_input = 'Is "A & B" <b>bold</b>?'
+    assert message.render(user_input=user_input) == templates.get_template("chat/user-message.html").render(user_input=user_input)
+    assert step.compile(step_type="toolCall") is not None
+
+
+def test_unescaped_slots_stay_unescaped():
+    """A slot printed with |safe is inserted as is, like Jinja does"""
+    renderer = FragmentRenderer(environment(t="<p>{{ a }}|{{ b|safe }}</p>"), "t", slots=("a", "b"))
+    assert renderer.render(a="<i>", b="<i>") == "<p>&lt;i&gt;|<i></p>"
+
+
+def test_transformed_slots_fall_back_to_jinja():
+    """A template that transforms a slot on output is not precompiled, and still renders correctly"""
+    transformed = FragmentRenderer(environment(t="<b>{{ n|upper }}</b>"), "t", slots=("n",))
+    assert transformed.compile() is None
+    assert transformed.render(n="x") == "<b>X</b>"
+
+
+def test_variants_are_compiled_once_each():
+    """Each combination of non-slot values is compiled once, up to the variant limit"""
+    renderer = FragmentRenderer(environment(t="{{ kind }}:{{ id }}"), "t", slots=("id",), max_variants=1)
+    assert renderer.render(kind="a", id="1") == "a:1" and renderer.render(kind="a", id="2") == "a:2"
+    # Over the limit, other variants are rendered through Jinja
+    assert renderer.render(kind="b", id="3") == "b:3"
+    assert len(renderer._variants) == 1
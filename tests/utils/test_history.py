@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from openai.types.beta.threads import Message
+from openai.types.beta import Thread
+from utils.chat.history import HistoryMessage, HistoryPageCache, load_history_page
+from utils.chat.threads import create_thread, is_thread_owner
+
+
+def make_message(index: int, role: str, text: str, status: str = "completed") -> Message:
+    return Message.model_validate({
+        "id": f"msg_{index:03d}",
+        "object": "thread.message",
+        "created_at": index,
+        "thread_id": "thread_1",
+        "role": role,
+        "status": status,
+        "attachments": None,
+        "metadata": None,
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+    })
+
+
+class FakeMessages:
+    """Lists messages newest first with the cursor semantics of the Assistants API."""
+
+    def __init__(self, messages: List[Message]):
+        self.messages = messages
+        self.calls: List[Dict[str, Any]] = []
+
+    async def list(self, thread_id: str, order: str, limit: int, after: Optional[str] = None) -> SimpleNamespace:
+        self.calls.append({"limit": limit, "after": after})
+        newest_first = list(reversed(self.messages))
+        start = 0 if after is None else [message.id for message in newest_first].index(after) + 1
+        data = newest_first[start:start + limit]
+        return SimpleNamespace(data=data, has_more=start + limit < len(newest_first))
+
+
+def render(messages: List[HistoryMessage], before: Optional[str]) -> str:
+    return f"{before}|" + ",".join(message.text for message in messages)
+
+
+def load(messages: FakeMessages, cache: HistoryPageCache, before: Optional[str] = None, owner: int = 1) -> str:
+    client: Any = SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(messages=messages)))
+    page = asyncio.run(load_history_page(client, "thread_1", owner, render, str, before=before, page_size=2, cache=cache))
+    return page.html
+
+
+def test_pages_go_from_newest_to_oldest():
+    """The newest page is returned oldest first, with a cursor to the page before it"""
+    messages = FakeMessages([
+        make_message(1, "user", "System: Today's date is 2025-01-01\nHello"),
+        make_message(2, "assistant", "Hi"),
+        make_message(3, "user", "Bye"),
+    ])
+    cache = HistoryPageCache()
+    assert load(messages, cache) == "msg_002|Hi,Bye"
+    # The date line added to user messages is hidden
+    assert load(messages, cache, before="msg_002") == "None|Hello"
+
+
+def test_unchanged_thread_is_served_from_cache_with_one_small_query():
+    """Reopening a thread whose last message is unchanged only looks up the last message ID"""
+    messages = FakeMessages([make_message(1, "user", "Hello"), make_message(2, "assistant", "Hi")])
+    cache = HistoryPageCache()
+    load(messages, cache)
+    messages.calls.clear()
+
+    assert load(messages, cache) == "None|Hello,Hi"
+    assert messages.calls == [{"limit": 1, "after": None}]
+    assert cache.hits == 1
+
+    # A new message changes the key of the newest page
+    messages.messages.append(make_message(3, "user", "More"))
+    assert load(messages, cache) == "msg_002|Hi,More"
+
+
+def test_pages_with_unfinished_messages_are_not_cached():
+    """A message that is still being written is not frozen into the cache"""
+    messages = FakeMessages([make_message(1, "user", "Hello"), make_message(2, "assistant", "Hi", "in_progress")])
+    cache = HistoryPageCache()
+    load(messages, cache)
+    assert len(cache) == 0
+
+
+class FakeThreads:
+    """Creates and retrieves threads, keeping their metadata."""
+
+    def __init__(self):
+        self.threads: Dict[str, Thread] = {}
+        self.retrieved: List[str] = []
+
+    async def create(self, metadata: Dict[str, str], messages: Optional[List[Any]] = None) -> Thread:
+        thread = Thread(id=f"thread_owned_{len(self.threads)}", object="thread", created_at=0, metadata=metadata)
+        self.threads[thread.id] = thread
+        return thread
+
+    async def retrieve(self, thread_id: str) -> Thread:
+        self.retrieved.append(thread_id)
+        return self.threads[thread_id]
+
+
+def test_threads_are_only_readable_by_their_creator():
+    """Another user is denied a thread's history, including pages cached for its owner"""
+    threads = FakeThreads()
+    client: Any = SimpleNamespace(beta=SimpleNamespace(threads=threads))
+    thread_id = asyncio.run(create_thread(client, user_id=1))
+    assert asyncio.run(is_thread_owner(client, thread_id, 1))
+    assert not asyncio.run(is_thread_owner(client, thread_id, 2))
+    assert not asyncio.run(is_thread_owner(client, thread_id, None))
+    # The owner was remembered when the thread was created
+    assert threads.retrieved == []
+
+    # Threads created elsewhere are checked against their metadata
+    threads.threads["thread_other"] = Thread(id="thread_other", object="thread", created_at=0, metadata={"user_id": "2"})
+    assert not asyncio.run(is_thread_owner(client, "thread_other", 1))
+    assert asyncio.run(is_thread_owner(client, "thread_other", 2))
+    assert threads.retrieved == ["thread_other"]
+
+    # A page cached for one user is not served to another
+    messages = FakeMessages([make_message(1, "user", "Secret"), make_message(2, "assistant", "Reply")])
+    cache = HistoryPageCache()
+    load(messages, cache, owner=1)
+    load(messages, cache, owner=2)
+    assert cache.hits == 0
+    assert len(cache) == 2
@@ -0,0 +1,73 @@
+import math
+import random
+from pathlib import Path
+import numpy as np
+from utils.chat.lexical import BM25_B, BM25_K1, BM25Index, Postings, node_text, tokenize
+
+CORPUS = {
+    "doc_a": [("a_0", "The Green Growth Program for Kenya"), ("a_1", "Losses of 2.5% of GDP and US$1,200 million")],
+    "doc_b": [("b_0", "Kenya faces droughts; the NDC targets adaptation"), ("b_1", "the the the of")],
+}
+
+
+def test_tokens_keep_figures_and_fall_back_to_raw_content():
+    """Numbers keep their decimal and thousands separators, and nodes without content use their raw content"""
+    assert tokenize("Losses of 2.5% and US$1,200 (NDC)") == ["losses", "of", "2.5", "and", "us", "1,200", "ndc"]
+    assert node_text(None, "raw text") == "raw text" and node_text("clean", "raw") == "clean"
+
+
+def test_scores_match_the_bm25_formula():
+    """Scores are idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average length)), summed over terms"""
+    index = BM25Index.from_segments({document_id: Postings.build(nodes) for document_id, nodes in CORPUS.items()})
+    texts = [tokenize(text) for nodes in CORPUS.values() for _, text in nodes]
+    average = sum(map(len, texts)) / len(texts)
+
+    def expected(query: str, tokens: list[str]) -> float:
+        score = 0.0
+        for term in set(tokenize(query)):
+            frequency = tokens.count(term)
+            documents = sum(term in other for other in texts)
+            idf = math.log(1 + (len(texts) - documents + 0.5) / (documents + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / average))
+        return score
+
+    results = index.search("kenya NDC", k=10)
+    assert [node_id for node_id, _ in results] == ["b_0", "a_0"]
+    assert np.allclose([score for _, score in results], [expected("kenya NDC", texts[2]), expected("kenya NDC", texts[0])])
+    assert index.search("2.5 us") == [("a_1", index.search("2.5 us")[0][1])]
+    assert index.search("unknown words") == []
+
+
+def test_pruned_search_matches_scoring_every_posting():
+    """Skipping common terms' postings for unmatched nodes never changes the top k"""
+    rng = random.Random(0)
+    words = [f"w{rank}" for rank in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(2000)]
+    nodes = [(f"n{row}", " ".join(rng.choices(words, weights, k=30))) for row in range(3000)]
+    index = BM25Index.from_segments({"doc": Postings.build(nodes)})
+
+    for query in ["w1500 w0 w1 w2", "w900 w1200 w3 w0", "w0 w1", "w10 w1999"]:
+        scores = np.zeros(len(index), np.float32)
+        for term_id in index.term_ids(query):
+            begin, end = index.postings.offsets[term_id], index.postings.offsets[term_id + 1]
+            scores[index.postings.rows[begin:end]] += index.impacts[begin:end]
+        _, found = index.search_rows(query, k=10)
+        assert np.allclose(found, np.sort(scores)[::-1][:10])
+
+
+def test_reindexing_a_document_matches_a_full_rebuild(tmp_path: Path):
+    """Replacing one document's segment and merging gives the same index as building every segment again"""
+    segments = {document_id: Postings.build(nodes) for document_id, nodes in CORPUS.items()}
+    BM25Index.from_segments(segments).save(tmp_path / "bm25", segments)
+    changed = [("b_0", "Kenya drought resilience"), ("b_2", "New supplemental annex on drought")]
+
+    segments["doc_b"] = Postings.build(changed)
+    updated = BM25Index.from_segments(segments)
+    rebuilt = BM25Index.from_segments({"doc_a": Postings.build(CORPUS["doc_a"]), "doc_b": Postings.build(changed)})
+    assert updated.search("drought kenya") == rebuilt.search("drought kenya")
+
+    updated.save(tmp_path / "bm25", {"doc_b": segments["doc_b"]})
+    loaded = BM25Index.load(tmp_path / "bm25")
+    assert isinstance(loaded.impacts, np.memmap) and loaded.documents == ["doc_a", "doc_b"]
+    assert loaded.search("drought kenya") == rebuilt.search("drought kenya")
+    assert Postings.load(tmp_path / "bm25" / "documents" / "doc_b.npz").node_ids.tolist() == [b"b_0", b"b_2"]
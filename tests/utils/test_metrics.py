@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from typing import AsyncGenerator, List
+from utils.core.metrics import Metric, MetricsRegistry
+from utils.chat.sse import RunProgress, encode_sse
+from utils.chat.metrics import RUN_DURATION_SECONDS, RUN_FIRST_TEXT_SECONDS, track_run
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and end with +Inf, followed by the sum and count"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ["tool"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "get_weather")
+    histogram.observe(0.5, "get_weather")
+    histogram.observe(5, "get_weather")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{tool="get_weather",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{tool="get_weather",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{tool="get_weather",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{tool="get_weather"} 5.55' in lines
+    assert 'latency_seconds_count{tool="get_weather"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    """Quotes, backslashes and newlines in label values are escaped"""
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls", ["tool"]).inc('say "hi"\n')
+    assert 'calls_total{tool="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_metric_without_collect_cannot_be_instantiated():
+    """A metric subclass that does not implement collect fails when it is created"""
+    class Incomplete(Metric):
+        type = "gauge"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Missing collect")
+
+
+def test_track_run_records_outcome_and_first_text():
+    """A tracked run records its duration by outcome and the time to its first textDelta"""
+    async def frames() -> AsyncGenerator[bytes, None]:
+        yield encode_sse("messageCreated", "<div></div>")
+        yield encode_sse("textDelta", "Hello")
+        yield encode_sse("endStream", "DONE")
+
+    async def run() -> List[bytes]:
+        progress = RunProgress(outcome="completed")
+        return [frame async for frame in track_run(frames(), progress)]
+
+    completed = RUN_DURATION_SECONDS.count("completed")
+    first_text = RUN_FIRST_TEXT_SECONDS.count()
+    assert len(asyncio.run(run())) == 3
+    assert RUN_DURATION_SECONDS.count("completed") == completed + 1
+    assert RUN_FIRST_TEXT_SECONDS.count() == first_text + 1
@@ -0,0 +1,48 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List
+from openai.types.beta import AssistantStreamEvent
+from utils.chat.recording import Recording, ReplayClient, StreamRecorder, parse_event
+
+
+def delta(text: str) -> Dict[str, Any]:
+    return {"event": "thread.message.delta", "data": {
+        "id": "msg_1", "object": "thread.message.delta",
+        "delta": {"content": [{"index": 0, "type": "text", "text": {"value": text}}]}
+    }}
+
+
+def test_recorder_round_trip(tmp_path: Path):
+    """Recorded events are written per segment and load back as the same events"""
+    segments = [[parse_event(delta("Hello "))], [parse_event(delta("world")), parse_event(delta("!"))]]
+    recorder = StreamRecorder(tmp_path / "run.jsonl.gz", {"thread_id": "thread_1"})
+    for segment in segments:
+        recorder.start_segment()
+        for event in segment:
+            recorder.add(event)
+    recorder.save()
+
+    recording = Recording.load(tmp_path / "run.jsonl.gz")
+    assert recording.metadata["thread_id"] == "thread_1"
+    assert recording.metadata["segments"] == 2
+    assert recording.segments == segments
+
+
+def test_recorder_disabled_without_directory():
+    """No recorder is created when recording is disabled"""
+    assert StreamRecorder.for_thread("thread_1", directory="") is None
+
+
+def test_replay_client_serves_segments_in_order():
+    """runs.stream serves the first segment and each tool output submission the next"""
+    recording = Recording([[parse_event(delta("a"))], [parse_event(delta("b"))]])
+    client = ReplayClient(recording)
+
+    async def drain(manager: Any) -> List[AssistantStreamEvent]:
+        async with manager as events:
+            return [event async for event in events]
+
+    first = asyncio.run(drain(client.beta.threads.runs.stream(thread_id="t", assistant_id="a")))
+    second = asyncio.run(drain(client.beta.threads.runs.submit_tool_outputs_stream(tool_outputs=[])))
+    assert first == recording.segments[0] and second == recording.segments[1]
+    assert client.runs.submitted_tool_outputs == [[]]
@@ -0,0 +1,159 @@
+import asyncio
+from typing import AsyncGenerator, List
+from utils.chat.sse import encode_sse, sse_format
+from utils.chat.replay import RunStream, RunStreamRegistry
+
+
+async def frames_from(items: List[bytes]) -> AsyncGenerator[bytes, None]:
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+async def collect(stream: RunStream, after_seq: int = 0) -> List[bytes]:
+    return [frame async for frame in stream.subscribe(after_seq)]
+
+
+def test_sse_format_with_id():
+    """The event ID is written as the first field of the message"""
+    assert sse_format("textDelta", "hi", id="abc-1") == "id: abc-1\nevent: textDelta\ndata: hi\n\n"
+
+
+def test_run_stream_tags_frames_with_monotonic_ids():
+    """Every frame carries an ID made of the stream ID and an increasing sequence number"""
+    async def run() -> List[bytes]:
+        stream = RunStream("thread_1", 1, frames_from([
+            encode_sse("textDelta", "a"),
+            encode_sse("endStream", "DONE")
+        ]))
+        return await collect(stream)
+
+    frames = asyncio.run(run())
+    assert len(frames) == 2
+    ids = [frame.split(b"\n", 1)[0] for frame in frames]
+    assert ids[0].endswith(b"-1") and ids[1].endswith(b"-2")
+    assert frames[1].endswith(b"event: endStream\ndata: DONE\n\n")
+
+
+def test_run_stream_resumes_after_last_event_id():
+    """A subscriber resuming from an event ID only receives the frames that follow it"""
+    async def run() -> tuple[List[bytes], List[bytes]]:
+        stream = RunStream("thread_1", 1, frames_from([
+            encode_sse("textDelta", "a"),
+            encode_sse("textDelta", "b"),
+            encode_sse("endStream", "DONE")
+        ]))
+        first = await collect(stream)
+        last_event_id = first[0].split(b"\n", 1)[0].removeprefix(b"id: ").decode()
+        resumed = await collect(stream, stream.parse_event_id(last_event_id) or 0)
+        return first, resumed
+
+    first, resumed = asyncio.run(run())
+    assert resumed == first[1:]
+
+
+def test_run_stream_rejects_foreign_event_ids():
+    """Event IDs from another stream are not treated as resume points"""
+    async def run() -> RunStream:
+        return RunStream("thread_1", 1, frames_from([]))
+
+    stream = asyncio.run(run())
+    assert stream.parse_event_id("deadbeef-3") is None
+    assert stream.parse_event_id(None) is None
+    assert stream.parse_event_id(f"{stream.stream_id}-3") == 3
+
+
+def test_run_stream_closes_client_when_run_fails():
+    """An endStream frame is appended if the run ends without one"""
+    async def failing() -> AsyncGenerator[bytes, None]:
+        yield encode_sse("textDelta", "a")
+        raise RuntimeError("upstream error")
+
+    async def run() -> List[bytes]:
+        return await collect(RunStream("thread_1", 1, failing()))
+
+    frames = asyncio.run(run())
+    assert b"event: endStream" in frames[-1]
+
+
+def test_registry_drops_finished_streams_after_retention():
+    """Finished streams are pruned once the retention period has passed"""
+    async def run() -> RunStreamRegistry:
+        registry = RunStreamRegistry(retention_seconds=0)
+        stream = registry.start("thread_1", 1, frames_from([]))
+        await collect(stream)
+        await asyncio.sleep(0.01)
+        return registry
+
+    registry = asyncio.run(run())
+    assert registry.get("thread_1") is None
+
+
+async def endless() -> AsyncGenerator[bytes, None]:
+    while True:
+        await asyncio.sleep(0.001)
+        yield encode_sse("textDelta", "a")
+
+
+def test_run_stream_abandoned_after_subscribers_leave():
+    """A run with no subscribers for the grace period is stopped and its abandon hook is awaited"""
+    async def run() -> tuple[RunStream, List[str]]:
+        abandoned: List[str] = []
+
+        async def on_abandon() -> None:
+            abandoned.append("cancelled")
+
+        stream = RunStream("thread_1", 1, endless(), on_abandon=on_abandon, grace_seconds=0.01)
+        subscription = stream.subscribe()
+        await subscription.__anext__()
+        await subscription.aclose()
+        await asyncio.sleep(0.05)
+        return stream, abandoned
+
+    stream, abandoned = asyncio.run(run())
+    assert stream.abandoned and stream.done
+    assert abandoned == ["cancelled"]
+
+
+def test_run_stream_survives_reconnect_within_grace_period():
+    """A subscriber that returns before the grace period ends keeps the run alive"""
+    async def run() -> tuple[RunStream, List[str]]:
+        abandoned: List[str] = []
+
+        async def on_abandon() -> None:
+            abandoned.append("cancelled")
+
+        stream = RunStream("thread_1", 1, endless(), on_abandon=on_abandon, grace_seconds=0.05)
+        subscription = stream.subscribe()
+        await subscription.__anext__()
+        await subscription.aclose()
+        resumed = stream.subscribe()
+        await resumed.__anext__()
+        await asyncio.sleep(0.1)
+        await resumed.aclose()
+        stream._task.cancel()
+        return stream, abandoned
+
+    stream, abandoned = asyncio.run(run())
+    assert not stream.abandoned
+    assert abandoned == []
+
+
+def test_lagging_subscriber_receives_every_frame():
+    """A subscriber that falls far behind, or joins after the run is done, still gets the whole transcript in order"""
+    deltas = [encode_sse("textDelta", str(index)) for index in range(5000)]
+
+    async def run() -> tuple[List[bytes], List[bytes]]:
+        stream = RunStream("thread_1", 1, frames_from(deltas + [encode_sse("endStream", "DONE")]))
+        lagging: List[bytes] = []
+        async for frame in stream.subscribe():
+            lagging.append(frame)
+            if len(lagging) == 1:
+                # Let the producer run thousands of frames ahead of this subscriber
+                while not stream.done:
+                    await asyncio.sleep(0.01)
+        return lagging, await collect(stream, after_seq=10)
+
+    lagging, late = asyncio.run(run())
+    assert len(lagging) == 5001 and late == lagging[10:]
+    assert [frame.split(b"data: ")[1].strip() for frame in lagging[:-1]] == [str(index).encode() for index in range(5000)]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from utils.chat.lexical import BM25Index, Postings
+from utils.chat.retrieval import hybrid_search, maximal_marginal_relevance, reciprocal_rank_fusion
+from utils.chat.vectors import VectorIndex, normalize_rows
+
+
+def test_reciprocal_rank_fusion_weights_each_ranking():
+    """A node's score is the weighted sum of 1 / (rrf_k + rank) over the lists it appears in"""
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]], [1.0, 2.0], rrf_k=10))
+    assert np.isclose(fused["a"], 1 / 11) and np.isclose(fused["b"], 1 / 12 + 2 / 11) and np.isclose(fused["c"], 2 / 12)
+    assert list(dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]], [1.0, 2.0], rrf_k=10))) == ["b", "c", "a"]
+
+
+def test_mmr_passes_over_near_duplicates():
+    """A near-copy of a selected candidate is ranked below a less relevant but different one"""
+    embeddings = normalize_rows([[1, 0, 0], [1, 0.01, 0], [0, 1, 0]])
+    relevance = np.array([1.0, 0.99, 0.6])
+    assert maximal_marginal_relevance(relevance, embeddings, 2, mmr_lambda=0.7) == [0, 2]
+    assert maximal_marginal_relevance(relevance, embeddings, 2, mmr_lambda=1.0) == [0, 1]
+    assert maximal_marginal_relevance(relevance, embeddings, 5) == [0, 2, 1]
+
+
+def test_hybrid_search_fuses_both_rankings_and_reports_stage_timings():
+    """Nodes found by either ranking are fused, duplicates are diversified away, and every stage is timed"""
+    nodes = [
+        ("para_1", "Kenya drought resilience investments"),
+        ("para_1_copy", "Kenya drought resilience investments again"),
+        ("para_2", "Coastal flooding in Mombasa"),
+        ("table_1", "The Green Growth Program budget"),
+    ]
+    lexical = BM25Index.from_segments({"doc": Postings.build(nodes)})
+    embeddings = VectorIndex("m", ["para_1", "para_1_copy", "para_2"], [[1, 0, 0], [1, 0.02, 0], [0.6, 0.8, 0]])
+
+    result = hybrid_search("Green Growth drought", [1, -0.1, 0], embeddings, lexical, k=3, mmr_lambda=0.3)
+    assert result.node_ids[0] == "para_1" and "para_1_copy" not in result.node_ids
+    assert set(result.node_ids) == {"para_1", "para_2", "table_1"}
+    assert result.scores[0] == max(result.scores)
+    assert list(result.timings) == ["vector", "lexical", "fusion", "embeddings", "mmr", "total"]
+
+
+def test_candidates_without_embeddings_are_placed_by_relevance():
+    """A BM25-only node without an embedding is not preferred over a more relevant node whose similarity is known"""
+    nodes = [
+        ("para_1", "Kenya drought drought resilience"),
+        ("para_2", "Kenya drought adaptation plan"),
+        ("table_1", "drought budget table"),
+    ]
+    lexical = BM25Index.from_segments({"doc": Postings.build(nodes)})
+    embeddings = VectorIndex("m", ["para_1", "para_2"], [[1, 0, 0], [0.8, 0.6, 0]])
+
+    result = hybrid_search("Kenya drought", [1, 0.1, 0], embeddings, lexical, k=2, mmr_lambda=0.5)
+    assert result.node_ids == ["para_1", "para_2"]
+    result = hybrid_search("Kenya drought", [1, 0.1, 0], embeddings, lexical, k=3, mmr_lambda=0.5)
+    assert result.node_ids == ["para_1", "para_2", "table_1"]
+
+
+def test_hybrid_search_rejects_non_positive_weights():
+    """Weights must be positive, so fused scores can be scaled by their maximum"""
+    lexical = BM25Index.from_segments({"doc": Postings.build([("para_1", "Kenya drought")])})
+    embeddings = VectorIndex("m", ["para_1"], [[1, 0, 0]])
+    with pytest.raises(ValueError):
+        hybrid_search("drought", [1, 0, 0], embeddings, lexical, vector_weight=0, lexical_weight=0)
+    with pytest.raises(ValueError):
+        hybrid_search("drought", [1, 0, 0], embeddings, lexical, lexical_weight=-1)
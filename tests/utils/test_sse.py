@@ -0,0 +1,89 @@
+import asyncio
+from typing import AsyncGenerator, List, Union
+from utils.chat.sse import SSEDelta, coalesce_deltas, encode_sse, split_sse_lines, sse_format, wrap_for_oob_swap
+
+
+async def collect(events: AsyncGenerator[bytes, None]) -> List[bytes]:
+    return [frame async for frame in events]
+
+
+async def from_list(items: List[Union[SSEDelta, bytes]], pause: float = 0) -> AsyncGenerator[Union[SSEDelta, bytes], None]:
+    for item in items:
+        if pause:
+            await asyncio.sleep(pause)
+        yield item
+
+
+def test_coalesce_merges_consecutive_deltas():
+    """Consecutive deltas for the same step are emitted as a single frame"""
+    items: List[Union[SSEDelta, bytes]] = [
+        SSEDelta("textDelta", "msg_1", "Hello"),
+        SSEDelta("textDelta", "msg_1", ", "),
+        SSEDelta("textDelta", "msg_1", "world"),
+    ]
+    frames = asyncio.run(collect(coalesce_deltas(from_list(items), max_delay_ms=1000)))
+    assert frames == [encode_sse("textDelta", wrap_for_oob_swap("msg_1", "Hello, world"))]
+
+
+def test_coalesce_flushes_before_other_events():
+    """Buffered deltas are flushed before any formatted frame and on step changes"""
+    end_stream = encode_sse("endStream", "DONE")
+    items: List[Union[SSEDelta, bytes]] = [
+        SSEDelta("toolDelta", "step_1", "get_weather<br>"),
+        SSEDelta("textDelta", "msg_1", "It is "),
+        SSEDelta("textDelta", "msg_1", "sunny"),
+        end_stream,
+    ]
+    frames = asyncio.run(collect(coalesce_deltas(from_list(items), max_delay_ms=1000)))
+    assert frames == [
+        encode_sse("toolDelta", wrap_for_oob_swap("step_1", "get_weather<br>")),
+        encode_sse("textDelta", wrap_for_oob_swap("msg_1", "It is sunny")),
+        end_stream,
+    ]
+
+
+def test_coalesce_flushes_on_size():
+    """The buffer is flushed once it reaches max_bytes"""
+    items: List[Union[SSEDelta, bytes]] = [SSEDelta("textDelta", "msg_1", "abcd") for _ in range(4)]
+    frames = asyncio.run(collect(coalesce_deltas(from_list(items), max_delay_ms=1000, max_bytes=8)))
+    assert frames == [encode_sse("textDelta", wrap_for_oob_swap("msg_1", "abcdabcd"))] * 2
+
+
+def test_coalesce_flushes_on_timeout():
+    """Buffered text is sent when the upstream stalls past the coalescing window"""
+    items: List[Union[SSEDelta, bytes]] = [
+        SSEDelta("textDelta", "msg_1", "a"),
+        SSEDelta("textDelta", "msg_1", "b"),
+    ]
+    frames = asyncio.run(collect(coalesce_deltas(from_list(items, pause=0.05), max_delay_ms=10)))
+    assert frames == [
+        encode_sse("textDelta", wrap_for_oob_swap("msg_1", "a")),
+        encode_sse("textDelta", wrap_for_oob_swap("msg_1", "b")),
+    ]
+
+
+def test_coalesce_disabled():
+    """A zero coalescing window sends every delta immediately"""
+    items: List[Union[SSEDelta, bytes]] = [SSEDelta("textDelta", "msg_1", c) for c in "abc"]
+    frames = asyncio.run(collect(coalesce_deltas(from_list(items), max_delay_ms=0)))
+    assert len(frames) == 3
+
+
+def test_encode_sse_matches_sse_format():
+    """The bytes encoder produces the same messages as sse_format, on the fast path and off it"""
+    for data in ["<p>Hi</p>", "café ☕", "a\nb", "a\r\nb\rc\n", "", "x"]:
+        assert encode_sse("textDelta", data) == sse_format("textDelta", data).encode()
+    assert encode_sse("endStream", "DONE", id="abc-1") == b"id: abc-1\nevent: endStream\ndata: DONE\n\n"
+
+
+def test_only_cr_and_lf_end_sse_lines():
+    """Unicode line separators stay inside a data line, as the SSE spec only splits on CR and LF"""
+    assert split_sse_lines("a\r\nb\u2028c\n") == ["a", "b\u2028c"]
+
+
+def test_coalesce_encodes_multiline_deltas():
+    """Coalesced text that spans lines is sent as several data lines"""
+    items: List[Union[SSEDelta, bytes]] = [SSEDelta("textDelta", "msg_1", "a\n"), SSEDelta("textDelta", "msg_1", "é")]
+    frames = asyncio.run(collect(coalesce_deltas(from_list(items), max_delay_ms=1000)))
+    assert frames == [encode_sse("textDelta", wrap_for_oob_swap("msg_1", "a\né"))]
+    assert frames[0].count(b"data: ") == 2
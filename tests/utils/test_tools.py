@@ -0,0 +1,127 @@
+import json
+import time
+import asyncio
+import threading
+from pydantic import BaseModel
+from openai.types.beta.threads.required_action_function_tool_call import RequiredActionFunctionToolCall, Function
+from utils.chat.tools import ToolRegistry, tool_registry
+from utils.chat.functions import get_weather
+
+
+class EchoArguments(BaseModel):
+    text: str
+
+
+def make_tool_call(name: str, arguments: dict | str) -> RequiredActionFunctionToolCall:
+    return RequiredActionFunctionToolCall(
+        id="call_123",
+        type="function",
+        function=Function(
+            name=name,
+            arguments=arguments if isinstance(arguments, str) else json.dumps(arguments)
+        )
+    )
+
+
+def test_sync_tool_runs_in_thread_pool():
+    """Sync tools are executed off the event loop thread"""
+    registry = ToolRegistry(max_workers=2)
+
+    @registry.register("echo", EchoArguments)
+    def echo(text: str) -> dict:
+        return {"text": text, "thread": threading.current_thread().name}
+
+    result = asyncio.run(registry.execute(make_tool_call("echo", {"text": "hi"})))
+    assert result.ok
+    output = json.loads(result.output)
+    assert output["text"] == "hi"
+    assert output["thread"].startswith("tool")
+
+
+def test_async_tool_is_awaited():
+    """Async tools are awaited directly"""
+    registry = ToolRegistry()
+
+    @registry.register("echo", EchoArguments)
+    async def echo(text: str) -> str:
+        await asyncio.sleep(0)
+        return text.upper()
+
+    result = asyncio.run(registry.execute(make_tool_call("echo", {"text": "hi"})))
+    assert result.ok
+    assert result.output == "HI"
+    assert result.output_html == "<pre>HI</pre>"
+
+
+def test_sync_tools_run_concurrently():
+    """Slow sync tools do not block each other or the event loop"""
+    registry = ToolRegistry(max_workers=4)
+
+    @registry.register("sleep", EchoArguments)
+    def sleep(text: str) -> str:
+        time.sleep(0.2)
+        return text
+
+    async def run() -> float:
+        start = time.monotonic()
+        await asyncio.gather(*(registry.execute(make_tool_call("sleep", {"text": str(i)})) for i in range(4)))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) < 0.6
+
+
+def test_tool_timeout():
+    """A tool exceeding its timeout returns an error output"""
+    registry = ToolRegistry()
+
+    @registry.register("slow", EchoArguments, timeout=0.01)
+    async def slow(text: str) -> str:
+        await asyncio.sleep(1)
+        return text
+
+    result = asyncio.run(registry.execute(make_tool_call("slow", {"text": "hi"})))
+    assert not result.ok
+    assert "timed out" in result.output
+
+
+def test_unknown_tool_and_invalid_arguments():
+    """Unknown tools and invalid arguments are reported back to the run"""
+    registry = ToolRegistry()
+
+    @registry.register("echo", EchoArguments)
+    def echo(text: str) -> str:
+        return text
+
+    unknown = asyncio.run(registry.execute(make_tool_call("missing", {})))
+    assert not unknown.ok and "Unknown tool" in unknown.output
+
+    invalid = asyncio.run(registry.execute(make_tool_call("echo", "{not json")))
+    assert not invalid.ok and "Invalid arguments" in invalid.output
+
+
+def test_weather_tool_is_registered():
+    """The weather tool renders its widget from the validated arguments"""
+    result = asyncio.run(tool_registry.execute(
+        make_tool_call("get_weather", {"location": "Nairobi", "dates": ["2025-01-01", "2025-01-02"]})
+    ))
+    assert result.ok
+    assert "Nairobi" in result.output_html
+    assert [report["date"] for report in json.loads(result.output)] == ["2025-01-01", "2025-01-02"]
+    assert get_weather("Nairobi", ["2025-01-01"])[0]["date"] == "2025-01-01"
+
+
+def test_widget_render_errors_are_returned_as_tool_output():
+    """A widget that fails to render gives an escaped error result instead of raising"""
+    registry = ToolRegistry()
+
+    @registry.register("broken", EchoArguments, template="chat/weather-widget.html")
+    def broken(text: str) -> int:
+        return 5
+
+    result = asyncio.run(registry.execute(make_tool_call("broken", {"text": "<b>"})))
+    assert not result.ok and result.outcome == "error"
+    assert "Failed to render broken output" in result.output and "<" not in result.output_html
+
+    # The weather widget shows an empty report list instead of failing
+    empty = asyncio.run(tool_registry.execute(make_tool_call("get_weather", {"location": "Nairobi", "dates": []})))
+    assert empty.ok and "No weather reports" in empty.output_html and empty.output == "[]"
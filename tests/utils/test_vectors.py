@@ -0,0 +1,81 @@
+from datetime import date, datetime, timedelta, UTC
+import numpy as np
+from sqlmodel import Session
+from utils.chat.models import ContentNode, Document, DocumentType, Embedding, NodeType, Publication
+from utils.chat.vectors import VectorIndex, normalize_rows, top_k_rows
+
+
+def random_index(rows: int = 200, dimensions: int = 16, seed: int = 0) -> VectorIndex:
+    vectors = np.random.default_rng(seed).normal(size=(rows, dimensions))
+    return VectorIndex("test-model", [f"node_{row}" for row in range(rows)], vectors)
+
+
+def test_rows_are_normalized_float32():
+    """The matrix is contiguous float32 with unit rows, and zero rows stay zero"""
+    matrix = normalize_rows([[3.0, 4.0], [0.0, 0.0]])
+    assert matrix.dtype == np.float32 and matrix.flags.c_contiguous
+    assert np.allclose(matrix, [[0.6, 0.8], [0.0, 0.0]])
+
+
+def test_top_k_rows_matches_a_full_sort():
+    """The partial sort returns the same top k, in order, as sorting every score"""
+    scores = np.random.default_rng(1).random((5, 50), dtype=np.float32)
+    rows, values = top_k_rows(scores, 7)
+    assert np.array_equal(rows, np.argsort(-scores, axis=1)[:, :7])
+    assert np.array_equal(values, -np.sort(-scores, axis=1)[:, :7])
+
+
+def test_search_returns_nearest_nodes_by_cosine_similarity():
+    """A query close to a stored vector finds its node first, with scores in descending order"""
+    index = random_index()
+    query = index.matrix[42] * 5 + 0.01
+    results = index.search(query, k=5)
+    assert results[0][0] == "node_42" and results[0][1] > 0.99
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_batched_queries_match_single_queries_in_any_block_size():
+    """A batch of queries scored in small blocks gives the same results as one query at a time"""
+    index = random_index()
+    queries = np.random.default_rng(2).normal(size=(9, 16))
+    rows, scores = index.search_rows(queries, k=4, max_block=len(index) * 2)
+    for query, query_rows, query_scores in zip(queries, rows, scores):
+        single_rows, single_scores = index.search_rows(query, k=4)
+        assert np.array_equal(query_rows, single_rows[0]) and np.allclose(query_scores, single_scores[0])
+    assert len(index.search_many(queries, k=300)[0]) == len(index)
+
+
+def test_vector_index_loads_latest_embedding_per_node(session: Session):
+    """Only the chosen model's embeddings are loaded, and the latest one per node"""
+    publication = Publication(
+        id="P000VEC", title="Kenya CCDR", citation="WBG 2023", authors="WBG",
+        publication_date=date(2023, 11, 1), source="World Bank",
+        source_url="https://example.com/source", uri="https://example.com/uri"
+    )
+    document = Document(
+        id="dl_vec", publication_id=publication.id, type=DocumentType.MAIN,
+        download_url="https://example.com/dl_vec", description="Main report",
+        mime_type="application/pdf", charset="binary"
+    )
+    node = ContentNode(
+        id="node_vec", document_id=document.id, node_type=NodeType.PARAGRAPH, content="Text",
+        sequence_in_parent=0, sequence_in_document=0, start_page_pdf=1, end_page_pdf=1,
+        start_page_logical="1", end_page_logical="1", bounding_box={}
+    )
+    now = datetime.now(UTC)
+    embeddings = [
+        Embedding(id="emb_old", node_id=node.id, embedding_vector=[1.0, 0.0], model_name="m", created_at=now - timedelta(days=1)),
+        Embedding(id="emb_new", node_id=node.id, embedding_vector=[0.0, 2.0], model_name="m", created_at=now),
+        Embedding(id="emb_other", node_id=node.id, embedding_vector=[1.0, 1.0, 1.0], model_name="other", created_at=now),
+    ]
+    session.add_all([publication, document, node, *embeddings])
+    session.commit()
+
+    try:
+        index = VectorIndex.load(session, "m")
+        assert index.node_ids.tolist() == ["node_vec"]
+        assert np.allclose(index.matrix, [[0.0, 1.0]])
+    finally:
+        for row in (*embeddings, node, document, publication):
+            session.delete(row)
+        session.commit()
@@ -0,0 +1,295 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncGenerator, Deque, Dict, Iterable, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Concurrent assistant runs per worker process, globally, per organization and
+# per user; 0 means unlimited
+CHAT_MAX_CONCURRENT_RUNS = int(os.getenv("CHAT_MAX_CONCURRENT_RUNS") or "64")
+CHAT_MAX_RUNS_PER_ORGANIZATION = int(os.getenv("CHAT_MAX_RUNS_PER_ORGANIZATION") or "16")
+CHAT_MAX_RUNS_PER_USER = int(os.getenv("CHAT_MAX_RUNS_PER_USER") or "2")
+# Batch question runs per user, counted separately from the user's interactive runs
+CHAT_MAX_BATCH_RUNS_PER_USER = int(os.getenv("CHAT_MAX_BATCH_RUNS_PER_USER") or "2")
+
+# Runs that would make the queue longer than this are turned away (0: unbounded),
+# and runs that wait longer than the timeout give up (0: wait indefinitely)
+CHAT_ADMISSION_MAX_QUEUE = int(os.getenv("CHAT_ADMISSION_MAX_QUEUE") or "256")
+CHAT_ADMISSION_TIMEOUT_SECONDS = float(os.getenv("CHAT_ADMISSION_TIMEOUT_SECONDS") or "120")
+
+
+# --- Helper Classes ---
+
+
+class AdmissionRejected(Exception):
+    """Raised while waiting for admission if the run was turned away or timed out."""
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    max_runs: int = CHAT_MAX_CONCURRENT_RUNS
+    max_runs_per_organization: int = CHAT_MAX_RUNS_PER_ORGANIZATION
+    max_runs_per_user: int = CHAT_MAX_RUNS_PER_USER
+    max_queue: int = CHAT_ADMISSION_MAX_QUEUE
+    timeout_seconds: float = CHAT_ADMISSION_TIMEOUT_SECONDS
+    max_batch_runs_per_user: int = CHAT_MAX_BATCH_RUNS_PER_USER
+
+
+@dataclass(eq=False)
+class RunTicket:
+    """A run's place in the admission queue, and later its slot."""
+    user_id: Optional[int]
+    organization_ids: Tuple[int, ...]
+    bucket: str
+    batch: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+    admitted_at: Optional[float] = None
+    rejected: bool = False
+    released: bool = False
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+
+class AdmissionController:
+    """
+    Bounds the assistant runs a worker has open at once, globally, per
+    organization and per user. A run is charged against every organization its
+    user belongs to.
+
+    Batch runs go in a lane of their own: they are limited per user by
+    max_batch_runs_per_user instead of max_runs_per_user, and wait in buckets
+    separate from interactive runs, so a user's batch job never takes the slots
+    or the place in line of their interactive runs. Both kinds of runs count
+    towards the global and organization limits.
+
+    Runs over a limit wait in a fair queue: waiting runs are grouped into
+    buckets by organization (or by user, for users without one), buckets are
+    served round-robin, and runs within a bucket first come, first served. One
+    organization with many waiting runs therefore delays other organizations by
+    at most one run per turn. A run at the head of its bucket whose user or
+    organization is at its limit is skipped, not blocking runs behind it.
+
+    Limits are per process; with several workers, each enforces them separately.
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(self, limits: Optional[AdmissionLimits] = None):
+        self.limits: AdmissionLimits = limits or AdmissionLimits()
+        self.active: int = 0
+        self._active_by_user: Dict[Optional[int], int] = {}
+        self._active_batch_by_user: Dict[Optional[int], int] = {}
+        self._active_by_organization: Dict[int, int] = {}
+        # Waiting runs per bucket; the order of the buckets is the round-robin order
+        self._queues: "OrderedDict[str, Deque[RunTicket]]" = OrderedDict()
+        self.admitted_immediately: int = 0
+        self.admitted_after_queueing: int = 0
+        self.rejected: int = 0
+        self.timed_out: int = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def configure(self, **changes: Any) -> AdmissionLimits:
+        """Changes some of the limits at runtime, admitting waiting runs if they were raised."""
+        self.limits = replace(self.limits, **changes)
+        logger.info(f"Admission limits changed to {self.limits}")
+        self._dispatch()
+        return self.limits
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "active_batch": sum(self._active_batch_by_user.values()),
+            "queued": self.queued,
+            "admitted_immediately": self.admitted_immediately,
+            "admitted_after_queueing": self.admitted_after_queueing,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def _has_capacity(self, ticket: RunTicket) -> bool:
+        limits = self.limits
+        if limits.max_runs and self.active >= limits.max_runs:
+            return False
+        if ticket.batch:
+            if limits.max_batch_runs_per_user and self._active_batch_by_user.get(ticket.user_id, 0) >= limits.max_batch_runs_per_user:
+                return False
+        elif limits.max_runs_per_user and self._active_by_user.get(ticket.user_id, 0) >= limits.max_runs_per_user:
+            return False
+        if limits.max_runs_per_organization and any(
+            self._active_by_organization.get(organization_id, 0) >= limits.max_runs_per_organization
+            for organization_id in ticket.organization_ids
+        ):
+            return False
+        return True
+
+    def _admit(self, ticket: RunTicket) -> None:
+        ticket.admitted_at = time.monotonic()
+        self.active += 1
+        active_by_user = self._active_batch_by_user if ticket.batch else self._active_by_user
+        active_by_user[ticket.user_id] = active_by_user.get(ticket.user_id, 0) + 1
+        for organization_id in ticket.organization_ids:
+            self._active_by_organization[organization_id] = self._active_by_organization.get(organization_id, 0) + 1
+        ticket.changed.set()
+
+    def _remove(self, ticket: RunTicket) -> None:
+        queue = self._queues.get(ticket.bucket)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.bucket]
+
+    def _notify_waiting(self) -> None:
+        for queue in self._queues.values():
+            for ticket in queue:
+                ticket.changed.set()
+
+    def _next_admissible(self) -> Optional[RunTicket]:
+        for queue in self._queues.values():
+            for ticket in queue:
+                if self._has_capacity(ticket):
+                    return ticket
+        return None
+
+    def _dispatch(self) -> None:
+        """Admits waiting runs, one per bucket in round-robin order, while there is capacity."""
+        changed = False
+        while self._queues:
+            if self.limits.max_runs and self.active >= self.limits.max_runs:
+                break
+            ticket = self._next_admissible()
+            if ticket is None:
+                break
+            self._remove(ticket)
+            if ticket.bucket in self._queues:
+                self._queues.move_to_end(ticket.bucket)
+            self._admit(ticket)
+            self.admitted_after_queueing += 1
+            changed = True
+        if changed:
+            # Everyone behind the admitted runs moved up
+            self._notify_waiting()
+
+    def enqueue(
+        self,
+        user_id: Optional[int],
+        organization_ids: Iterable[Optional[int]] = (),
+        batch: bool = False
+    ) -> RunTicket:
+        """
+        Requests a slot for a run, in the batch lane if batch is set. The
+        returned ticket is admitted right away if nobody is waiting and the
+        limits allow it; otherwise it is queued, or rejected if the queue is
+        full. Every ticket must be released.
+        """
+        organizations = tuple(sorted({i for i in organization_ids if i is not None}))
+        bucket = f"organization:{organizations[0]}" if organizations else f"user:{user_id}"
+        ticket = RunTicket(user_id, organizations, f"batch:{bucket}" if batch else bucket, batch)
+
+        if not self._queues and self._has_capacity(ticket):
+            self._admit(ticket)
+            self.admitted_immediately += 1
+            return ticket
+
+        if self.limits.max_queue and self.queued >= self.limits.max_queue:
+            ticket.rejected = True
+            self.rejected += 1
+            logger.warning(f"Admission queue is full ({self.queued} runs); turning away a run for user {user_id}")
+            return ticket
+
+        self._queues.setdefault(ticket.bucket, deque()).append(ticket)
+        # Limits are checked per user and organization, so a run may pass others that are stuck
+        self._dispatch()
+        return ticket
+
+    def position(self, ticket: RunTicket) -> int:
+        """
+        Returns the ticket's 1-based position in the queue, or 0 if it is not
+        waiting: the number of runs that round-robin service admits before it,
+        plus one. Runs held back by their own user or organization limit may be
+        overtaken, so this is an upper bound.
+        """
+        queue = self._queues.get(ticket.bucket)
+        if queue is None or ticket not in queue:
+            return 0
+        index = queue.index(ticket)
+        ahead = index
+        before = True
+        for bucket, other in self._queues.items():
+            if bucket == ticket.bucket:
+                before = False
+                continue
+            # Buckets served before this one in the current round get one more turn
+            ahead += min(len(other), index + 1 if before else index)
+        return ahead + 1
+
+    async def wait(self, ticket: RunTicket) -> AsyncGenerator[int, None]:
+        """
+        Waits until the ticket is admitted, yielding its queue position
+        whenever it changes. Returns right away for an admitted ticket, and
+        raises AdmissionRejected if the ticket was rejected or timed out.
+        """
+        timeout = self.limits.timeout_seconds
+        last_position: Optional[int] = None
+        while True:
+            # Cleared before reading the state, so changes made while we yield wake the wait below
+            ticket.changed.clear()
+            if ticket.admitted:
+                return
+            if ticket.rejected:
+                raise AdmissionRejected("Too many requests are waiting")
+            position = self.position(ticket)
+            if position != last_position:
+                last_position = position
+                yield position
+            remaining = ticket.enqueued_at + timeout - time.monotonic() if timeout else None
+            if remaining is not None and remaining <= 0:
+                self._remove(ticket)
+                self._notify_waiting()
+                ticket.rejected = True
+                self.timed_out += 1
+                raise AdmissionRejected(f"Timed out after waiting {timeout:g} seconds")
+            try:
+                await asyncio.wait_for(ticket.changed.wait(), remaining)
+            except TimeoutError:
+                pass
+
+    def release(self, ticket: RunTicket) -> None:
+        """Frees the ticket's slot, or gives up its place in the queue. Safe to call twice."""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self.active -= 1
+            self._decrement(self._active_batch_by_user if ticket.batch else self._active_by_user, ticket.user_id)
+            for organization_id in ticket.organization_ids:
+                self._decrement(self._active_by_organization, organization_id)
+            self._dispatch()
+        elif not ticket.rejected:
+            self._remove(ticket)
+            self._notify_waiting()
+
+    @staticmethod
+    def _decrement(counts: Dict[Any, int], key: Any) -> None:
+        if counts.get(key, 0) <= 1:
+            counts.pop(key, None)
+        else:
+            counts[key] -= 1
+
+
+admission_controller = AdmissionController()
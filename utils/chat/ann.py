@@ -0,0 +1,358 @@
+import os
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import numpy.typing as npt
+from dotenv import load_dotenv
+from utils.chat.embedding_store import EMBEDDING_STORE_PATH, EmbeddingStore
+from utils.chat.vectors import VectorIndex, normalize_rows, top_k_rows
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Directory of the approximate nearest-neighbour index built from the embedding store
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH") or "data/ann"
+# Clusters searched per query: more finds more true neighbours, at a proportional cost
+ANN_NPROBE = int(os.getenv("ANN_NPROBE") or "8")
+
+ANN_INDEX_VERSION = 1
+# Vectors used to train the clusters and codebooks; more barely helps beyond this
+ANN_TRAINING_SAMPLE = 100_000
+ANN_KMEANS_ITERATIONS = 12
+# Rows assigned or encoded per matrix product while building
+ANN_BUILD_BLOCK = 1 << 14
+# Centroids per product quantization codebook, so that each code fits in a byte
+PQ_CENTROIDS = 256
+
+
+# --- Helper Functions ---
+
+
+def as_float32(vectors: npt.NDArray[np.floating]) -> npt.NDArray[np.float32]:
+    return vectors if vectors.dtype == np.float32 else vectors.astype(np.float32)
+
+
+def nearest_centroids(
+    vectors: npt.NDArray[np.floating],
+    centroids: npt.NDArray[np.float32],
+    spherical: bool,
+    block: int = ANN_BUILD_BLOCK
+) -> npt.NDArray[np.intp]:
+    """
+    Returns the index of each vector's nearest centroid: by inner product if
+    spherical (unit-length vectors and centroids), else by Euclidean distance,
+    using |x - c|^2 = |x|^2 - 2 x.c + |c|^2 so that it is one matrix product.
+    """
+    offsets = np.zeros(len(centroids), np.float32) if spherical else 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    assignments = np.empty(len(vectors), dtype=np.intp)
+    for begin in range(0, len(vectors), block):
+        scores = as_float32(vectors[begin:begin + block]) @ centroids.T - offsets
+        assignments[begin:begin + block] = scores.argmax(axis=1)
+    return assignments
+
+
+def kmeans(
+    vectors: npt.NDArray[np.float32],
+    n_clusters: int,
+    iterations: int,
+    rng: np.random.Generator,
+    spherical: bool
+) -> npt.NDArray[np.float32]:
+    """
+    Lloyd's k-means. Spherical k-means keeps centroids unit-length, for
+    clustering by cosine similarity. An empty cluster is reseeded with a random
+    vector.
+    """
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids, spherical)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_clusters)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0) / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        if spherical:
+            centroids = normalize_rows(centroids)
+    return centroids
+
+
+def recall_at_k(approximate: Sequence[Sequence[str]], exact: Sequence[Sequence[str]]) -> float:
+    """The fraction of the exact nearest neighbours that the approximate search also returned."""
+    found = sum(len(set(approximate_ids) & set(exact_ids)) for approximate_ids, exact_ids in zip(approximate, exact))
+    total = sum(len(exact_ids) for exact_ids in exact)
+    return found / total if total else 1.0
+
+
+# --- Helper Classes ---
+
+
+class IVFIndex:
+    """
+    Approximate cosine similarity search with an inverted file: the embeddings
+    are clustered around nlist unit-length centroids, and stored grouped by
+    cluster, so a query scores only the members of the nprobe clusters whose
+    centroids are nearest to it instead of the whole corpus.
+
+    Members are stored either as their normalized vectors, or, with product
+    quantization, as the residual from their centroid split into pq_subvectors
+    parts, each encoded as one byte indexing a codebook of 256 centroids. Then
+    a member's score is q.c + q.r, where q.r is a sum of per-part lookups into a
+    table computed once per query; this shrinks each float32 row of d dimensions
+    from 4d bytes to pq_subvectors bytes, at some cost in recall.
+
+    The index is saved as a directory of .npy arrays and loaded by memory map.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        centroids: npt.NDArray[np.float32],
+        offsets: npt.NDArray[np.int64],
+        node_ids: npt.NDArray[np.str_ | np.bytes_],
+        vectors: Optional[npt.NDArray[np.floating]] = None,
+        codes: Optional[npt.NDArray[np.uint8]] = None,
+        codebooks: Optional[npt.NDArray[np.float32]] = None
+    ):
+        if (vectors is None) == (codes is None) or (codes is None) != (codebooks is None):
+            raise ValueError("An IVF index stores either vectors, or product quantization codes and codebooks")
+        self.model_name: str = model_name
+        self.centroids: npt.NDArray[np.float32] = centroids
+        self.offsets: npt.NDArray[np.int64] = offsets
+        self.node_ids: npt.NDArray[np.str_ | np.bytes_] = node_ids
+        self.vectors: Optional[npt.NDArray[np.floating]] = vectors
+        self.codes: Optional[npt.NDArray[np.uint8]] = codes
+        self.codebooks: Optional[npt.NDArray[np.float32]] = codebooks
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def dimensions(self) -> int:
+        return self.centroids.shape[1]
+
+    @property
+    def pq_subvectors(self) -> int:
+        return 0 if self.codes is None else self.codes.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        index: VectorIndex,
+        nlist: Optional[int] = None,
+        pq_subvectors: int = 0,
+        iterations: int = ANN_KMEANS_ITERATIONS,
+        sample_size: int = ANN_TRAINING_SAMPLE,
+        seed: int = 0
+    ) -> "IVFIndex":
+        """
+        Builds an index from an exact index's normalized matrix (which may be a
+        memory-mapped embedding store). nlist defaults to 4 * sqrt(rows). With
+        pq_subvectors > 0, which must divide the dimensions, members are stored
+        as product-quantized residuals instead of vectors.
+        """
+        start = time.perf_counter()
+        rows, dimensions = index.matrix.shape
+        if not rows:
+            raise ValueError(f"No {index.model_name} embeddings to index")
+        if pq_subvectors and dimensions % pq_subvectors:
+            raise ValueError(f"{pq_subvectors} subvectors do not divide {dimensions} dimensions")
+        nlist = min(nlist or int(4 * np.sqrt(rows)), rows)
+        rng = np.random.default_rng(seed)
+        sample = as_float32(index.matrix[np.sort(rng.choice(rows, min(rows, max(sample_size, nlist)), replace=False))])
+
+        centroids = kmeans(sample, nlist, iterations, rng, spherical=True)
+        assignments = nearest_centroids(index.matrix, centroids, spherical=True)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=nlist)))).astype(np.int64)
+        node_ids = index.node_ids[order]
+
+        if not pq_subvectors:
+            ivf = cls(index.model_name, centroids, offsets, node_ids, vectors=index.matrix[order])
+        else:
+            subvector = dimensions // pq_subvectors
+            residuals = sample - centroids[nearest_centroids(sample, centroids, spherical=True)]
+            parts = residuals.reshape(len(sample), pq_subvectors, subvector)
+            n_codes = min(PQ_CENTROIDS, len(sample))
+            codebooks = np.stack([
+                kmeans(np.ascontiguousarray(parts[:, part]), n_codes, iterations, rng, spherical=False)
+                for part in range(pq_subvectors)
+            ])
+            codes = np.empty((rows, pq_subvectors), dtype=np.uint8)
+            for begin in range(0, rows, ANN_BUILD_BLOCK):
+                block_rows = order[begin:begin + ANN_BUILD_BLOCK]
+                block = as_float32(index.matrix[block_rows]) - centroids[assignments[block_rows]]
+                block_parts = block.reshape(len(block_rows), pq_subvectors, subvector)
+                for part in range(pq_subvectors):
+                    codes[begin:begin + ANN_BUILD_BLOCK, part] = nearest_centroids(
+                        block_parts[:, part], codebooks[part], spherical=False
+                    )
+            ivf = cls(index.model_name, centroids, offsets, node_ids, codes=codes, codebooks=codebooks)
+
+        logger.info(
+            f"Built IVF index of {rows} {index.model_name} embeddings in {nlist} clusters"
+            f"{f' with {pq_subvectors}-byte PQ codes' if pq_subvectors else ''} "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return ivf
+
+    def save(self, path: Path | str) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        arrays: Dict[str, Any] = {
+            "centroids": self.centroids, "offsets": self.offsets, "node_ids": self.node_ids,
+            "vectors": self.vectors, "codes": self.codes, "codebooks": self.codebooks,
+        }
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(path / f"{name}.npy", np.ascontiguousarray(array))
+        (path / "index.json").write_text(json.dumps({
+            "version": ANN_INDEX_VERSION, "model_name": self.model_name, "count": len(self),
+            "nlist": self.nlist, "dimensions": self.dimensions, "pq_subvectors": self.pq_subvectors,
+        }))
+
+    @classmethod
+    def load(cls, path: Path | str) -> "IVFIndex":
+        """Loads a saved index, memory-mapping its arrays read-only."""
+        path = Path(path)
+        metadata = json.loads((path / "index.json").read_text())
+        if metadata["version"] != ANN_INDEX_VERSION:
+            raise ValueError(f"{path} was written by an incompatible version")
+
+        def array(name: str) -> Any:
+            return np.load(path / f"{name}.npy", mmap_mode="r") if (path / f"{name}.npy").exists() else None
+
+        return cls(
+            metadata["model_name"], array("centroids"), array("offsets"), array("node_ids"),
+            vectors=array("vectors"), codes=array("codes"), codebooks=array("codebooks")
+        )
+
+    def _candidates(self, lists: npt.NDArray[np.intp]) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """Returns the member rows of the given clusters, and each cluster's member count."""
+        starts, ends = self.offsets[lists], self.offsets[lists + 1]
+        sizes = ends - starts
+        # One arange over all members, shifted at each cluster boundary to that cluster's start
+        rows = np.arange(sizes.sum(), dtype=np.int64) + np.repeat(starts - np.concatenate(([0], np.cumsum(sizes)[:-1])), sizes)
+        return rows, sizes
+
+    def search_rows(
+        self,
+        queries: npt.ArrayLike,
+        k: int = 10,
+        nprobe: int = ANN_NPROBE
+    ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        """
+        Returns the index rows of the approximate k nearest embeddings to each
+        query and their (approximate, with PQ) cosine similarities, as (queries x k)
+        arrays, best first. Queries whose probed clusters have fewer than k members
+        are padded with row -1 and score -inf.
+        """
+        query_matrix = normalize_rows(queries)
+        if query_matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Queries have {query_matrix.shape[1]} dimensions; the index has {self.dimensions}")
+        list_rows, list_scores = top_k_rows(query_matrix @ self.centroids.T, nprobe)
+        rows = np.full((len(query_matrix), k), -1, dtype=np.int64)
+        scores = np.full((len(query_matrix), k), -np.inf, dtype=np.float32)
+        if self.codebooks is not None:
+            subvector = self.dimensions // self.pq_subvectors
+            parts = query_matrix.reshape(len(query_matrix), self.pq_subvectors, subvector)
+            # tables[query, part, code] = the query part's inner product with the code's centroid
+            tables = np.einsum("qmd,mkd->qmk", parts, self.codebooks)
+            part_indices = np.arange(self.pq_subvectors)
+
+        for query, (query_lists, query_list_scores) in enumerate(zip(list_rows, list_scores)):
+            candidates, sizes = self._candidates(query_lists)
+            if self.codes is not None:
+                candidate_scores = tables[query][part_indices, self.codes[candidates]].sum(axis=1)
+                candidate_scores += np.repeat(query_list_scores, sizes)
+            else:
+                assert self.vectors is not None
+                candidate_scores = as_float32(self.vectors[candidates]) @ query_matrix[query]
+            best, best_scores = top_k_rows(candidate_scores[np.newaxis], k)
+            rows[query, :best.shape[1]] = candidates[best[0]]
+            scores[query, :best.shape[1]] = best_scores[0]
+        return rows, scores
+
+    def search_many(self, queries: npt.ArrayLike, k: int = 10, nprobe: int = ANN_NPROBE) -> List[List[Tuple[str, float]]]:
+        """Returns the (node ID, cosine similarity) of the approximate k nearest nodes to each query, best first."""
+        rows, scores = self.search_rows(queries, k, nprobe)
+        results = []
+        for query_rows, query_scores in zip(rows, scores):
+            found = query_rows >= 0
+            node_ids = self.node_ids[query_rows[found]]
+            if node_ids.dtype.kind == "S":
+                node_ids = np.char.decode(node_ids, "utf-8")
+            results.append(list(zip(node_ids.tolist(), query_scores[found].tolist())))
+        return results
+
+    def search(self, query: npt.ArrayLike, k: int = 10, nprobe: int = ANN_NPROBE) -> List[Tuple[str, float]]:
+        """Returns the (node ID, cosine similarity) of the approximate k nearest nodes to a query vector, best first."""
+        return self.search_many(np.asarray(query, dtype=np.float32).reshape(1, -1), k, nprobe)[0]
+
+    def evaluate(
+        self,
+        exact: VectorIndex,
+        queries: npt.ArrayLike,
+        k: int = 10,
+        nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32)
+    ) -> List[Dict[str, float]]:
+        """
+        Measures recall@k against exact search, and the latency per query, at each
+        nprobe, so that recall can be traded for latency explicitly. The first row
+        is exact search itself.
+        """
+        query_matrix = normalize_rows(queries)
+        start = time.perf_counter()
+        expected = [[node_id for node_id, _ in result] for result in exact.search_many(query_matrix, k)]
+        report = [{"nprobe": 0, "recall": 1.0, "ms_per_query": (time.perf_counter() - start) * 1000 / len(query_matrix)}]
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            found = [[node_id for node_id, _ in result] for result in self.search_many(query_matrix, k, min(nprobe, self.nlist))]
+            elapsed = (time.perf_counter() - start) * 1000 / len(query_matrix)
+            report.append({"nprobe": nprobe, "recall": recall_at_k(found, expected), "ms_per_query": elapsed})
+        for row in report:
+            logger.info(
+                f"{'exact' if not row['nprobe'] else 'nprobe ' + str(row['nprobe'])}: "
+                f"recall@{k} {row['recall']:.3f}, {row['ms_per_query']:.2f} ms/query"
+            )
+        return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Builds an IVF index from the embedding store and reports its recall")
+    parser.add_argument("--store", default=EMBEDDING_STORE_PATH, help="Embedding store to index and evaluate against")
+    parser.add_argument("--path", default=ANN_INDEX_PATH, help="Directory of the index")
+    parser.add_argument("--nlist", type=int, default=None, help="Clusters (default 4 * sqrt(rows))")
+    parser.add_argument("--pq", type=int, default=0, help="Bytes per product-quantized residual (0 stores vectors)")
+    parser.add_argument("--evaluate-only", action="store_true", help="Evaluate the saved index without rebuilding it")
+    parser.add_argument("--queries", type=int, default=200, help="Stored embeddings sampled as evaluation queries")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    exact = EmbeddingStore(args.store).index()
+    if not args.evaluate_only:
+        IVFIndex.build(exact, args.nlist, args.pq).save(args.path)
+    ivf = IVFIndex.load(args.path)
+    sample = np.random.default_rng(1).choice(len(exact), min(args.queries, len(exact)), replace=False)
+    print(f"{'nprobe':>8} {'recall@' + str(args.k):>10} {'ms/query':>10}")
+    for row in ivf.evaluate(exact, as_float32(exact.matrix[np.sort(sample)]), args.k):
+        print(f"{'exact' if not row['nprobe'] else int(row['nprobe']):>8} {row['recall']:>10.3f} {row['ms_per_query']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
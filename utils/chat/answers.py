@@ -0,0 +1,340 @@
+import json
+import time
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Callable, Dict, Generic, Iterable, List, Optional, TypeVar
+from openai import AsyncOpenAI
+from openai.lib.streaming._assistants import AsyncAssistantStreamManager, AsyncAssistantEventHandler
+from openai.types.beta.assistant_stream_event import (
+    ThreadMessageCreated, ThreadMessageDelta, ThreadMessageCompleted, ThreadRunCompleted,
+    ThreadRunCreated, ThreadRunRequiresAction, ThreadRunStepCompleted, ThreadRunStepCreated, ThreadRunStepDelta
+)
+from openai.types.beta.threads.required_action_function_tool_call import RequiredActionFunctionToolCall
+from openai.types.beta.threads.runs import ToolCall, ToolCallDelta
+from openai.types.beta.threads.run import RequiredAction
+from openai.types.beta.threads.text_delta_block import TextDeltaBlock
+from utils.chat.sse import RunProgress, completion_token_average, encode_sse, post_tool_outputs
+from utils.chat.tools import ToolResult, tool_registry
+from utils.chat.citations import CitationRewriter, citation_index, resolve_citation
+from utils.chat.metrics import RUN_OUTCOMES, record_segment_start
+from utils.chat.recording import StreamRecorder
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+T = TypeVar("T")
+
+
+# --- Helper Classes ---
+
+
+class RunEmitter(Generic[T]):
+    """
+    Turns the steps of an assistant run into the items a route streams, for
+    stream_run. Each method returns the items for one step; steps an emitter
+    does not override produce nothing. render_html says whether tool results
+    should come with their rendered output widget.
+    """
+    render_html: bool = False
+
+    def run_created(self, run_id: str) -> Iterable[T]:
+        return ()
+
+    def message_created(self, message_id: str) -> Iterable[T]:
+        return ()
+
+    def text(self, message_id: str, text: str) -> Iterable[T]:
+        """Text of a message, with citation markers already rewritten."""
+        return ()
+
+    def citation(self, message_id: str, document_id: str) -> Iterable[T]:
+        """A document cited in the text just emitted."""
+        return ()
+
+    def file(self, message_id: str, file_id: str, replaces: str) -> Iterable[T]:
+        """A sandbox link (replaces) in the text just emitted, to the file file_id."""
+        return ()
+
+    def tool_step_created(self, step_id: str) -> Iterable[T]:
+        return ()
+
+    def tool_call_delta(self, step_id: str, tool_call: ToolCallDelta) -> Iterable[T]:
+        """Part of a tool call as it streams: function name and arguments, code and its outputs."""
+        return ()
+
+    def tool_call_completed(self, step_id: str, tool_call: ToolCall) -> Iterable[T]:
+        return ()
+
+    def tool_output(self, tool_call: RequiredActionFunctionToolCall, result: ToolResult) -> Iterable[T]:
+        """The result of a function call we executed, before it is submitted to the run."""
+        return ()
+
+    def done(self, outcome: str) -> Iterable[T]:
+        """The run ended with outcome, e.g. "completed", "failed" or "unfinished"."""
+        return ()
+
+
+class StructuredRunEmitter(RunEmitter[Dict[str, Any]]):
+    """
+    Emits a run as compact structured events, for programmatic clients:
+
+        {"type": "run", "run_id"}
+        {"type": "message", "message_id"}
+        {"type": "text", "message_id", "text"}  (citation markers already rewritten)
+        {"type": "citation", "message_id", "document_id", "text", "url"}
+        {"type": "file", "message_id", "file_id", "url", "replaces"}  (a sandbox link in the text)
+        {"type": "image", "step_id", "file_id", "url"}  (code interpreter output)
+        {"type": "tool_call", "tool_call_id", "name", "arguments", "output", "outcome"}
+        {"type": "done", "outcome"}  (e.g. "completed", "failed" or "unfinished")
+
+    Function calls are reported once executed; built-in tools once their step completes.
+    """
+
+    def __init__(self, file_url: Callable[[str], str] = str):
+        self.file_url = file_url
+
+    def run_created(self, run_id: str) -> Iterable[Dict[str, Any]]:
+        yield {"type": "run", "run_id": run_id}
+
+    def message_created(self, message_id: str) -> Iterable[Dict[str, Any]]:
+        yield {"type": "message", "message_id": message_id}
+
+    def text(self, message_id: str, text: str) -> Iterable[Dict[str, Any]]:
+        yield {"type": "text", "message_id": message_id, "text": text}
+
+    def citation(self, message_id: str, document_id: str) -> Iterable[Dict[str, Any]]:
+        yield citation_event(message_id, document_id)
+
+    def file(self, message_id: str, file_id: str, replaces: str) -> Iterable[Dict[str, Any]]:
+        yield {"type": "file", "message_id": message_id, "file_id": file_id, "url": self.file_url(file_id), "replaces": replaces}
+
+    def tool_call_completed(self, step_id: str, tool_call: ToolCall) -> Iterable[Dict[str, Any]]:
+        if tool_call.type == "code_interpreter":
+            logs = [output.logs for output in tool_call.code_interpreter.outputs if output.type == "logs"]
+            yield {
+                "type": "tool_call",
+                "tool_call_id": tool_call.id,
+                "name": "code_interpreter",
+                "arguments": tool_call.code_interpreter.input,
+                "output": "\n".join(logs),
+                "outcome": "ok",
+            }
+            for output in tool_call.code_interpreter.outputs:
+                if output.type == "image":
+                    file_id = output.image.file_id
+                    yield {"type": "image", "step_id": step_id, "file_id": file_id, "url": self.file_url(file_id)}
+        elif tool_call.type == "file_search":
+            yield {"type": "tool_call", "tool_call_id": tool_call.id, "name": "file_search", "outcome": "ok"}
+
+    def tool_output(self, tool_call: RequiredActionFunctionToolCall, result: ToolResult) -> Iterable[Dict[str, Any]]:
+        yield {
+            "type": "tool_call",
+            "tool_call_id": tool_call.id,
+            "name": tool_call.function.name,
+            "arguments": tool_call.function.arguments,
+            "output": result.output,
+            "outcome": result.outcome,
+        }
+
+    def done(self, outcome: str) -> Iterable[Dict[str, Any]]:
+        yield {"type": "done", "outcome": outcome}
+
+
+# --- Helper Functions ---
+
+
+def encode_event(event: Dict[str, Any], media_type: str) -> bytes:
+    """
+    Encodes a structured event as an NDJSON line, or as an SSE message named
+    after the event's type with the JSON as its data.
+    """
+    data = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+    if media_type == NDJSON_MEDIA_TYPE:
+        return (data + "\n").encode()
+    return encode_sse(event["type"], data)
+
+
+async def encode_events(
+    events: AsyncGenerator[Dict[str, Any], None],
+    media_type: str
+) -> AsyncGenerator[bytes, None]:
+    async with aclosing(events):
+        async for event in events:
+            yield encode_event(event, media_type)
+
+
+def citation_event(message_id: str, document_id: str) -> Dict[str, Any]:
+    url, text = citation_index.get(document_id) or ("", "")
+    return {"type": "citation", "message_id": message_id, "document_id": document_id, "text": text, "url": url}
+
+
+def requested_stream_format(accept: Optional[str], format: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the structured stream format a client asked for, NDJSON_MEDIA_TYPE or
+    SSE_MEDIA_TYPE, from a format query parameter ("ndjson" or "sse") or else from
+    its Accept header. Returns None if it asked for neither.
+    """
+    if format:
+        return {"ndjson": NDJSON_MEDIA_TYPE, "sse": SSE_MEDIA_TYPE}.get(format.lower())
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    if accept and SSE_MEDIA_TYPE in accept:
+        return SSE_MEDIA_TYPE
+    return None
+
+
+async def stream_run(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    emitter: "RunEmitter[T]",
+    progress: Optional[RunProgress] = None,
+    recorder: Optional[StreamRecorder] = None
+) -> AsyncGenerator[T, None]:
+    """
+    Runs the assistant on a thread until the run ends, and yields what emitter
+    makes of each step. This is the one event-processing loop behind both the
+    chat UI's htmx stream and the structured JSON stream: citation markers are
+    rewritten, requested function calls are executed concurrently and their
+    outputs submitted together, and progress is updated for run metrics and for
+    cancelling the run if the client goes away. If recorder is given, the raw
+    events of every stream segment are recorded and saved when the run ends.
+    """
+    progress = progress if progress is not None else RunProgress()
+    stream_manager: AsyncAssistantStreamManager[AsyncAssistantEventHandler] = client.beta.threads.runs.stream(
+        thread_id=thread_id,
+        assistant_id=assistant_id,
+        parallel_tool_calls=True
+    )
+    cited: List[str] = []
+
+    def resolve(document_id: str) -> Optional[str]:
+        replacement = resolve_citation(document_id)
+        if replacement is not None:
+            cited.append(document_id)
+        return replacement
+
+    try:
+        while True:
+            required_action: Optional[RequiredAction] = None
+            run_id = ""
+            rewriter: Optional[CitationRewriter] = None
+            if recorder is not None:
+                recorder.start_segment()
+            segment_started_at: Optional[float] = time.perf_counter()
+            event_handler: AsyncAssistantEventHandler
+            async with stream_manager as event_handler:
+                async for event in event_handler:
+                    if recorder is not None:
+                        recorder.add(event)
+                    if segment_started_at is not None:
+                        record_segment_start(progress, segment_started_at)
+                        segment_started_at = None
+                    if event.event in RUN_OUTCOMES:
+                        progress.outcome = RUN_OUTCOMES[event.event]
+                        progress.finished_at = time.perf_counter()
+
+                    items: List[T] = []
+                    if isinstance(event, ThreadRunCreated):
+                        progress.run_id = event.data.id
+                        items.extend(emitter.run_created(event.data.id))
+
+                    elif isinstance(event, ThreadMessageCreated):
+                        rewriter = CitationRewriter(resolve)
+                        items.extend(emitter.message_created(event.data.id))
+
+                    elif isinstance(event, ThreadMessageDelta) and event.data.delta.content:
+                        message_id = event.data.id
+                        for content in event.data.delta.content:
+                            if not isinstance(content, TextDeltaBlock) or not content.text:
+                                continue
+                            progress.streamed_tokens += 1
+                            if progress.first_delta_at is None:
+                                progress.first_delta_at = time.perf_counter()
+                            if rewriter is None:
+                                rewriter = CitationRewriter(resolve)
+                            text = rewriter.feed(content.text.value or "")
+                            if text:
+                                items.extend(emitter.text(message_id, text))
+                            for document_id in cited:
+                                items.extend(emitter.citation(message_id, document_id))
+                            cited.clear()
+                            for annotation in content.text.annotations or ():
+                                if annotation.type == "file_path" and annotation.file_path and annotation.file_path.file_id:
+                                    items.extend(emitter.file(message_id, annotation.file_path.file_id, annotation.text or ""))
+
+                    elif isinstance(event, ThreadMessageCompleted) and rewriter is not None:
+                        # Send any partial citation marker left over at the end of the message
+                        text = rewriter.flush()
+                        if text:
+                            items.extend(emitter.text(event.data.id, text))
+
+                    elif isinstance(event, ThreadRunStepCreated) and event.data.step_details.type == "tool_calls":
+                        items.extend(emitter.tool_step_created(event.data.id))
+
+                    elif isinstance(event, ThreadRunStepDelta) and event.data.delta.step_details \
+                            and event.data.delta.step_details.type == "tool_calls":
+                        # Parallel tool calls arrive as separate entries, one per tool call index
+                        for tool_call_delta in event.data.delta.step_details.tool_calls or ():
+                            items.extend(emitter.tool_call_delta(event.data.id, tool_call_delta))
+
+                    elif isinstance(event, ThreadRunStepCompleted) and event.data.step_details.type == "tool_calls":
+                        for step_call in event.data.step_details.tool_calls:
+                            items.extend(emitter.tool_call_completed(event.data.id, step_call))
+
+                    elif isinstance(event, ThreadRunRequiresAction):
+                        run_id = event.data.id
+                        required_action = event.data.required_action
+
+                    elif isinstance(event, ThreadRunCompleted) and event.data.usage:
+                        completion_token_average.record(event.data.usage.completion_tokens)
+
+                    for item in items:
+                        yield item
+                    # If the run requires an action (a tool call), stop reading and handle it
+                    if required_action and required_action.submit_tool_outputs:
+                        break
+
+            tool_calls = [
+                tool_call for tool_call in (required_action.submit_tool_outputs.tool_calls if required_action else [])
+                if tool_call.type == "function"
+            ]
+            if not tool_calls:
+                if required_action:
+                    logger.error("Run requires action, but no function tool calls were requested")
+                for item in emitter.done(progress.outcome):
+                    yield item
+                return
+
+            results: List[ToolResult] = await tool_registry.execute_all(tool_calls, render_html=emitter.render_html)
+            tool_outputs: List[Dict[str, str]] = []
+            for tool_call, result in zip(tool_calls, results):
+                for item in emitter.tool_output(tool_call, result):
+                    yield item
+                tool_outputs.append({"output": result.output, "tool_call_id": tool_call.id})
+            stream_manager = await post_tool_outputs(client, {"tool_outputs": tool_outputs, "runId": run_id}, thread_id)
+    finally:
+        # Written once, off the event loop, when the run ends or the client goes away
+        if recorder is not None:
+            await recorder.save_async()
+
+
+def stream_answer(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    file_url: Callable[[str], str] = str,
+    progress: Optional[RunProgress] = None,
+    recorder: Optional[StreamRecorder] = None
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Runs the assistant on a thread and yields its answer as compact structured
+    events (see StructuredRunEmitter), without rendering any HTML.
+    """
+    return stream_run(client, thread_id, assistant_id, StructuredRunEmitter(file_url), progress, recorder)
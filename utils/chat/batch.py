@@ -0,0 +1,277 @@
+import os
+import time
+import asyncio
+import secrets
+import logging
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from utils.chat.answers import stream_answer
+from utils.chat.threads import create_thread
+from utils.chat.admission import AdmissionController, admission_controller
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS") or "50")
+# Questions of one batch answered at once; also capped by the per-user batch run
+# limit, so that a batch's own questions never time out waiting for each other's slots
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY") or "5")
+# Batch jobs a user can have running at once (0 is unlimited)
+BATCH_MAX_JOBS_PER_USER = int(os.getenv("BATCH_MAX_JOBS_PER_USER") or "2")
+# How long a finished batch job can still be polled
+BATCH_JOB_RETENTION_SECONDS = float(os.getenv("BATCH_JOB_RETENTION_SECONDS") or "3600")
+
+
+# --- Helper Classes ---
+
+
+class BatchJobLimitExceeded(Exception):
+    """Raised when a user starts a batch job while at their limit of running jobs."""
+
+
+@dataclass
+class BatchQuestion:
+    index: int
+    question: str
+    # "pending", "running", "completed" or "failed"
+    status: str = "pending"
+    thread_id: Optional[str] = None
+    answer: str = ""
+    # The run outcome, as recorded in metrics (e.g. "completed" or "failed")
+    outcome: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchJob:
+    """
+    Answers a list of questions, each in a new thread of its own, in a background
+    task that does not depend on any HTTP connection. At most concurrency
+    questions are in flight at once, and each of their runs goes through
+    admission control in the batch lane, apart from the user's interactive runs.
+
+    Progress is recorded as a log of structured events, each tagged with the
+    index of its question where it has one:
+
+        {"type": "job", "job_id", "questions"}
+        {"type": "started", "index", "thread_id"}
+        {"type": "answer", "index", "thread_id", "text", "outcome"}
+        {"type": "error", "index", "error"}
+        {"type": "done", "status", "completed", "failed"}
+
+    Subscribers replay the log from any position and then follow it live, so a
+    client can disconnect and pick up where it left off, or just poll snapshot().
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        assistant_id: str,
+        questions: List[str],
+        user_id: Optional[int] = None,
+        organization_ids: Optional[List[int]] = None,
+        format_message: Callable[[str], str] = lambda question: question,
+        file_url: Callable[[str], str] = str,
+        concurrency: int = BATCH_CONCURRENCY,
+        controller: Optional[AdmissionController] = None
+    ):
+        self.job_id: str = secrets.token_urlsafe(12)
+        self.user_id: Optional[int] = user_id
+        self.organization_ids: List[int] = organization_ids or []
+        self.questions: List[BatchQuestion] = [
+            BatchQuestion(index, question) for index, question in enumerate(questions)
+        ]
+        self.created_at: float = time.time()
+        self.status: str = "running"
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._client = client
+        self._assistant_id = assistant_id
+        self._format_message = format_message
+        self._file_url = file_url
+        self._controller = controller or admission_controller
+        per_user = self._controller.limits.max_batch_runs_per_user
+        self._semaphore = asyncio.Semaphore(max(1, min(concurrency, per_user) if per_user else concurrency))
+        self._changed: asyncio.Condition = asyncio.Condition()
+        self.events.append({"type": "job", "job_id": self.job_id, "questions": len(self.questions)})
+        self._task: asyncio.Task = asyncio.create_task(self._run())
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    async def _emit(self, event: Dict[str, Any]) -> None:
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def _counts(self) -> Dict[str, int]:
+        return {
+            "completed": sum(question.status == "completed" for question in self.questions),
+            "failed": sum(question.status == "failed" for question in self.questions),
+        }
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.gather(*(self._answer(question) for question in self.questions))
+            self.status = "completed"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+        finally:
+            async with self._changed:
+                self.events.append({"type": "done", "status": self.status, **self._counts()})
+                self.finished_at = time.monotonic()
+                self._changed.notify_all()
+
+    async def _answer(self, question: BatchQuestion) -> None:
+        run_id: Optional[str] = None
+        async with self._semaphore:
+            ticket = self._controller.enqueue(self.user_id, self.organization_ids, batch=True)
+            try:
+                async for _ in self._controller.wait(ticket):
+                    pass
+                thread_id = await create_thread(
+                    self._client,
+                    messages=[{"role": "user", "content": self._format_message(question.question)}],
+                    user_id=self.user_id
+                )
+                if not thread_id:
+                    raise RuntimeError("Failed to create assistant chat thread")
+                question.thread_id = thread_id
+                question.status = "running"
+                await self._emit({"type": "started", "index": question.index, "thread_id": thread_id})
+
+                texts: List[str] = []
+                links: List[Dict[str, str]] = []
+                answer_events = stream_answer(self._client, thread_id, self._assistant_id, self._file_url)
+                async with aclosing(answer_events) as events:
+                    async for event in events:
+                        if event["type"] == "run":
+                            run_id = event["run_id"]
+                        elif event["type"] == "text":
+                            texts.append(event["text"])
+                        elif event["type"] == "file":
+                            links.append(event)
+                        elif event["type"] == "done":
+                            question.outcome = event["outcome"]
+                            run_id = None
+                question.answer = "".join(texts)
+                # Point sandbox file links in the answer at our download route
+                for link in links:
+                    question.answer = question.answer.replace(link["replaces"], link["url"])
+                question.status = "completed" if question.outcome == "completed" else "failed"
+                await self._emit({
+                    "type": "answer",
+                    "index": question.index,
+                    "thread_id": thread_id,
+                    "text": question.answer,
+                    "outcome": question.outcome,
+                })
+            except asyncio.CancelledError:
+                if run_id is not None and question.thread_id is not None:
+                    await self._cancel_run(question.thread_id, run_id)
+                raise
+            except Exception as e:
+                logger.error(f"Batch job {self.job_id} failed to answer question {question.index}: {e}")
+                question.status = "failed"
+                question.error = str(e)
+                await self._emit({"type": "error", "index": question.index, "error": question.error})
+            finally:
+                self._controller.release(ticket)
+
+    async def _cancel_run(self, thread_id: str, run_id: str) -> None:
+        try:
+            await self._client.beta.threads.runs.cancel(run_id, thread_id=thread_id)
+        except Exception as e:
+            logger.warning(f"Failed to cancel run {run_id} of batch job {self.job_id}: {e}")
+
+    def cancel(self) -> None:
+        """Stops the job; questions still in flight have their runs cancelled."""
+        if not self.done:
+            self._task.cancel()
+
+    async def wait(self) -> None:
+        """Waits for the job to finish."""
+        await asyncio.shield(self._task)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            **self._counts(),
+            "questions": [asdict(question) for question in self.questions],
+        }
+
+    async def subscribe(self, after: int = 0) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yields the events that follow the first after events, then live events
+        until the job is done. Events are numbered from 1 by their position in the log.
+        """
+        position = after
+        while True:
+            async with self._changed:
+                while not self.done and len(self.events) <= position:
+                    await self._changed.wait()
+                pending = self.events[position:]
+                done = self.done
+            for event in pending:
+                yield event
+            position += len(pending)
+            if done and not pending:
+                return
+
+
+class BatchJobRegistry:
+    """
+    In-process registry of batch jobs, which are kept for a while after they
+    finish. Each user can have at most max_jobs_per_user jobs running at once.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: float = BATCH_JOB_RETENTION_SECONDS,
+        max_jobs_per_user: int = BATCH_MAX_JOBS_PER_USER
+    ):
+        self.retention_seconds: float = retention_seconds
+        self.max_jobs_per_user: int = max_jobs_per_user
+        self._jobs: Dict[str, BatchJob] = {}
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def running(self, user_id: Optional[int]) -> int:
+        return sum(not job.done and job.user_id == user_id for job in self._jobs.values())
+
+    def start(self, *args: Any, **kwargs: Any) -> BatchJob:
+        """Starts a BatchJob with the given arguments, or raises BatchJobLimitExceeded."""
+        self._prune()
+        user_id = kwargs.get("user_id")
+        if self.max_jobs_per_user and self.running(user_id) >= self.max_jobs_per_user:
+            raise BatchJobLimitExceeded(f"User {user_id} already has {self.max_jobs_per_user} batch jobs running")
+        job = BatchJob(*args, **kwargs)
+        self._jobs[job.job_id] = job
+        return job
+
+
+batch_jobs = BatchJobRegistry()
@@ -0,0 +1,271 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import secrets
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+from utils.chat.sse import SSEDelta
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+ANSWER_CACHE_ENABLED = (os.getenv("ANSWER_CACHE_ENABLED") or "false").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES") or "1000")
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS") or "86400")
+# How long the cache key of a first message waits for its run to be streamed before it is dropped
+ANSWER_CACHE_PENDING_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_PENDING_TTL_SECONDS") or "300")
+# Minimum overlap (Jaccard similarity) between the content words of two questions for
+# one to be answered from the other's entry; 1 only matches questions with the same
+# normalized text
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY") or "1")
+# Delay between replayed text deltas, to simulate the pacing of a live run (0 replays immediately)
+ANSWER_CACHE_PACING_MS = int(os.getenv("ANSWER_CACHE_PACING_MS") or "0")
+
+# Runs that called one of our function tools depend on live data and are never cached
+UNCACHEABLE_EVENTS = (b"event: toolOutput\n",)
+
+# Words that don't change what a question asks, ignored when matching near-duplicates.
+# Negations and comparisons are deliberately not included
+STOP_WORDS = frozenset((
+    "a", "an", "the", "s", "of", "for", "in", "on", "to", "is", "are", "was", "were", "be", "do", "does",
+    "what", "which", "please", "can", "could", "you", "me", "tell", "about", "and", "its", "their"
+))
+
+
+# --- Helper Functions ---
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalizes user input so that trivially different phrasings of the same
+    question share a cache entry: Unicode compatibility forms are folded, case
+    and punctuation are dropped, and whitespace is collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def question_terms(normalized: str) -> FrozenSet[str]:
+    """Returns the content words of a normalized question."""
+    return frozenset(word for word in normalized.split() if word not in STOP_WORDS)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two sets of question terms."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def organization_scope(organization_ids: Iterable[Optional[int]], user_id: Optional[int]) -> str:
+    """
+    Returns the cache scope for a user who belongs to the given organizations.
+    Users without an organization each get a scope of their own, so their
+    answers are never shared.
+    """
+    organizations = sorted({i for i in organization_ids if i is not None})
+    if not organizations:
+        return f"user:{user_id}"
+    return ",".join(str(organization_id) for organization_id in organizations)
+
+
+# --- Helper Classes ---
+
+
+@dataclass
+class CachedAnswer:
+    """The recorded events of a completed run, and the plain text of the assistant's answer."""
+    events: List[Union[SSEDelta, bytes]]
+    answer_text: str
+    step_ids: List[str]
+    created_at: float = field(default_factory=time.monotonic)
+    terms: FrozenSet[str] = frozenset()
+
+
+class AnswerCache:
+    """
+    In-process cache of assistant answers to the first message of a thread,
+    keyed on organization scope, assistant ID and normalized user input. Entries
+    expire after ttl_seconds and the least recently used entry is evicted once
+    the cache is full.
+
+    With a min_similarity below 1, a question without an entry of its own is
+    answered from the most similar entry in the same scope, if their content
+    words overlap by at least min_similarity. Word order is ignored, so keep the
+    threshold high.
+
+    Only first messages are cached, because the answer to a follow-up depends on
+    the rest of the conversation, not just the question. The keys of first
+    messages waiting for their run are bounded like the entries, and dropped
+    after pending_ttl_seconds if the run is never streamed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        pending_ttl_seconds: float = ANSWER_CACHE_PENDING_TTL_SECONDS,
+        min_similarity: float = ANSWER_CACHE_SIMILARITY
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self.min_similarity = min_similarity
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        # Cache keys of first messages whose run has not been streamed yet, and when
+        # they were added, by thread ID in insertion order
+        self._pending: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(scope: str, assistant_id: str, user_input: str) -> str:
+        """
+        Returns the key for a question: a hash of scope and assistant ID, which
+        near-duplicates must share, followed by the normalized question.
+        """
+        group = hashlib.sha256(f"{scope}\x1f{assistant_id}".encode("utf-8")).hexdigest()
+        return f"{group}\x1f{normalize_question(user_input)}"
+
+    def _live(self, key: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+            del self._entries[key]
+            entry = None
+        return entry
+
+    def _most_similar(self, key: str) -> Optional[str]:
+        group, _, question = key.rpartition("\x1f")
+        terms = question_terms(question)
+        best_key: Optional[str] = None
+        best_similarity = self.min_similarity
+        for candidate_key, candidate in self._entries.items():
+            if candidate_key.rpartition("\x1f")[0] != group:
+                continue
+            score = similarity(terms, candidate.terms)
+            if score >= best_similarity:
+                best_key, best_similarity = candidate_key, score
+        return best_key
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        entry = self._live(key)
+        if entry is None and self.min_similarity < 1:
+            similar_key = self._most_similar(key)
+            if similar_key is not None:
+                key = similar_key
+                entry = self._live(key)
+                if entry is not None:
+                    self.near_hits += 1
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedAnswer) -> None:
+        entry.terms = question_terms(key.rpartition("\x1f")[2])
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self), "pending": len(self._pending),
+            "hits": self.hits, "near_hits": self.near_hits, "misses": self.misses, "evictions": self.evictions
+        }
+
+    def expect(self, thread_id: str, key: str) -> None:
+        """Marks the next run on a thread as the answer to be stored under key."""
+        now = time.monotonic()
+        self._pending[thread_id] = (key, now)
+        self._pending.move_to_end(thread_id)
+        while self._pending:
+            _, expected_at = next(iter(self._pending.values()))
+            if len(self._pending) <= self.max_entries and now - expected_at <= self.pending_ttl_seconds:
+                break
+            self._pending.popitem(last=False)
+
+    def take_pending(self, thread_id: str) -> Optional[str]:
+        """Removes and returns the key a thread's run should be stored under, if it has one."""
+        pending = self._pending.pop(thread_id, None)
+        if pending is None or time.monotonic() - pending[1] > self.pending_ttl_seconds:
+            return None
+        return pending[0]
+
+    async def record(
+        self,
+        key: str,
+        events: AsyncIterator[Union[SSEDelta, bytes]]
+    ) -> AsyncGenerator[Union[SSEDelta, bytes], None]:
+        """
+        Passes events through unchanged and stores them under key if the run
+        completes normally without calling a function tool.
+        """
+        recorded: List[Union[SSEDelta, bytes]] = []
+        cacheable = True
+        completed = False
+        async for event in events:
+            if cacheable:
+                if isinstance(event, bytes) and event.startswith(UNCACHEABLE_EVENTS):
+                    cacheable = False
+                    recorded = []
+                else:
+                    recorded.append(event)
+                    if isinstance(event, bytes) and event.startswith(b"event: endStream\n"):
+                        completed = True
+            yield event
+
+        if cacheable and completed:
+            answer_text = "".join(
+                event.text for event in recorded if isinstance(event, SSEDelta) and event.event == "textDelta"
+            )
+            step_ids = list(dict.fromkeys(event.step_id for event in recorded if isinstance(event, SSEDelta)))
+            if answer_text:
+                self.put(key, CachedAnswer(recorded, answer_text, step_ids))
+
+    @staticmethod
+    async def replay(
+        entry: CachedAnswer,
+        pacing_ms: int = ANSWER_CACHE_PACING_MS
+    ) -> AsyncGenerator[Union[SSEDelta, bytes], None]:
+        """
+        Yields the recorded events of a cached answer. Step IDs are given a fresh
+        suffix, so that replaying the same answer twice on one page does not
+        produce duplicate element IDs.
+        """
+        suffix = secrets.token_hex(3)
+        renamed = [(step_id.encode(), f"{step_id}-{suffix}".encode()) for step_id in entry.step_ids]
+        for event in entry.events:
+            if isinstance(event, SSEDelta):
+                if pacing_ms:
+                    await asyncio.sleep(pacing_ms / 1000)
+                yield SSEDelta(event.event, f"{event.step_id}-{suffix}", event.text)
+            else:
+                for step_id, new_step_id in renamed:
+                    event = event.replace(step_id, new_step_id)
+                yield event
+
+
+answer_cache = AnswerCache()
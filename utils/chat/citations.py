@@ -0,0 +1,221 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, UTC
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlmodel import Session, select
+from utils.core.db import engine
+from utils.chat.models import Document, Publication
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+MARKER_OPEN = "【"
+MARKER_CLOSE = "】"
+SOURCE_SEPARATOR = "†"
+
+# Longest marker body we will hold back before treating the opening bracket as literal text
+MAX_MARKER_LENGTH = 256
+
+# How often to reload the citation index from the database (0 disables periodic refresh)
+CITATION_INDEX_REFRESH_SECONDS = float(os.getenv("CITATION_INDEX_REFRESH_SECONDS") or "3600")
+
+
+# --- Citation Index ---
+
+
+def format_citation(authors: str, title: str, year: int) -> str:
+    return f'{authors}, "{title}", {year}'
+
+
+class CitationIndex:
+    """
+    In-memory map from document ID to (file URL, formatted citation), loaded from
+    the Document and Publication tables. Refreshing builds a new map and swaps it
+    in atomically, so lookups never see a partially loaded index. The version
+    stamp is a hash of the index contents and changes only when the data does.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[str, str]] = {}
+        self.version: str = ""
+        self.loaded_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, document_id: str) -> Optional[Tuple[str, str]]:
+        return self._entries.get(document_id)
+
+    def load(self, session: Session) -> bool:
+        """
+        Loads the index from the database. Returns True if the contents changed.
+        """
+        # Format each publication's citation once; many documents share a publication
+        citations: Dict[str, str] = {
+            publication.id: format_citation(publication.authors, publication.title, publication.publication_date.year)
+            for publication in session.exec(select(Publication))
+        }
+
+        entries: Dict[str, Tuple[str, str]] = {}
+        for document_id, publication_id, storage_url, download_url in session.exec(
+            select(Document.id, Document.publication_id, Document.storage_url, Document.download_url)
+        ):
+            citation = citations.get(publication_id)
+            if citation:
+                entries[document_id] = (storage_url or download_url, citation)
+
+        return self.update(entries)
+
+    def update(self, entries: Dict[str, Tuple[str, str]]) -> bool:
+        """
+        Replaces the index with the given map from document ID to (file URL, citation).
+        Returns True if the contents changed.
+        """
+        digest = hashlib.sha256()
+        for document_id in sorted(entries):
+            digest.update("\x1f".join((document_id, *entries[document_id])).encode("utf-8"))
+            digest.update(b"\x1e")
+        version = digest.hexdigest()[:12]
+
+        changed = version != self.version
+        self._entries = entries
+        self.version = version
+        self.loaded_at = datetime.now(UTC)
+        return changed
+
+    def refresh(self) -> bool:
+        """Reloads the index in a new database session. Errors are logged and the current index is kept."""
+        start = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                changed = self.load(session)
+        except Exception as e:
+            logger.error(f"Failed to load citation index: {e}")
+            return False
+        logger.info(
+            f"Loaded citation index version {self.version} with {len(self)} documents "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return changed
+
+    async def refresh_periodically(self, interval_seconds: float = CITATION_INDEX_REFRESH_SECONDS) -> None:
+        """Reloads the index every interval_seconds, off the event loop. Runs until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.refresh)
+
+
+citation_index = CitationIndex()
+
+
+# --- Helper Functions ---
+
+
+def resolve_citation(document_id: str) -> Optional[str]:
+    """
+    Returns the markdown citation and download link for a document ID, or None
+    if the document is unknown.
+    """
+    entry = citation_index.get(document_id)
+    if entry:
+        file_url, citation_text = entry
+        return f' ([{citation_text}]({file_url}))'
+    logger.warning(f"Could not find file URL or citation text for document ID: {document_id}")
+    return None
+
+
+# --- Helper Classes ---
+
+
+class CitationRewriter:
+    """
+    Incrementally rewrites file search citation markers such as 【4:0†dl_123.pdf】
+    in a stream of text deltas. Partial markers are carried across delta
+    boundaries, and every character is scanned once, so the cost is linear in the
+    length of the message. Text outside of markers is returned as soon as it is
+    fed; a marker's replacement is returned as soon as the marker closes.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[str], Optional[str]] = resolve_citation,
+        max_marker_length: int = MAX_MARKER_LENGTH
+    ):
+        self._resolve = resolve
+        self._max_marker_length = max_marker_length
+        self._in_marker = False
+        self._pending: List[str] = []
+        self._pending_length = 0
+
+    def _take_pending(self) -> str:
+        body = "".join(self._pending)
+        self._pending = []
+        self._pending_length = 0
+        return body
+
+    def _close_marker(self) -> str:
+        body = self._take_pending()
+        self._in_marker = False
+        _, separator, source = body.partition(SOURCE_SEPARATOR)
+        if separator:
+            replacement = self._resolve(source.split(".")[0])
+            if replacement is not None:
+                return replacement
+        # Not a citation we can resolve; keep the original text
+        return MARKER_OPEN + body + MARKER_CLOSE
+
+    def feed(self, text: str) -> str:
+        """Consumes a text delta and returns the rewritten text that is ready to send."""
+        if not self._in_marker and MARKER_OPEN not in text:
+            return text
+
+        output: List[str] = []
+        position = 0
+        length = len(text)
+        while position < length:
+            if not self._in_marker:
+                start = text.find(MARKER_OPEN, position)
+                if start == -1:
+                    output.append(text[position:])
+                    break
+                output.append(text[position:start])
+                self._in_marker = True
+                position = start + 1
+                continue
+
+            end = text.find(MARKER_CLOSE, position)
+            stop = length if end == -1 else end
+            reopen = text.find(MARKER_OPEN, position, stop)
+            if reopen != -1:
+                # The earlier opening bracket was literal text; restart the marker here
+                output.append(MARKER_OPEN + self._take_pending() + text[position:reopen])
+                position = reopen + 1
+                continue
+
+            self._pending.append(text[position:stop])
+            self._pending_length += stop - position
+            if end != -1:
+                output.append(self._close_marker())
+                position = end + 1
+            else:
+                if self._pending_length > self._max_marker_length:
+                    output.append(self.flush())
+                break
+
+        return "".join(output)
+
+    def flush(self) -> str:
+        """Returns any partial marker as literal text and resets the rewriter."""
+        if not self._in_marker:
+            return ""
+        self._in_marker = False
+        return MARKER_OPEN + self._take_pending()
@@ -0,0 +1,67 @@
+import os
+import logging
+import importlib.util
+import httpx
+from dotenv import load_dotenv
+from fastapi import Request
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS") or "100")
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS") or "20")
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY") or "30")
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT") or "5")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT") or "600")
+OPENAI_HTTP2 = (os.getenv("OPENAI_HTTP2") or "false").lower() == "true"
+
+
+# --- Functions ---
+
+
+def create_openai_client() -> AsyncOpenAI:
+    """
+    Creates the application-wide AsyncOpenAI client. The underlying httpx
+    connection pool is shared by every request, so concurrent runs reuse warm
+    keep-alive connections to the API instead of opening a new pool per request.
+
+    HTTP/2 is only enabled if OPENAI_HTTP2 is set and the optional h2 package is
+    installed (e.g. with `uv add "httpx[http2]"`).
+
+    Returns:
+        AsyncOpenAI: A client that must be closed on application shutdown.
+    """
+    http2 = OPENAI_HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("OPENAI_HTTP2 is enabled but the h2 package is not installed; falling back to HTTP/1.1")
+        http2 = False
+
+    http_client = DefaultAsyncHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    )
+    return AsyncOpenAI(http_client=http_client)
+
+
+def get_openai_client(request: Request) -> AsyncOpenAI:
+    """
+    Dependency that returns the shared AsyncOpenAI client created by the app
+    lifespan. Falls back to creating it on first use if the lifespan has not run
+    (e.g. in a TestClient used outside a `with` block).
+    """
+    client: AsyncOpenAI | None = getattr(request.app.state, "openai_client", None)
+    if client is None:
+        client = create_openai_client()
+        request.app.state.openai_client = client
+    return client
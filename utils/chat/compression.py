@@ -0,0 +1,113 @@
+import os
+import zlib
+import logging
+from typing import AsyncGenerator, AsyncIterator, Callable, Optional, Tuple
+from dotenv import load_dotenv
+from utils.chat.metrics import SSE_UNCOMPRESSED_BYTES, SSE_COMPRESSED_BYTES
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # Brotli is optional; without it we offer gzip and deflate only
+    brotli = None
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+SSE_COMPRESSION_ENABLED = (os.getenv("SSE_COMPRESSION_ENABLED") or "false").lower() == "true"
+# zlib level (1-9), also used as the brotli quality
+SSE_COMPRESSION_LEVEL = int(os.getenv("SSE_COMPRESSION_LEVEL") or "6")
+# Each open stream holds a compressor of roughly 2 ** (window_bits + 3) bytes (256 KiB at 15)
+SSE_COMPRESSION_WINDOW_BITS = int(os.getenv("SSE_COMPRESSION_WINDOW_BITS") or "15")
+
+# Encodings we can produce, most preferred first
+SUPPORTED_ENCODINGS: Tuple[str, ...] = (("br",) if brotli is not None else ()) + ("gzip", "deflate")
+
+
+# --- Helper Functions ---
+
+
+def negotiate_encoding(accept_encoding: Optional[str], enabled: bool = SSE_COMPRESSION_ENABLED) -> Optional[str]:
+    """
+    Picks the content coding for an event stream from an Accept-Encoding header:
+    the supported coding with the highest q-value, ties going to our preference
+    order. Returns None for an uncompressed stream.
+    """
+    if not enabled or not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+
+    wildcard = weights.get("*", 0.0)
+    best: Optional[str] = None
+    best_quality = 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        quality = weights.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def make_compressor(
+    encoding: str,
+    level: int = SSE_COMPRESSION_LEVEL,
+    window_bits: int = SSE_COMPRESSION_WINDOW_BITS
+) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """
+    Returns (compress_frame, finish) for an encoding. compress_frame returns all
+    the compressed bytes of a frame, flushed so the client can decode the frame
+    as soon as it arrives; finish returns the end of the compressed stream.
+    """
+    if encoding == "br":
+        assert brotli is not None
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=min(level, 11), lgwin=max(window_bits, 10))
+        return (lambda frame: compressor.process(frame) + compressor.flush()), compressor.finish
+
+    # gzip and zlib (HTTP's "deflate") framing of the same deflate stream
+    wbits = window_bits + 16 if encoding == "gzip" else window_bits
+    deflate = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    return (lambda frame: deflate.compress(frame) + deflate.flush(zlib.Z_SYNC_FLUSH)), deflate.flush
+
+
+async def compress_stream(frames: AsyncIterator[bytes], encoding: str) -> AsyncGenerator[bytes, None]:
+    """
+    Compresses an event stream with a single compressor for the whole
+    connection, so the markup repeated across frames (the event names and
+    hx-swap-oob wrappers) costs a few bytes after its first occurrence. Every
+    frame is flushed, which keeps the stream incremental for the browser and
+    for proxies that pass chunks through.
+    """
+    compress_frame, finish = make_compressor(encoding)
+    raw_bytes = 0
+    compressed_bytes = 0
+    try:
+        async for frame in frames:
+            chunk = compress_frame(frame)
+            raw_bytes += len(frame)
+            compressed_bytes += len(chunk)
+            yield chunk
+        tail = finish()
+        compressed_bytes += len(tail)
+        yield tail
+    finally:
+        # Close the source now rather than on garbage collection, as with an uncompressed stream
+        aclose = getattr(frames, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        SSE_UNCOMPRESSED_BYTES.inc(encoding, amount=raw_bytes)
+        SSE_COMPRESSED_BYTES.inc(encoding, amount=compressed_bytes)
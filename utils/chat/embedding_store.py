@@ -0,0 +1,316 @@
+import os
+import time
+import shutil
+import struct
+import logging
+import argparse
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import numpy.typing as npt
+from dotenv import load_dotenv
+from sqlmodel import Session, select
+from utils.chat.models import Embedding
+from utils.core.db import engine
+from utils.chat.vectors import VECTOR_LOAD_BATCH_SIZE, VectorIndex, normalize_rows
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Path of the embedding store exported for EMBEDDING_STORE_MODEL; node IDs are kept next to it in <path>.ids
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH") or "data/embeddings.bin"
+EMBEDDING_STORE_MODEL = os.getenv("EMBEDDING_STORE_MODEL") or "text-embedding-3-small"
+# float32, or float16 to halve the file and page cache footprint at a small loss of precision
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE") or "float32"
+
+STORE_MAGIC = b"CCDREMB\x00"
+STORE_VERSION = 1
+# magic, version, bytes per element, dimensions, row count, created_at watermark
+# (microseconds since the epoch, -1 if empty), model name
+HEADER_FORMAT = struct.Struct("<8sIIIQq100s")
+# Row data starts after a fixed-size header, so rows stay aligned as the header grows
+HEADER_BYTES = 256
+ROW_DTYPES: Dict[str, np.dtype] = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+# Node IDs are fixed-width UTF-8 (ContentNode.id is at most 50 characters), so the sidecar can be mapped too
+NODE_ID_DTYPE = np.dtype("S50")
+
+
+# --- Helper Classes ---
+
+
+@dataclass(frozen=True)
+class StoreHeader:
+    """The header of an embedding store file."""
+    model_name: str
+    dtype: np.dtype
+    dimensions: int
+    count: int
+    watermark: Optional[datetime]
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dimensions * self.dtype.itemsize
+
+    def pack(self) -> bytes:
+        watermark = -1 if self.watermark is None else to_microseconds(self.watermark)
+        header = HEADER_FORMAT.pack(
+            STORE_MAGIC, STORE_VERSION, self.dtype.itemsize, self.dimensions, self.count,
+            watermark, self.model_name.encode("utf-8")
+        )
+        return header.ljust(HEADER_BYTES, b"\x00")
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "StoreHeader":
+        magic, version, itemsize, dimensions, count, watermark, model_name = HEADER_FORMAT.unpack_from(data)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError("Not an embedding store, or written by an incompatible version")
+        dtype = next(dtype for dtype in ROW_DTYPES.values() if dtype.itemsize == itemsize)
+        return cls(
+            model_name.rstrip(b"\x00").decode("utf-8"), dtype, dimensions, count,
+            None if watermark < 0 else from_microseconds(watermark)
+        )
+
+
+class EmbeddingStore:
+    """
+    A read-only view of an embedding store file: a fixed-size header, then one
+    unit-length float32 or float16 row per content node, with the rows' node IDs
+    in a fixed-width sidecar file (<path>.ids).
+
+    Both files are memory-mapped, so every worker process that opens the store
+    shares one copy of the rows in the OS page cache, and opening it costs no
+    more than reading the header. Only the rows counted in the header are
+    mapped, and mapped rows are never written again: rows appended since, or
+    the file that replaced this one when rows were updated, are picked up by
+    reload().
+    """
+
+    def __init__(self, path: Path | str):
+        self.path: Path = Path(path)
+        self.header: StoreHeader = read_header(self.path)
+        self.inode: int = self.path.stat().st_ino
+        self.matrix: npt.NDArray[np.floating] = np.zeros((0, self.header.dimensions), self.header.dtype)
+        self.node_ids: npt.NDArray[np.bytes_] = np.zeros(0, NODE_ID_DTYPE)
+        self._map()
+
+    def _map(self) -> None:
+        if not self.header.count:
+            return
+        self.matrix = np.memmap(
+            self.path, dtype=self.header.dtype, mode="r", offset=HEADER_BYTES,
+            shape=(self.header.count, self.header.dimensions)
+        )
+        self.node_ids = np.memmap(ids_path(self.path), dtype=NODE_ID_DTYPE, mode="r", shape=(self.header.count,))
+
+    def __len__(self) -> int:
+        return self.header.count
+
+    @property
+    def model_name(self) -> str:
+        return self.header.model_name
+
+    def reload(self) -> bool:
+        """Maps the store again if rows were appended or updated since it was opened. Returns True if it was."""
+        header, inode = read_header(self.path), self.path.stat().st_ino
+        if header == self.header and inode == self.inode:
+            return False
+        self.header, self.inode = header, inode
+        self._map()
+        return True
+
+    def index(self) -> VectorIndex:
+        """Returns a VectorIndex over the mapped rows, without copying them."""
+        return VectorIndex.from_normalized(self.model_name, self.node_ids, self.matrix)
+
+
+# --- Helper Functions ---
+
+
+def to_microseconds(moment: datetime) -> int:
+    """Microseconds since the epoch; naive datetimes (as stored in Embedding.created_at) are UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    return (moment - datetime(1970, 1, 1, tzinfo=UTC)) // timedelta(microseconds=1)
+
+
+def from_microseconds(microseconds: int) -> datetime:
+    return datetime(1970, 1, 1, tzinfo=UTC) + timedelta(microseconds=microseconds)
+
+
+def ids_path(path: Path) -> Path:
+    return path.with_name(path.name + ".ids")
+
+
+def read_header(path: Path) -> StoreHeader:
+    with open(path, "rb") as file:
+        return StoreHeader.unpack(file.read(HEADER_BYTES))
+
+
+def append_embeddings(
+    path: Path | str,
+    model_name: str,
+    rows: Iterable[Tuple[str, Sequence[float], datetime]],
+    dtype: str = EMBEDDING_STORE_DTYPE,
+    batch_size: int = VECTOR_LOAD_BATCH_SIZE
+) -> StoreHeader:
+    """
+    Adds (node ID, vector, created_at) rows, oldest first, to the store at path,
+    creating it with the given row dtype if needed. Nodes new to the store are
+    appended after the last row, past what readers have mapped. Readers may
+    still map the existing rows, so re-embedded nodes are never overwritten in
+    place: on the first row whose vector changed, the file is copied to a
+    temporary file, which takes all further writes and then replaces the store
+    with os.replace. Readers keep the old file until they reload(); rows
+    re-exported unchanged are skipped, so an export without updates still only
+    appends. The header (row count and created_at watermark) is written last,
+    after the rows are synced, so readers never map a row that is not fully
+    written.
+    """
+    path = Path(path)
+    if path.exists():
+        header = read_header(path)
+        if header.model_name != model_name:
+            raise ValueError(f"{path} holds {header.model_name} embeddings, not {model_name}")
+        existing = np.fromfile(ids_path(path), dtype=NODE_ID_DTYPE, count=header.count)
+        positions = {node_id.decode("utf-8"): row for row, node_id in enumerate(existing.tolist())}
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = StoreHeader(model_name, ROW_DTYPES[dtype], 0, 0, None)
+        path.write_bytes(header.pack())
+        ids_path(path).write_bytes(b"")
+        positions = {}
+
+    count, dimensions = header.count, header.dimensions
+    watermark = -1 if header.watermark is None else to_microseconds(header.watermark)
+    appended = updated = skipped = 0
+    copy_path = path.with_name(path.name + ".tmp")
+    data: BinaryIO = open(path, "r+b")
+    copied = False
+    try:
+        with open(ids_path(path), "r+b") as ids:
+            def write(batch: Dict[str, npt.NDArray[np.float32]]) -> None:
+                nonlocal data, copied, count, appended, updated
+                node_ids = list(batch)
+                matrix = normalize_rows(np.stack(list(batch.values()))).astype(header.dtype)
+                new_rows: List[int] = []
+                for row, node_id in enumerate(node_ids):
+                    position = positions.get(node_id)
+                    if position is None:
+                        positions[node_id] = count + len(new_rows)
+                        new_rows.append(row)
+                        continue
+                    offset = HEADER_BYTES + position * header.row_bytes
+                    data.seek(offset)
+                    if data.read(header.row_bytes) == matrix[row].tobytes():
+                        continue
+                    if not copied:
+                        data.flush()
+                        shutil.copyfile(path, copy_path)
+                        data.close()
+                        data = open(copy_path, "r+b")
+                        copied = True
+                    data.seek(offset)
+                    data.write(matrix[row].tobytes())
+                    updated += 1
+                # New nodes take consecutive rows at the end, so they are written at once
+                data.seek(HEADER_BYTES + count * header.row_bytes)
+                data.write(matrix[new_rows].tobytes())
+                ids.seek(count * NODE_ID_DTYPE.itemsize)
+                ids.write(np.array([node_ids[row].encode("utf-8") for row in new_rows], dtype=NODE_ID_DTYPE).tobytes())
+                count += len(new_rows)
+                appended += len(new_rows)
+
+            batch: Dict[str, npt.NDArray[np.float32]] = {}
+            for node_id, vector, created_at in rows:
+                if not dimensions:
+                    dimensions = len(vector)
+                    header = replace(header, dimensions=dimensions)
+                if len(vector) != dimensions:
+                    skipped += 1
+                    continue
+                if len(node_id.encode("utf-8")) > NODE_ID_DTYPE.itemsize:
+                    raise ValueError(f"Node ID {node_id} is longer than {NODE_ID_DTYPE.itemsize} bytes")
+                # A node embedded twice in one batch keeps its newest vector
+                batch.pop(node_id, None)
+                batch[node_id] = np.asarray(vector, dtype=np.float32)
+                watermark = max(watermark, to_microseconds(created_at))
+                if len(batch) >= batch_size:
+                    write(batch)
+                    batch = {}
+            if batch:
+                write(batch)
+
+            # Node IDs are only ever appended, so they are synced before the rows that refer to them
+            ids.flush()
+            os.fsync(ids.fileno())
+        data.flush()
+        os.fsync(data.fileno())
+        header = replace(header, count=count, watermark=None if watermark < 0 else from_microseconds(watermark))
+        data.seek(0)
+        data.write(header.pack())
+        data.flush()
+        os.fsync(data.fileno())
+    finally:
+        data.close()
+    if copied:
+        os.replace(copy_path, path)
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} {model_name} embeddings whose length is not {dimensions}")
+    logger.info(f"Appended {appended} and updated {updated} {model_name} embeddings in {path} ({count} rows)")
+    return header
+
+
+def export_embeddings(
+    session: Session,
+    path: Path | str = EMBEDDING_STORE_PATH,
+    model_name: str = EMBEDDING_STORE_MODEL,
+    dtype: str = EMBEDDING_STORE_DTYPE,
+    batch_size: int = VECTOR_LOAD_BATCH_SIZE
+) -> StoreHeader:
+    """
+    Exports the embeddings of model_name to the store at path. If the store
+    exists, only embeddings created at or after its watermark are read and
+    added; those at the watermark itself are read again, and skipped if
+    unchanged, so rows committed with the same created_at as the last export
+    are not missed.
+    """
+    start = time.perf_counter()
+    statement = (
+        select(Embedding.node_id, Embedding.embedding_vector, Embedding.created_at)
+        .where(Embedding.model_name == model_name)
+        .order_by(Embedding.created_at)  # type: ignore[arg-type]
+        .execution_options(yield_per=batch_size)
+    )
+    if Path(path).exists():
+        watermark = read_header(Path(path)).watermark
+        if watermark is not None:
+            # Embedding.created_at is stored without a time zone, in UTC
+            statement = statement.where(Embedding.created_at >= watermark.replace(tzinfo=None))
+    header = append_embeddings(path, model_name, session.exec(statement), dtype, batch_size)
+    logger.info(f"Exported {model_name} embeddings to {path} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return header
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exports or appends embeddings to a memory-mapped embedding store")
+    parser.add_argument("--path", default=EMBEDDING_STORE_PATH)
+    parser.add_argument("--model", default=EMBEDDING_STORE_MODEL)
+    parser.add_argument("--dtype", default=EMBEDDING_STORE_DTYPE, choices=sorted(ROW_DTYPES))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        header = export_embeddings(session, args.path, args.model, args.dtype)
+    print(f"{args.path}: {header.count} x {header.dimensions} {header.dtype.name} rows, watermark {header.watermark}")
+
+
+if __name__ == "__main__":
+    main()
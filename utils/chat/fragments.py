@@ -0,0 +1,149 @@
+import os
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from jinja2 import Environment
+from markupsafe import escape
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Disable to render every fragment through Jinja, e.g. while editing templates
+CHAT_FRAGMENT_CACHE_ENABLED = (os.getenv("CHAT_FRAGMENT_CACHE_ENABLED") or "true").lower() == "true"
+# Compiled variants kept per fragment; variants beyond this are rendered through Jinja
+CHAT_FRAGMENT_MAX_VARIANTS = int(os.getenv("CHAT_FRAGMENT_MAX_VARIANTS") or "32")
+
+# Slot values are rendered as placeholders delimited by private-use characters,
+# which never occur in real output. The "&" shows whether autoescaping applied at
+# each position: it comes out as "&amp;" where the value is escaped.
+PLACEHOLDER_MARKERS = (("\ue000", "\ue001"), ("\ue002", "\ue003"))
+ESCAPED_AMPERSAND = "&amp;"
+
+
+# --- Helper Classes ---
+
+
+@dataclass(frozen=True)
+class CompiledFragment:
+    """
+    A template variant split into literal text and slots: the output is head,
+    then for each (slot, escaped, literal) segment the slot's value (escaped if
+    autoescaping applied at that position) followed by the literal.
+    """
+    head: str
+    segments: Tuple[Tuple[str, bool, str], ...]
+
+    def render(self, values: Dict[str, Any]) -> str:
+        parts = [self.head]
+        for slot, escaped, literal in self.segments:
+            value = values[slot]
+            parts.append(escape(value) if escaped else str(value))
+            parts.append(literal)
+        return "".join(parts)
+
+
+class FragmentRenderer:
+    """
+    Renders a small template that is sent many times with different values, such
+    as the container of each assistant step, without going through Jinja per call.
+
+    The slots are the variables whose values change on every call (e.g. step_id);
+    they may only be printed, not tested or filtered. Every other variable selects
+    a variant (e.g. step_type), which is rendered through Jinja once, with
+    placeholders for the slots, and cached as literal text to be joined with the
+    slot values. A request variable selects a variant per base URL, for url_for.
+
+    A variant is rendered twice with different placeholders, and is only cached
+    if both renderings split into the same literal text; otherwise (a slot that
+    changes the template's structure, or is transformed on output) the fragment
+    falls back to rendering through Jinja, so the output is always the
+    template's.
+    """
+
+    def __init__(
+        self,
+        environment: Environment,
+        template_name: str,
+        slots: Sequence[str],
+        max_variants: int = CHAT_FRAGMENT_MAX_VARIANTS,
+        enabled: bool = CHAT_FRAGMENT_CACHE_ENABLED
+    ):
+        self.template_name: str = template_name
+        self.slots: Tuple[str, ...] = tuple(slots)
+        self.max_variants: int = max_variants
+        self.enabled: bool = enabled
+        self._template = environment.get_template(template_name)
+        self._variants: Dict[Hashable, Optional[CompiledFragment]] = {}
+
+    def _variant_key(self, context: Dict[str, Any]) -> Optional[Hashable]:
+        """
+        Returns the key of the variant selected by context, or None if it has
+        unhashable values. Keyword order is part of the key, which is cheaper than
+        sorting and holds still at any one call site.
+        """
+        key: List[Any] = []
+        for name, value in context.items():
+            if name in self.slots:
+                continue
+            key.append(name)
+            key.append(str(value.base_url) if name == "request" else value)
+        variant_key = tuple(key)
+        try:
+            hash(variant_key)
+        except TypeError:
+            return None
+        return variant_key
+
+    def _split(self, output: str, markers: Tuple[str, str]) -> Optional[CompiledFragment]:
+        opening, closing = markers
+        pattern = re.compile(f"{opening}slot(\\d+)(&amp;|&){closing}")
+        pieces = pattern.split(output)
+        literals = pieces[::3]
+        if any(opening in literal or closing in literal for literal in literals):
+            return None
+        segments = tuple(
+            (self.slots[int(pieces[index])], pieces[index + 1] == ESCAPED_AMPERSAND, pieces[index + 2])
+            for index in range(1, len(pieces), 3)
+        )
+        return CompiledFragment(literals[0], segments)
+
+    def compile(self, **context: Any) -> Optional[CompiledFragment]:
+        """
+        Compiles the variant selected by context (which must not include the
+        slots), or returns None if the template cannot be split at its slots.
+        """
+        compiled: List[Optional[CompiledFragment]] = []
+        for opening, closing in PLACEHOLDER_MARKERS:
+            placeholders = {slot: f"{opening}slot{index}&{closing}" for index, slot in enumerate(self.slots)}
+            compiled.append(self._split(self._template.render(**context, **placeholders), (opening, closing)))
+        if compiled[0] is None or compiled[0] != compiled[1]:
+            logger.warning(f"Cannot precompile {self.template_name} for {sorted(context)}; rendering it with Jinja")
+            return None
+        return compiled[0]
+
+    def warm(self, **context: Any) -> None:
+        """Compiles a variant ahead of its first use."""
+        key = self._variant_key(context)
+        if self.enabled and key is not None and key not in self._variants:
+            self._variants[key] = self.compile(**context)
+
+    def render(self, **context: Any) -> str:
+        """Renders the template with context, which includes the slots."""
+        if self.enabled:
+            key = self._variant_key(context)
+            if key is not None:
+                if key not in self._variants and len(self._variants) < self.max_variants:
+                    self._variants[key] = self.compile(**{
+                        name: value for name, value in context.items() if name not in self.slots
+                    })
+                compiled = self._variants.get(key)
+                if compiled is not None:
+                    return compiled.render(context)
+        return self._template.render(**context)
@@ -1,11 +1,20 @@
 import random
 import logging
-from datetime import datetime
-from typing import Sequence
+from datetime import date, datetime
+from typing import List, Sequence
+from pydantic import BaseModel, Field
+from utils.chat.tools import tool_registry
 
 logger = logging.getLogger("uvicorn.error")
 
-def get_weather(location, dates: Sequence[str | datetime] = [datetime.today()]):
+
+class WeatherArguments(BaseModel):
+    location: str = "Unknown"
+    dates: List[date] = Field(default_factory=lambda: [date.today()])
+
+
+@tool_registry.register("get_weather", WeatherArguments, template="chat/weather-widget.html", timeout=10)
+def get_weather(location, dates: Sequence[str | date] = [datetime.today()]):
     """
     Generate random weather reports for a given location over a date range.
 
@@ -19,9 +28,9 @@ def get_weather(location, dates: Sequence[str | datetime] = [datetime.today()]):
     """
     weather_reports = []
 
-    for date in dates:
-        if isinstance(date, datetime):
-            date = date.strftime("%Y-%m-%d")
+    for report_date in dates:
+        if isinstance(report_date, date):
+            report_date = report_date.strftime("%Y-%m-%d")
 
         # Choose a random temperature and condition
         random_temperature = random.randint(50, 80)
@@ -30,11 +39,10 @@ def get_weather(location, dates: Sequence[str | datetime] = [datetime.today()]):
 
         weather_reports.append({
             "location": location,
-            "date": date,
+            "date": report_date,
             "temperature": random_temperature,
             "unit": "F",
             "conditions": random_condition,
         })
 
     return weather_reports
-
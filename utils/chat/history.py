@@ -0,0 +1,171 @@
+import os
+import re
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from openai.types.beta.threads import Message as ThreadMessage
+from utils.chat.citations import CitationRewriter, citation_index
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE") or "20")
+CHAT_HISTORY_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_HISTORY_CACHE_MAX_ENTRIES") or "500")
+
+# The date line that format_user_message adds to every user message, hidden when showing history
+SYSTEM_PREFIX_PATTERN = re.compile(r"\ASystem: Today's date is \d{4}-\d{2}-\d{2}\n")
+
+# Owner's user ID, thread ID, newest message ID or cursor, citation index version
+HistoryKey = Tuple[Optional[int], str, str, str]
+
+
+# --- Helper Classes ---
+
+
+@dataclass
+class HistoryMessage:
+    id: str
+    role: str
+    text: str
+    image_file_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class HistoryPage:
+    """
+    A rendered page of thread messages, oldest first. before is the cursor for
+    the next older page, or None if this page reaches the start of the thread.
+    """
+    html: str
+    before: Optional[str]
+
+
+class HistoryPageCache:
+    """
+    LRU cache of rendered history pages. The newest page of a thread is keyed by
+    the ID of the thread's last message, so it is invalidated by any new message;
+    older pages are keyed by their cursor, since messages are never inserted
+    before existing ones. Keys include the ID of the user the page was loaded
+    for, so a page is only served to the thread's owner, and the citation index
+    version, which the rendered citations depend on.
+    """
+
+    def __init__(self, max_entries: int = CHAT_HISTORY_CACHE_MAX_ENTRIES):
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: "OrderedDict[HistoryKey, HistoryPage]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(owner: Optional[int], thread_id: str, anchor: str) -> HistoryKey:
+        return (owner, thread_id, anchor, citation_index.version)
+
+    def get(self, key: HistoryKey) -> Optional[HistoryPage]:
+        page = self._entries.get(key)
+        if page is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return page
+
+    def put(self, key: HistoryKey, page: HistoryPage) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = page
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# --- Functions ---
+
+
+def to_history_message(message: ThreadMessage, file_url: Callable[[str], str]) -> HistoryMessage:
+    """
+    Converts a thread message for display: text blocks are joined, citation
+    markers are rewritten as they are when streaming, sandbox file links point
+    to our download route, and the date prefix of user messages is removed.
+    """
+    texts: List[str] = []
+    image_file_ids: List[str] = []
+    for content in message.content:
+        if content.type == "text":
+            text = content.text.value
+            for annotation in content.text.annotations:
+                if annotation.type == "file_path":
+                    text = text.replace(annotation.text, file_url(annotation.file_path.file_id))
+            if message.role == "assistant":
+                rewriter = CitationRewriter()
+                text = rewriter.feed(text) + rewriter.flush()
+            texts.append(text)
+        elif content.type == "image_file":
+            image_file_ids.append(content.image_file.file_id)
+
+    text = "\n\n".join(texts)
+    if message.role == "user":
+        text = SYSTEM_PREFIX_PATTERN.sub("", text)
+    return HistoryMessage(message.id, message.role, text, image_file_ids)
+
+
+async def load_history_page(
+    client: AsyncOpenAI,
+    thread_id: str,
+    owner: Optional[int],
+    render: Callable[[List[HistoryMessage], Optional[str]], str],
+    file_url: Callable[[str], str],
+    before: Optional[str] = None,
+    page_size: int = CHAT_HISTORY_PAGE_SIZE,
+    cache: Optional[HistoryPageCache] = None
+) -> HistoryPage:
+    """
+    Returns the page of messages preceding the message ID before, or the
+    newest page if before is None, rendered with render(messages, before).
+    The caller must have checked that owner owns the thread; pages are cached
+    per owner.
+
+    For the newest page, a one-message query finds the last message ID first,
+    so that reopening an unchanged thread is served from the cache without
+    fetching the page. Pages with a message still being written are not cached.
+    """
+    cache = cache if cache is not None else history_cache
+    if before is None:
+        latest = await client.beta.threads.messages.list(thread_id, order="desc", limit=1)
+        if not latest.data:
+            return HistoryPage("", None)
+        key = cache.make_key(owner, thread_id, latest.data[0].id)
+    else:
+        key = cache.make_key(owner, thread_id, f"before:{before}")
+
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    if before is None:
+        messages_page = await client.beta.threads.messages.list(thread_id, order="desc", limit=page_size)
+    else:
+        messages_page = await client.beta.threads.messages.list(
+            thread_id, order="desc", limit=page_size, after=before
+        )
+    messages = messages_page.data
+    older = messages[-1].id if messages and messages_page.has_more else None
+    history = [to_history_message(message, file_url) for message in reversed(messages)]
+    page = HistoryPage(render(history, older), older)
+
+    if all(message.status != "in_progress" for message in messages):
+        cache.put(key, page)
+    return page
+
+
+history_cache = HistoryPageCache()
@@ -0,0 +1,342 @@
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from dataclasses import dataclass
+from itertools import chain, groupby
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import numpy.typing as npt
+from dotenv import load_dotenv
+from sqlmodel import Session, select
+from utils.chat.models import ContentNode
+from utils.chat.embedding_store import NODE_ID_DTYPE
+from utils.chat.vectors import top_k_rows
+from utils.core.db import engine
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Directory of the BM25 index: merged postings, plus one segment per Document for incremental rebuilds
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH") or "data/bm25"
+
+LEXICAL_INDEX_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Words, numbers and figures such as "2.5", "1,200" or "co2"; punctuation inside a number is kept
+TOKEN_PATTERN = re.compile(r"\w+(?:[.,]\d+)*")
+# Longer tokens (URLs, hashes) are never searched for, and would widen the vocabulary array
+MAX_TERM_LENGTH = 32
+
+
+# --- Helper Functions ---
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into terms of at most MAX_TERM_LENGTH characters."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) <= MAX_TERM_LENGTH]
+
+
+def node_text(content: Optional[str], raw_content: Optional[str]) -> str:
+    """The text indexed for a content node: its cleaned content, or its raw content if there is none."""
+    return content or raw_content or ""
+
+
+def bm25_impacts(postings: "Postings", k1: float = BM25_K1, b: float = BM25_B) -> npt.NDArray[np.float32]:
+    """
+    Returns each posting's BM25 score contribution,
+    idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average length)),
+    with idf = ln(1 + (nodes - df + 0.5) / (df + 0.5)), which is always positive.
+    """
+    lengths = np.asarray(postings.lengths, dtype=np.float32)
+    average = lengths.mean() if len(lengths) and lengths.mean() else 1.0
+    norms = k1 * (1 - b + b * lengths / average)
+    document_frequencies = np.diff(postings.offsets)
+    idf = np.log1p((len(lengths) - document_frequencies + 0.5) / (document_frequencies + 0.5)).astype(np.float32)
+    frequencies = np.asarray(postings.frequencies, dtype=np.float32)
+    return (np.repeat(idf, document_frequencies) * frequencies * (k1 + 1) / (frequencies + norms[postings.rows])).astype(np.float32)
+
+
+# --- Helper Classes ---
+
+
+@dataclass
+class Postings:
+    """
+    Term postings in compact arrays: terms is the sorted vocabulary, and the
+    postings of terms[i] are rows[offsets[i]:offsets[i + 1]] (ascending node
+    rows) with their term frequencies in frequencies. lengths holds each node's
+    term count.
+    """
+    node_ids: npt.NDArray[np.bytes_]
+    lengths: npt.NDArray[np.int32]
+    terms: npt.NDArray[np.str_]
+    offsets: npt.NDArray[np.int64]
+    rows: npt.NDArray[np.int32]
+    frequencies: npt.NDArray[np.int32]
+
+    ARRAYS = ("node_ids", "lengths", "terms", "offsets", "rows", "frequencies")
+
+    @classmethod
+    def build(cls, nodes: Sequence[Tuple[str, str]]) -> "Postings":
+        """Tokenizes (node ID, text) pairs and inverts them into postings."""
+        tokens = [tokenize(text) for _, text in nodes]
+        lengths = np.fromiter((len(node_tokens) for node_tokens in tokens), dtype=np.int32, count=len(nodes))
+        terms, term_ids = np.unique(np.array(list(chain.from_iterable(tokens)), dtype=np.str_), return_inverse=True)
+        node_rows = np.repeat(np.arange(len(nodes), dtype=np.int64), lengths)
+        # Each distinct (term, node) pair once, sorted by term then node, with its count
+        pairs, frequencies = np.unique(term_ids.astype(np.int64) * max(len(nodes), 1) + node_rows, return_counts=True)
+        pair_terms = pairs // max(len(nodes), 1)
+        return cls(
+            node_ids=np.array([node_id.encode("utf-8") for node_id, _ in nodes], dtype=NODE_ID_DTYPE),
+            lengths=lengths,
+            terms=terms,
+            offsets=np.searchsorted(pair_terms, np.arange(len(terms) + 1)).astype(np.int64),
+            rows=(pairs % max(len(nodes), 1)).astype(np.int32),
+            frequencies=frequencies.astype(np.int32),
+        )
+
+    @classmethod
+    def merge(cls, segments: Sequence["Postings"]) -> "Postings":
+        """Concatenates segments' nodes, in order, and merges their postings without re-tokenizing."""
+        terms = np.unique(np.concatenate([segment.terms for segment in segments] or [np.array([], np.str_)]))
+        term_ids, rows, frequencies = [], [], []
+        base = 0
+        for segment in segments:
+            global_ids = np.searchsorted(terms, segment.terms)
+            term_ids.append(np.repeat(global_ids, np.diff(segment.offsets)))
+            rows.append(segment.rows.astype(np.int64) + base)
+            frequencies.append(segment.frequencies)
+            base += len(segment.node_ids)
+        all_term_ids = np.concatenate(term_ids or [np.array([], np.int64)])
+        # Rows ascend within and across segments, so a stable sort by term keeps each term's postings in row order
+        order = np.argsort(all_term_ids, kind="stable")
+        return cls(
+            node_ids=np.concatenate([segment.node_ids for segment in segments] or [np.array([], NODE_ID_DTYPE)]),
+            lengths=np.concatenate([segment.lengths for segment in segments] or [np.array([], np.int32)]),
+            terms=terms,
+            offsets=np.searchsorted(all_term_ids[order], np.arange(len(terms) + 1)).astype(np.int64),
+            rows=np.concatenate(rows or [np.array([], np.int64)])[order].astype(np.int32),
+            frequencies=np.concatenate(frequencies or [np.array([], np.int32)])[order],
+        )
+
+    def save(self, path: Path) -> None:
+        np.savez(path, **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path: Path) -> "Postings":
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in cls.ARRAYS})
+
+
+class BM25Index:
+    """
+    A BM25 inverted index over the text of every ContentNode, for exact terms
+    (program names, figures, acronyms) that semantic search misses.
+
+    The index is kept as one Postings segment per Document, so a document can
+    be re-indexed on its own, and a merged Postings over all of them that
+    queries run against. Each posting's BM25 contribution (its impact, which
+    depends only on the term, the node and corpus statistics) is precomputed
+    when the segments are merged, so a query adds up its terms' impacts per
+    node and takes the top k of the nodes it matched with a partial sort.
+    Terms are added rarest first, and once the remaining (common) terms cannot
+    lift an unmatched node into the top k, they are only looked up for the
+    nodes already matched.
+
+    Saved to a directory: the merged arrays as .npy files, loaded by memory
+    map, and the segments in documents/<document_id>.npz.
+    """
+
+    def __init__(
+        self,
+        postings: Postings,
+        documents: Sequence[str],
+        impacts: Optional[npt.NDArray[np.float32]] = None,
+        term_max: Optional[npt.NDArray[np.float32]] = None
+    ):
+        self.postings: Postings = postings
+        self.documents: List[str] = list(documents)
+        self.impacts: npt.NDArray[np.float32] = bm25_impacts(postings) if impacts is None else impacts
+        if term_max is None:
+            term_max = np.maximum.reduceat(self.impacts, postings.offsets[:-1]) if len(self.impacts) else np.zeros(0, np.float32)
+        # The largest impact of each term, bounding what it can add to any node's score
+        self.term_max: npt.NDArray[np.float32] = term_max
+
+    def __len__(self) -> int:
+        return len(self.postings.node_ids)
+
+    @classmethod
+    def from_segments(cls, segments: Dict[str, Postings]) -> "BM25Index":
+        documents = sorted(segments)
+        return cls(Postings.merge([segments[document_id] for document_id in documents]), documents)
+
+    @classmethod
+    def build(cls, session: Session, path: Optional[Path | str] = None) -> "BM25Index":
+        """Indexes every document's content nodes, and saves the index to path if given."""
+        start = time.perf_counter()
+        statement = (
+            select(ContentNode.document_id, ContentNode.id, ContentNode.content, ContentNode.raw_content)
+            .order_by(ContentNode.document_id, ContentNode.sequence_in_document)  # type: ignore[arg-type]
+        )
+        segments: Dict[str, Postings] = {}
+        for document_id, nodes in groupby(session.exec(statement), key=lambda node: node[0]):
+            segment_nodes = [(node_id, node_text(content, raw_content)) for _, node_id, content, raw_content in nodes]
+            segments[document_id] = Postings.build(segment_nodes)
+        index = cls.from_segments(segments)
+        logger.info(
+            f"Built BM25 index of {len(index)} content nodes in {len(segments)} documents "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        if path is not None:
+            index.save(path, segments)
+        return index
+
+    @classmethod
+    def update_documents(cls, session: Session, document_ids: Iterable[str], path: Path | str) -> "BM25Index":
+        """
+        Re-indexes the given documents in the saved index at path, reusing every
+        other document's saved segment, and saves the result. A document without
+        content nodes is dropped from the index.
+        """
+        start = time.perf_counter()
+        path = Path(path)
+        segments = {segment.stem: Postings.load(segment) for segment in (path / "documents").glob("*.npz")}
+        updated = sorted(set(document_ids))
+        for document_id in updated:
+            statement = (
+                select(ContentNode.id, ContentNode.content, ContentNode.raw_content)
+                .where(ContentNode.document_id == document_id)
+                .order_by(ContentNode.sequence_in_document)  # type: ignore[arg-type]
+            )
+            nodes = [(node_id, node_text(content, raw_content)) for node_id, content, raw_content in session.exec(statement)]
+            segments.pop(document_id, None)
+            (path / "documents" / f"{document_id}.npz").unlink(missing_ok=True)
+            if nodes:
+                segments[document_id] = Postings.build(nodes)
+        index = cls.from_segments(segments)
+        index.save(path, {document_id: segments[document_id] for document_id in updated if document_id in segments})
+        logger.info(
+            f"Re-indexed {len(updated)} documents in the BM25 index ({len(index)} content nodes) "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return index
+
+    def save(self, path: Path | str, segments: Dict[str, Postings]) -> None:
+        """Saves the merged postings, and the given (new or changed) document segments."""
+        path = Path(path)
+        (path / "documents").mkdir(parents=True, exist_ok=True)
+        for document_id, segment in segments.items():
+            segment.save(path / "documents" / f"{document_id}.npz")
+        for name in Postings.ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self.postings, name))
+        np.save(path / "impacts.npy", self.impacts)
+        np.save(path / "term_max.npy", self.term_max)
+        (path / "index.json").write_text(json.dumps({
+            "version": LEXICAL_INDEX_VERSION, "nodes": len(self), "terms": len(self.postings.terms),
+            "documents": self.documents,
+        }))
+
+    @classmethod
+    def load(cls, path: Path | str) -> "BM25Index":
+        """Loads the merged postings of a saved index by memory map."""
+        path = Path(path)
+        metadata = json.loads((path / "index.json").read_text())
+        if metadata["version"] != LEXICAL_INDEX_VERSION:
+            raise ValueError(f"{path} was written by an incompatible version")
+        postings = Postings(**{name: np.load(path / f"{name}.npy", mmap_mode="r") for name in Postings.ARRAYS})
+        return cls(
+            postings, metadata["documents"],
+            np.load(path / "impacts.npy", mmap_mode="r"), np.load(path / "term_max.npy", mmap_mode="r")
+        )
+
+    def term_ids(self, query: str) -> npt.NDArray[np.intp]:
+        """The vocabulary indices of the query's distinct terms that occur in the index."""
+        terms = np.unique(np.array(tokenize(query), dtype=np.str_))
+        ids = np.searchsorted(self.postings.terms, terms)
+        found = ids < len(self.postings.terms)
+        found[found] = self.postings.terms[ids[found]] == terms[found]
+        return ids[found]
+
+    def _prune(self, scores: npt.NDArray[np.float32], k: int, remaining: float) -> Optional[npt.NDArray[np.intp]]:
+        """
+        Returns the nodes scored so far if no other node can reach the top k, i.e.
+        if the rest of the query's terms add up to less than the k-th best score;
+        otherwise None (MaxScore pruning).
+        """
+        matched = np.flatnonzero(scores)
+        if len(matched) < k:
+            return None
+        threshold = np.partition(scores[matched], len(matched) - k)[len(matched) - k]
+        return matched if remaining < threshold else None
+
+    def search_rows(self, query: str, k: int = 10) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.float32]]:
+        """Returns the rows of the k nodes that best match the query by BM25, and their scores, best first."""
+        term_ids = self.term_ids(query)
+        starts, ends = self.postings.offsets[term_ids], self.postings.offsets[term_ids + 1]
+        # Rarest terms first: they have the fewest postings and the largest impacts
+        order = np.argsort(ends - starts, kind="stable")
+        term_ids, starts, ends = term_ids[order], starts[order], ends[order]
+        # remaining[i] bounds what terms i onwards can add to a node's score
+        remaining = np.cumsum(self.term_max[term_ids][::-1])[::-1]
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        candidates: Optional[npt.NDArray[np.intp]] = None
+        scored = 0
+        for position, (begin, end) in enumerate(zip(starts, ends)):
+            rows = self.postings.rows[begin:end]
+            if candidates is None:
+                # Rows are distinct within a term's postings, so fancy-index addition is safe
+                scores[rows] += self.impacts[begin:end]
+                scored += end - begin
+                if position + 1 < len(term_ids) and ends[position + 1] - starts[position + 1] > 4 * scored:
+                    candidates = self._prune(scores, k, remaining[position + 1])
+            else:
+                # Only the candidates can reach the top k, so they are looked up in the term's sorted postings
+                found = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+                hits = rows[found] == candidates
+                scores[candidates[hits]] += self.impacts[begin:end][found[hits]]
+        if candidates is None:
+            # Every impact is positive, so only the nodes with a score need ranking
+            candidates = np.flatnonzero(scores)
+        best, best_scores = top_k_rows(scores[candidates][np.newaxis], k)
+        return candidates[best[0]], best_scores[0]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Returns the (node ID, BM25 score) of the k nodes that best match the query, best first."""
+        rows, scores = self.search_rows(query, k)
+        node_ids = np.char.decode(self.postings.node_ids[rows], "utf-8")
+        return list(zip(node_ids.tolist(), scores.tolist()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Builds or updates the BM25 index over content nodes")
+    parser.add_argument("--path", default=LEXICAL_INDEX_PATH, help="Directory of the index")
+    parser.add_argument("--document", action="append", default=[], help="Re-index only this document (repeatable)")
+    parser.add_argument("--query", action="append", default=[], help="Time a query against the saved index (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.document:
+        with Session(engine) as session:
+            BM25Index.update_documents(session, args.document, args.path)
+    elif not args.query:
+        with Session(engine) as session:
+            BM25Index.build(session, args.path)
+    index = BM25Index.load(args.path)
+    for query in args.query:
+        start = time.perf_counter()
+        results = index.search(query)
+        print(f"{query!r}: {len(results)} results in {(time.perf_counter() - start) * 1000:.2f} ms: {results[:3]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import AsyncGenerator, AsyncIterator, Dict, Iterator
+from utils.core.metrics import registry
+from utils.chat.sse import RunProgress
+from utils.chat.cache import answer_cache
+from utils.chat.admission import admission_controller
+from utils.chat.history import history_cache
+
+# --- Constants ---
+
+
+# Outcome of a run, by the terminal event that ended it
+RUN_OUTCOMES: Dict[str, str] = {
+    "thread.run.completed": "completed",
+    "thread.run.failed": "failed",
+    "thread.run.cancelled": "cancelled",
+    "thread.run.expired": "expired",
+    "thread.run.incomplete": "incomplete",
+}
+
+TEXT_DELTA_PREFIX = b"event: textDelta\n"
+
+TOKEN_RATE_BUCKETS = (5, 10, 20, 30, 40, 50, 75, 100, 150, 200, 300, 500)
+
+
+# --- Metrics ---
+
+
+RUN_FIRST_EVENT_SECONDS = registry.histogram(
+    "chat_run_first_event_seconds",
+    "Time from starting an assistant run stream to its first upstream event"
+)
+RUN_FIRST_TEXT_SECONDS = registry.histogram(
+    "chat_run_first_text_seconds",
+    "Time from starting an assistant run stream to sending its first textDelta"
+)
+RUN_TOKENS_PER_SECOND = registry.histogram(
+    "chat_run_tokens_per_second",
+    "Text deltas per second streamed from the first delta to the end of the run",
+    buckets=TOKEN_RATE_BUCKETS
+)
+RUN_DURATION_SECONDS = registry.histogram(
+    "chat_run_duration_seconds",
+    "Total time of an assistant run stream, by outcome",
+    ["outcome"]
+)
+TOOL_EXECUTION_SECONDS = registry.histogram(
+    "chat_tool_execution_seconds",
+    "Execution time of assistant function tool calls, by tool and outcome",
+    ["tool", "outcome"]
+)
+TOOL_OUTPUTS_ROUND_TRIP_SECONDS = registry.histogram(
+    "chat_tool_outputs_round_trip_seconds",
+    "Time from submitting tool outputs to the first event of the resumed run stream"
+)
+SEND_MESSAGE_SECONDS = registry.histogram(
+    "chat_send_message_seconds",
+    "Time to add a user message to a thread (creating the thread for a first message), by route and outcome",
+    ["route", "outcome"]
+)
+registry.callback(
+    "chat_answer_cache_lookups_total",
+    "Answer cache lookups, by result",
+    lambda: [(("hit",), answer_cache.hits), (("miss",), answer_cache.misses)],
+    ["result"],
+    type="counter"
+)
+registry.callback(
+    "chat_answer_cache_entries",
+    "Answers held in the answer cache",
+    lambda: [((), len(answer_cache))]
+)
+registry.callback(
+    "chat_history_cache_lookups_total",
+    "Rendered thread history page cache lookups, by result",
+    lambda: [(("hit",), history_cache.hits), (("miss",), history_cache.misses)],
+    ["result"],
+    type="counter"
+)
+SSE_UNCOMPRESSED_BYTES = registry.counter(
+    "chat_sse_uncompressed_bytes_total",
+    "Bytes of SSE frames passed to stream compression, by content coding",
+    ["encoding"]
+)
+SSE_COMPRESSED_BYTES = registry.counter(
+    "chat_sse_compressed_bytes_total",
+    "Bytes of compressed SSE streams sent, by content coding",
+    ["encoding"]
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "chat_admission_wait_seconds",
+    "Time assistant runs waited for admission, by outcome (admitted, rejected or abandoned)",
+    ["outcome"]
+)
+registry.callback(
+    "chat_admission_runs",
+    "Assistant runs holding a slot or waiting for one, by state",
+    lambda: [(("active",), admission_controller.active), (("queued",), admission_controller.queued)],
+    ["state"]
+)
+registry.callback(
+    "chat_admission_decisions_total",
+    "Admission decisions for assistant runs, by result",
+    lambda: [
+        (("admitted_immediately",), admission_controller.admitted_immediately),
+        (("admitted_after_queueing",), admission_controller.admitted_after_queueing),
+        (("rejected",), admission_controller.rejected),
+        (("timed_out",), admission_controller.timed_out),
+    ],
+    ["result"],
+    type="counter"
+)
+
+
+# --- Functions ---
+
+
+def record_segment_start(progress: RunProgress, segment_started_at: float) -> None:
+    """
+    Records the first event of a run stream segment: the run's first event, or
+    the first event after tool outputs were submitted.
+    """
+    now = time.perf_counter()
+    if progress.first_event_at is None:
+        progress.first_event_at = now
+        RUN_FIRST_EVENT_SECONDS.observe(now - progress.started_at)
+    else:
+        TOOL_OUTPUTS_ROUND_TRIP_SECONDS.observe(now - segment_started_at)
+
+
+def record_run(progress: RunProgress, outcome: str) -> None:
+    now = time.perf_counter()
+    RUN_DURATION_SECONDS.observe(now - progress.started_at, outcome)
+    if progress.first_delta_at is not None and progress.streamed_tokens > 1:
+        elapsed = (progress.finished_at or now) - progress.first_delta_at
+        if elapsed > 0:
+            RUN_TOKENS_PER_SECOND.observe(progress.streamed_tokens / elapsed)
+
+
+async def track_run(
+    frames: AsyncIterator[bytes],
+    progress: RunProgress,
+    text_prefix: bytes = TEXT_DELTA_PREFIX
+) -> AsyncGenerator[bytes, None]:
+    """
+    Passes a run's SSE frames through, timing the first text frame sent (the
+    first frame starting with text_prefix), and records the run's metrics when
+    it ends. Frames are inspected only until the first text frame, so the
+    per-frame cost afterwards is a single comparison.
+    """
+    # The clock starts when the first frame is pulled, so time spent waiting for admission is not counted
+    progress.started_at = time.perf_counter()
+    outcome = "error"
+    try:
+        async for frame in frames:
+            if progress.first_text_sent_at is None and frame.startswith(text_prefix):
+                progress.first_text_sent_at = time.perf_counter()
+                RUN_FIRST_TEXT_SECONDS.observe(progress.first_text_sent_at - progress.started_at)
+            yield frame
+        outcome = progress.outcome
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "abandoned"
+        raise
+    finally:
+        record_run(progress, outcome)
+
+
+@contextmanager
+def observe_send(route: str) -> Iterator[None]:
+    """Times the API calls that add a user message, labeled by route and outcome."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        SEND_MESSAGE_SECONDS.observe(time.perf_counter() - start, route, outcome)
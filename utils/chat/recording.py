@@ -0,0 +1,186 @@
+import os
+import gzip
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+from types import SimpleNamespace
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from dotenv import load_dotenv
+from pydantic import TypeAdapter
+from openai.types.beta import AssistantStreamEvent
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Directory to record the raw assistant events of every run to (empty disables recording)
+ASSISTANT_STREAM_RECORD_DIR = os.getenv("ASSISTANT_STREAM_RECORD_DIR") or ""
+
+RECORDING_FORMAT_VERSION = 1
+
+_event_adapter: TypeAdapter[AssistantStreamEvent] = TypeAdapter(AssistantStreamEvent)
+
+
+# --- Helper Functions ---
+
+
+def serialize_event(event: AssistantStreamEvent) -> Dict[str, Any]:
+    """Serializes an event as sent by the API; fields the API omitted are left out."""
+    return {"event": event.event, "data": event.data.model_dump(mode="json", exclude_unset=True)}
+
+
+def parse_event(record: Dict[str, Any]) -> AssistantStreamEvent:
+    return _event_adapter.validate_python(record)
+
+
+# --- Helper Classes ---
+
+
+@dataclass
+class Recording:
+    """
+    The raw events of one assistant run. Each segment is the event stream of one
+    request: the first from runs.stream, the rest from submit_tool_outputs_stream
+    after each requires_action hop.
+    """
+    segments: List[List[AssistantStreamEvent]]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Recording":
+        """Loads a recording written by StreamRecorder.save."""
+        segments: List[List[AssistantStreamEvent]] = []
+        metadata: Dict[str, Any] = {}
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line_number, line in enumerate(file):
+                record = json.loads(line)
+                if line_number == 0:
+                    metadata = record
+                    continue
+                segment = record.pop("segment")
+                while len(segments) <= segment:
+                    segments.append([])
+                segments[segment].append(parse_event(record))
+        return cls(segments, metadata)
+
+
+class StreamRecorder:
+    """
+    Collects the raw AssistantStreamEvents of a run, across requires_action hops,
+    and writes them to a gzipped JSON Lines file. The first line holds metadata;
+    every following line is one event tagged with its segment number.
+    """
+
+    def __init__(self, path: Union[str, Path], metadata: Optional[Dict[str, Any]] = None):
+        self.path = Path(path)
+        self.metadata: Dict[str, Any] = metadata or {}
+        self._records: List[Dict[str, Any]] = []
+        self._segment = -1
+
+    @classmethod
+    def for_thread(cls, thread_id: str, directory: Optional[str] = None) -> Optional["StreamRecorder"]:
+        """
+        Returns a recorder for a run on the thread, or None if recording is disabled.
+        The directory defaults to ASSISTANT_STREAM_RECORD_DIR.
+        """
+        directory = ASSISTANT_STREAM_RECORD_DIR if directory is None else directory
+        if not directory:
+            return None
+        recorded_at = time.time()
+        return cls(
+            Path(directory) / f"{thread_id}-{int(recorded_at * 1000)}.jsonl.gz",
+            {"thread_id": thread_id, "recorded_at": recorded_at}
+        )
+
+    def start_segment(self) -> None:
+        self._segment += 1
+
+    def add(self, event: AssistantStreamEvent) -> None:
+        self._records.append({"segment": max(self._segment, 0), **serialize_event(event)})
+
+    def save(self) -> None:
+        """Writes the recording. Errors are logged, never raised, so recording cannot break a run."""
+        if not self._records:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self.path, "wt", encoding="utf-8") as file:
+                header = {"version": RECORDING_FORMAT_VERSION, "segments": self._segment + 1, **self.metadata}
+                file.write(json.dumps(header, separators=(",", ":")) + "\n")
+                for record in self._records:
+                    file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            logger.info(f"Recorded {len(self._records)} assistant events to {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to save assistant stream recording to {self.path}: {e}")
+
+    async def save_async(self) -> None:
+        """Writes the recording in a worker thread, so the gzip I/O doesn't block other streams."""
+        await asyncio.to_thread(self.save)
+
+
+class ReplayStreamManager:
+    """Replays a recorded segment with the async context manager and iterator protocol of AsyncAssistantStreamManager."""
+
+    def __init__(self, events: List[AssistantStreamEvent], event_delay: float = 0):
+        self._events = events
+        self._event_delay = event_delay
+
+    async def __aenter__(self) -> "ReplayStreamManager":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    async def _iterate(self) -> AsyncIterator[AssistantStreamEvent]:
+        for event in self._events:
+            if self._event_delay:
+                await asyncio.sleep(self._event_delay)
+            yield event
+
+    def __aiter__(self) -> AsyncIterator[AssistantStreamEvent]:
+        return self._iterate()
+
+
+class _ReplayRuns:
+    def __init__(self, recording: Recording, event_delay: float):
+        self._segments = list(recording.segments)
+        self._event_delay = event_delay
+        self.submitted_tool_outputs: List[Any] = []
+        self.cancelled: List[str] = []
+
+    def _next_segment(self) -> ReplayStreamManager:
+        if not self._segments:
+            raise RuntimeError("The recording has no more stream segments to replay")
+        return ReplayStreamManager(self._segments.pop(0), self._event_delay)
+
+    def stream(self, **kwargs: Any) -> ReplayStreamManager:
+        return self._next_segment()
+
+    def submit_tool_outputs_stream(self, **kwargs: Any) -> ReplayStreamManager:
+        self.submitted_tool_outputs.append(kwargs.get("tool_outputs"))
+        return self._next_segment()
+
+    async def cancel(self, run_id: str, **kwargs: Any) -> None:
+        self.cancelled.append(run_id)
+
+
+class ReplayClient:
+    """
+    Stands in for AsyncOpenAI when streaming a recorded run offline. runs.stream
+    serves the first segment and each submit_tool_outputs_stream the next, so the
+    recording is fed through the same generator code as a live run.
+    """
+
+    def __init__(self, recording: Recording, event_delay: float = 0):
+        self.runs = _ReplayRuns(recording, event_delay)
+        self.beta = SimpleNamespace(threads=SimpleNamespace(runs=self.runs))
@@ -0,0 +1,192 @@
+import os
+import time
+import asyncio
+import secrets
+import logging
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from utils.chat.sse import encode_sse, with_event_id
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# How long a finished run's transcript is kept for reconnecting clients
+SSE_REPLAY_RETENTION_SECONDS = float(os.getenv("SSE_REPLAY_RETENTION_SECONDS") or "60")
+
+# How long a run may go without subscribers before it is abandoned. This must be
+# longer than the EventSource reconnect delay, or reconnecting clients lose their run
+SSE_DISCONNECT_GRACE_SECONDS = float(os.getenv("SSE_DISCONNECT_GRACE_SECONDS") or "10")
+
+
+# --- Helper Classes ---
+
+
+class RunStream:
+    """
+    Drains the SSE frames of one assistant run in a background task, independently
+    of any HTTP connection, and keeps every frame of the run, so a subscriber
+    that falls behind or reconnects late never misses part of the answer (runs
+    are finite; the registry drops the transcript once the run has finished and
+    its retention period has passed). Each frame is tagged with an event ID of the form "<stream_id>-<seq>",
+    where seq increases monotonically, so that a reconnecting EventSource can
+    resume from its Last-Event-ID instead of starting a second run.
+
+    If every subscriber disconnects and none returns within grace_seconds, the
+    run is abandoned: the producer task is cancelled, which closes the upstream
+    stream, and on_abandon is awaited (e.g. to cancel the run on the API side).
+    """
+
+    def __init__(
+        self,
+        thread_id: str,
+        user_id: Optional[int],
+        frames: AsyncIterator[bytes],
+        on_abandon: Optional[Callable[[], Awaitable[None]]] = None,
+        grace_seconds: float = SSE_DISCONNECT_GRACE_SECONDS
+    ):
+        self.stream_id: str = secrets.token_hex(4)
+        self.thread_id: str = thread_id
+        self.user_id: Optional[int] = user_id
+        self.done: bool = False
+        self.finished_at: Optional[float] = None
+        self.abandoned: bool = False
+        self.subscribed: bool = False
+        self._on_abandon = on_abandon
+        self._grace_seconds: float = grace_seconds
+        self._subscribers: int = 0
+        self._abandon_task: Optional[asyncio.Task] = None
+        # Frame seq is at index seq - 1
+        self._frames: List[bytes] = []
+        self._next_seq: int = 1
+        self._ended: bool = False
+        self._changed: asyncio.Condition = asyncio.Condition()
+        self._task: asyncio.Task = asyncio.create_task(self._produce(frames))
+
+    async def _append(self, frame: bytes) -> None:
+        async with self._changed:
+            seq = self._next_seq
+            self._frames.append(with_event_id(frame, f"{self.stream_id}-{seq}"))
+            self._next_seq += 1
+            self._changed.notify_all()
+
+    async def _produce(self, frames: AsyncIterator[bytes]) -> None:
+        try:
+            async for frame in frames:
+                if frame.startswith(b"event: endStream\n"):
+                    self._ended = True
+                await self._append(frame)
+        except Exception as e:
+            logger.error(f"Assistant run stream for thread {self.thread_id} failed: {e}", exc_info=True)
+        finally:
+            # Always close the client's EventSource, or it would reconnect and replay forever
+            if not self._ended:
+                await self._append(encode_sse("endStream", "DONE"))
+            async with self._changed:
+                self.done = True
+                self.finished_at = time.monotonic()
+                self._changed.notify_all()
+
+    async def _abandon_after_grace(self) -> None:
+        await asyncio.sleep(self._grace_seconds)
+        if self._subscribers or self.done or self._ended:
+            return
+        logger.info(f"No subscribers left for run stream on thread {self.thread_id}; abandoning the run")
+        self.abandoned = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        if self._on_abandon is not None:
+            try:
+                await self._on_abandon()
+            except Exception as e:
+                logger.error(f"Failed to clean up abandoned run on thread {self.thread_id}: {e}")
+
+    def _add_subscriber(self) -> None:
+        self.subscribed = True
+        self._subscribers += 1
+        if self._abandon_task is not None:
+            self._abandon_task.cancel()
+            self._abandon_task = None
+
+    def _remove_subscriber(self) -> None:
+        self._subscribers -= 1
+        if self._subscribers == 0 and not self.done and not self._ended:
+            self._abandon_task = asyncio.create_task(self._abandon_after_grace())
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """
+        Returns the sequence number encoded in an event ID emitted by this stream,
+        or None if the ID is missing or belongs to a different stream.
+        """
+        if not event_id:
+            return None
+        stream_id, _, seq = event_id.rpartition("-")
+        if stream_id != self.stream_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    async def subscribe(self, after_seq: int = 0) -> AsyncGenerator[bytes, None]:
+        """
+        Yields the frames that follow after_seq, replaying the transcript first and
+        then following the live stream until the run is done.
+        """
+        seq = after_seq
+        self._add_subscriber()
+        try:
+            while True:
+                async with self._changed:
+                    while not self.done and self._next_seq <= seq + 1:
+                        await self._changed.wait()
+                    pending = self._frames[seq:]
+                    seq = len(self._frames)
+                    done = self.done
+                for frame in pending:
+                    yield frame
+                if done and not pending:
+                    return
+        finally:
+            # Runs when the client disconnects, too: the response cancels or closes this generator
+            self._remove_subscriber()
+
+
+class RunStreamRegistry:
+    """In-process registry of the latest RunStream for each thread."""
+
+    def __init__(self, retention_seconds: float = SSE_REPLAY_RETENTION_SECONDS):
+        self.retention_seconds: float = retention_seconds
+        self._streams: Dict[str, RunStream] = {}
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            thread_id for thread_id, stream in self._streams.items()
+            if stream.finished_at is not None and now - stream.finished_at > self.retention_seconds
+        ]
+        for thread_id in expired:
+            del self._streams[thread_id]
+
+    def get(self, thread_id: str) -> Optional[RunStream]:
+        self._prune()
+        return self._streams.get(thread_id)
+
+    def start(
+        self,
+        thread_id: str,
+        user_id: Optional[int],
+        frames: AsyncIterator[bytes],
+        on_abandon: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> RunStream:
+        self._prune()
+        stream = RunStream(thread_id, user_id, frames, on_abandon=on_abandon)
+        self._streams[thread_id] = stream
+        return stream
+
+
+run_streams = RunStreamRegistry()
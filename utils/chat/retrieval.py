@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import numpy.typing as npt
+from dotenv import load_dotenv
+from utils.chat.ann import ANN_NPROBE, IVFIndex
+from utils.chat.lexical import BM25Index
+from utils.chat.vectors import VectorIndex
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Content nodes returned per query, and candidates taken from each ranked list before fusion
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K") or "8")
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES") or "50")
+# Weights of the vector and lexical rankings in reciprocal-rank fusion, and its rank offset
+RETRIEVAL_VECTOR_WEIGHT = float(os.getenv("RETRIEVAL_VECTOR_WEIGHT") or "1.0")
+RETRIEVAL_LEXICAL_WEIGHT = float(os.getenv("RETRIEVAL_LEXICAL_WEIGHT") or "1.0")
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K") or "60")
+# Trade-off between relevance (1.0) and diversity (0.0) in maximal marginal relevance
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA") or "0.7")
+
+
+# --- Helper Classes ---
+
+
+@dataclass
+class RetrievalResult:
+    """
+    The content nodes selected for a query, in selection order, with their fused
+    scores, and the milliseconds spent in each stage of the pipeline.
+    """
+    node_ids: List[str]
+    scores: List[float]
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+# --- Helper Functions ---
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    weights: Sequence[float],
+    rrf_k: int = RETRIEVAL_RRF_K
+) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked lists of node IDs: each node scores the sum over lists of
+    weight / (rrf_k + rank), with ranks from 1. Only ranks matter, so lists
+    scored on different scales (cosine similarity, BM25) combine without
+    normalization. Returns (node ID, score) pairs, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, node_id in enumerate(ranking, start=1):
+            scores[node_id] = scores.get(node_id, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def maximal_marginal_relevance(
+    relevance: npt.NDArray[np.floating],
+    embeddings: npt.NDArray[np.float32],
+    k: int,
+    mmr_lambda: float = RETRIEVAL_MMR_LAMBDA
+) -> List[int]:
+    """
+    Selects k of the candidates, one at a time, maximizing
+    mmr_lambda * relevance - (1 - mmr_lambda) * (highest cosine similarity to a
+    candidate already selected), so near-duplicates of a selected candidate are
+    passed over. embeddings holds unit-length rows; their pairwise similarities
+    are computed with one matrix product, and each step updates every
+    candidate's redundancy at once.
+    Returns the selected candidates' positions, in selection order.
+    """
+    k = min(k, len(relevance))
+    similarities = embeddings @ embeddings.T
+    redundancy = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    selected: List[int] = []
+    for _ in range(k):
+        marginal = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        choice = int(np.argmax(np.where(available, marginal, -np.inf)))
+        selected.append(choice)
+        available[choice] = False
+        np.maximum(redundancy, similarities[choice], out=redundancy)
+    return selected
+
+
+def merge_by_relevance(
+    diversified: Sequence[int],
+    ranked: Sequence[int],
+    relevance: npt.NDArray[np.floating],
+    k: int
+) -> List[int]:
+    """
+    Merges candidates selected by maximal marginal relevance with candidates
+    ranked by relevance alone: each of the latter is placed before the first
+    diversified candidate that is less relevant. Returns the first k positions.
+    """
+    merged: List[int] = []
+    position = 0
+    for index in diversified:
+        while position < len(ranked) and relevance[ranked[position]] >= relevance[index]:
+            merged.append(ranked[position])
+            position += 1
+        merged.append(index)
+    merged.extend(ranked[position:])
+    return merged[:k]
+
+
+def hybrid_search(
+    query: str,
+    query_vector: npt.ArrayLike,
+    embeddings: VectorIndex,
+    lexical: BM25Index,
+    ann: Optional[IVFIndex] = None,
+    k: int = RETRIEVAL_TOP_K,
+    candidates: int = RETRIEVAL_CANDIDATES,
+    vector_weight: float = RETRIEVAL_VECTOR_WEIGHT,
+    lexical_weight: float = RETRIEVAL_LEXICAL_WEIGHT,
+    rrf_k: int = RETRIEVAL_RRF_K,
+    mmr_lambda: float = RETRIEVAL_MMR_LAMBDA,
+    nprobe: int = ANN_NPROBE
+) -> RetrievalResult:
+    """
+    Retrieves k content nodes for a query and its embedding:
+
+        vector      the nearest candidates by embedding, from ann if given, else exact search
+        lexical     the best candidates by BM25 over the query text
+        fusion      weighted reciprocal-rank fusion of the two lists
+        embeddings  the fused candidates' vectors, gathered from embeddings
+        mmr         maximal marginal relevance over those vectors, with fused
+                    scores (scaled to [0, 1]) as relevance
+
+    Candidates that embeddings has no vector for (found only by BM25) cannot be
+    compared with the others, so they are left out of diversification and placed
+    among the selected nodes by fused score alone. Both weights must be positive.
+
+    Returns the selected nodes with their fused scores, and each stage's time
+    in milliseconds (plus the total) for profiling.
+    """
+    if vector_weight <= 0 or lexical_weight <= 0:
+        raise ValueError(f"Retrieval weights must be positive; got vector {vector_weight}, lexical {lexical_weight}")
+    timings: Dict[str, float] = {}
+    start = stage_start = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = (now - stage_start) * 1000
+        stage_start = now
+
+    if ann is not None:
+        vector_results = ann.search(query_vector, candidates, nprobe)
+    else:
+        vector_results = embeddings.search(query_vector, candidates)
+    lap("vector")
+    lexical_results = lexical.search(query, candidates)
+    lap("lexical")
+    fused = reciprocal_rank_fusion(
+        [[node_id for node_id, _ in vector_results], [node_id for node_id, _ in lexical_results]],
+        [vector_weight, lexical_weight], rrf_k
+    )
+    lap("fusion")
+
+    node_ids = [node_id for node_id, _ in fused]
+    fused_scores = np.array([score for _, score in fused], dtype=np.float32)
+    rows = embeddings.rows(node_ids)
+    embedded = np.flatnonzero(rows >= 0)
+    candidate_embeddings = np.asarray(embeddings.matrix[rows[embedded]], dtype=np.float32)
+    lap("embeddings")
+
+    relevance = fused_scores / fused_scores.max() if len(fused_scores) else fused_scores
+    diversified = maximal_marginal_relevance(relevance[embedded], candidate_embeddings, k, mmr_lambda)
+    # Fused candidates are in descending score order, so those without an embedding already are too
+    selected = merge_by_relevance(
+        [int(embedded[index]) for index in diversified], np.flatnonzero(rows < 0).tolist(), relevance, k
+    )
+    lap("mmr")
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    logger.debug(f"Hybrid search for {query!r}: " + ", ".join(f"{stage} {ms:.2f} ms" for stage, ms in timings.items()))
+    return RetrievalResult([node_ids[index] for index in selected], [float(fused_scores[index]) for index in selected], timings)
@@ -1,3 +1,5 @@
+import time
+import asyncio
 from openai import AsyncOpenAI
 from openai.lib.streaming._assistants import AsyncAssistantStreamManager
 from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
@@ -6,14 +8,24 @@ from openai.types.beta.assistant_stream_event import (
 )
 from openai.types.beta.threads.run import RequiredAction
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, AsyncIterable
+from typing import Dict, Any, Optional, AsyncIterable, AsyncIterator, AsyncGenerator, List, Union
 from fastapi import HTTPException
 from logging import getLogger
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 logger = getLogger("uvicorn.error")
 
 
+# --- Constants ---
+
+
+SSE_MESSAGE_END = b"\n\n"
+OOB_SWAP_END = b"</span>"
+
+# Encoded "event: <name>\ndata: " headers, by event name
+SSE_EVENT_HEADERS: Dict[str, bytes] = {}
+
+
 # --- Helper Classes ---
 
 
@@ -50,56 +62,268 @@ class AssistantStreamMetadata:
         return self.run_requires_action_event.data.id if self.run_requires_action_event else ""
 
 
+@dataclass
+class SSEDelta:
+    """An unformatted textDelta or toolDelta payload, held back so consecutive deltas can be coalesced."""
+    event: str
+    step_id: str
+    text: str
+
+
+@dataclass
+class RunProgress:
+    """
+    Tracks the run being streamed, so it can be cancelled if the client goes away,
+    and when its milestones were reached (perf_counter timestamps) for the run metrics.
+    """
+    run_id: Optional[str] = None
+    # Each text delta carries roughly one completion token
+    streamed_tokens: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    first_event_at: Optional[float] = None
+    first_delta_at: Optional[float] = None
+    first_text_sent_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Set from the run's terminal event, e.g. "completed" or "failed"
+    outcome: str = "unfinished"
+
+
+class CompletionTokenAverage:
+    """
+    Moving average of completion tokens per completed run, used to estimate how
+    many tokens cancelling an abandoned run saved.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    def record(self, completion_tokens: int) -> None:
+        if self.value is None:
+            self.value = float(completion_tokens)
+        else:
+            self.value += self.alpha * (completion_tokens - self.value)
+
+    def remaining(self, streamed_tokens: int) -> Optional[int]:
+        """Estimated tokens a run would still have generated, or None before any run has completed."""
+        if self.value is None:
+            return None
+        return max(round(self.value) - streamed_tokens, 0)
+
+
+completion_token_average = CompletionTokenAverage()
+
+
 class ToolCallOutputs(BaseModel):
-    tool_outputs: Dict[str, Any]
+    tool_outputs: List[Dict[str, Any]]
     runId: str
 
 
 # --- Helper Functions ---
 
 
-def sse_format(event: str, data: str, retry: int | None = None) -> str:
+def split_sse_lines(data: str) -> List[str]:
     """
-    Helper function to format a Server-Sent Event (SSE) message.
+    Splits a payload into SSE data lines. Like str.splitlines, a trailing line
+    break does not start an empty line, but only CR, LF and CRLF end lines, as
+    in the SSE spec.
+    """
+    lines = data.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def sse_format(event: str, data: str, retry: int | None = None, id: str | None = None) -> str:
+    """
+    Helper function to format a Server-Sent Event (SSE) message as a string.
+    The streaming routes use encode_sse, which produces the same message as bytes.
 
     Args:
         event: The name/type of the event.
         data: The data payload as a string.
         retry: Optional retry timeout in milliseconds.
+        id: Optional event ID, echoed back by the browser as Last-Event-ID on reconnect.
 
     Returns:
         A formatted SSE message string.
     """
-    output = f"event: {event}\n"
+    if retry is None and id is None and data and "\n" not in data and "\r" not in data:
+        return f"event: {event}\ndata: {data}\n\n"
+    fields = [f"id: {id}\n"] if id is not None else []
+    fields.append(f"event: {event}\n")
     if retry is not None:
-        output += f"retry: {retry}\n"
+        fields.append(f"retry: {retry}\n")
     # Ensure each line of data is prefixed with "data: "
-    for line in data.splitlines():
-        output += f"data: {line}\n"
-    output += "\n"  # An extra newline indicates the end of the message.
-    return output
+    fields.extend(f"data: {line}\n" for line in split_sse_lines(data))
+    fields.append("\n")  # An extra newline indicates the end of the message.
+    return "".join(fields)
+
+
+def encode_sse(event: str, data: str, retry: int | None = None, id: str | None = None) -> bytes:
+    """
+    Formats an SSE message straight to UTF-8 bytes, the form in which the
+    streaming routes yield frames, so the response does not re-encode them. This
+    runs once per frame for every open stream. Single-line payloads, which are
+    nearly all frames, are encoded with one join onto a cached event header;
+    multi-line payloads are split with bytes replacements instead of per-line
+    formatting.
+    """
+    if retry is not None or id is not None or not data:
+        return sse_format(event, data, retry, id).encode()
+    header = SSE_EVENT_HEADERS.get(event)
+    if header is None:
+        header = SSE_EVENT_HEADERS[event] = f"event: {event}\ndata: ".encode()
+    if "\n" not in data and "\r" not in data:
+        return b"".join((header, data.encode(), SSE_MESSAGE_END))
+
+    payload = data.encode()
+    if b"\r" in payload:
+        payload = payload.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    if payload.endswith(b"\n"):
+        payload = payload[:-1]
+    return b"".join((header, payload.replace(b"\n", b"\ndata: "), SSE_MESSAGE_END))
+
+
+def with_event_id(frame: bytes, id: str) -> bytes:
+    """Adds an event ID to an SSE message produced by encode_sse, as if it had been passed as `id`."""
+    return b"".join((b"id: ", id.encode(), b"\n", frame))
+
+
+def wrap_for_oob_swap(step_id: str, text_value: str) -> str:
+    return f'<span hx-swap-oob="beforeend:#step-{step_id}">{text_value}</span>'
+
+
+def oob_swap_header(event: str, step_id: str) -> bytes:
+    """The encoded SSE message up to the text of a single-line wrap_for_oob_swap payload."""
+    return f'event: {event}\ndata: <span hx-swap-oob="beforeend:#step-{step_id}">'.encode()
+
+
+async def coalesce_deltas(
+    events: AsyncIterator[Union[SSEDelta, bytes]],
+    max_delay_ms: int = 50,
+    max_bytes: int = 2048
+) -> AsyncGenerator[bytes, None]:
+    """
+    Buffers consecutive SSEDelta payloads with the same event type and step ID and
+    emits them as a single SSE frame. The buffer is flushed when it is older than
+    max_delay_ms, when it holds at least max_bytes of text, or before any other
+    event (such as messageCreated or endStream) is sent. Already encoded SSE
+    frames are passed through unchanged.
+
+    Args:
+        events: Async iterator of SSEDelta payloads and encoded SSE frames.
+        max_delay_ms: Maximum time a delta may wait in the buffer. 0 disables coalescing.
+        max_bytes: Flush threshold for the buffered text, in UTF-8 bytes.
+
+    Yields:
+        Encoded SSE frames.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    buffer_key: Optional[tuple[str, str]] = None
+    parts: List[str] = []
+    size = 0
+    deadline = 0.0
+    next_item: Optional[asyncio.Future] = None
+    # The encoded frame header for the last buffer key, reused while a message streams
+    header_key: Optional[tuple[str, str]] = None
+    header = b""
+
+    def flush() -> bytes:
+        nonlocal buffer_key, size, header_key, header
+        assert buffer_key is not None
+        event, step_id = buffer_key
+        text = "".join(parts)
+        if "\n" in text or "\r" in text:
+            frame = encode_sse(event, wrap_for_oob_swap(step_id, text))
+        else:
+            if header_key != buffer_key:
+                header_key, header = buffer_key, oob_swap_header(event, step_id)
+            frame = b"".join((header, text.encode(), OOB_SWAP_END, SSE_MESSAGE_END))
+        buffer_key, size = None, 0
+        parts.clear()
+        return frame
+
+    try:
+        while True:
+            if parts:
+                # Wait for the next event, but no longer than the buffer's deadline
+                if next_item is None:
+                    next_item = asyncio.ensure_future(iterator.__anext__())
+                done, _ = await asyncio.wait({next_item}, timeout=max(deadline - loop.time(), 0))
+                if not done:
+                    yield flush()
+                    continue
+                future, next_item = next_item, None
+                try:
+                    item = future.result()
+                except StopAsyncIteration:
+                    break
+            elif next_item is not None:
+                future, next_item = next_item, None
+                try:
+                    item = await future
+                except StopAsyncIteration:
+                    break
+            else:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+
+            if isinstance(item, SSEDelta):
+                key = (item.event, item.step_id)
+                if parts and key != buffer_key:
+                    yield flush()
+                if not parts:
+                    buffer_key = key
+                    deadline = loop.time() + max_delay_ms / 1000
+                parts.append(item.text)
+                # ASCII text is as long in UTF-8 as in characters; checking is O(1)
+                size += len(item.text) if item.text.isascii() else len(item.text.encode())
+                if size >= max_bytes or loop.time() >= deadline:
+                    yield flush()
+            else:
+                if parts:
+                    yield flush()
+                yield item
+
+        if parts:
+            yield flush()
+    finally:
+        if next_item is not None and not next_item.done():
+            next_item.cancel()
+            await asyncio.wait({next_item})
+        # Close the source now rather than on garbage collection, so an abandoned
+        # run releases its upstream connection immediately
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
 
 
 async def post_tool_outputs(client: AsyncOpenAI, data: Dict[str, Any], thread_id: str) -> AsyncAssistantStreamManager:
     """
+    Submits the outputs of all tool calls requested by a run in a single request.
+
     data is expected to be something like
     {
-      "tool_outputs": {
-        "output": [{"location": "City", "temperature": 70, "conditions": "Sunny"}],
-        "tool_call_id": "call_123"
-      },
+      "tool_outputs": [
+        {"output": "[{'location': 'City', 'temperature': 70, 'conditions': 'Sunny'}]", "tool_call_id": "call_123"},
+        {"output": "[{'location': 'Town', 'temperature': 65, 'conditions': 'Rainy'}]", "tool_call_id": "call_456"}
+      ],
       "runId": "some-run-id",
     }
     """
     try:
         outputs_list = [
             ToolOutput(
-                output=str(data["tool_outputs"]["output"]),
-                tool_call_id=data["tool_outputs"]["tool_call_id"]
+                output=str(tool_output["output"]),
+                tool_call_id=tool_output["tool_call_id"]
             )
+            for tool_output in data["tool_outputs"]
         ]
 
-
         stream_manager = client.beta.threads.runs.submit_tool_outputs_stream(
             thread_id=thread_id,
             run_id=data["runId"],
@@ -113,5 +337,28 @@ async def post_tool_outputs(client: AsyncOpenAI, data: Dict[str, Any], thread_id
         raise HTTPException(status_code=500, detail=str(e))
     
 
+async def cancel_run(client: AsyncOpenAI, thread_id: str, progress: RunProgress) -> None:
+    """
+    Cancels a run whose client went away, and logs an estimate of the completion
+    tokens saved.
+    """
+    if not progress.run_id:
+        logger.info(f"Abandoned stream on thread {thread_id} ended before a run was created")
+        return
+
+    try:
+        await client.beta.threads.runs.cancel(progress.run_id, thread_id=thread_id)
+    except Exception as e:
+        logger.error(f"Error cancelling run {progress.run_id}: {e}")
+        return
+
+    saved_tokens = completion_token_average.remaining(progress.streamed_tokens)
+    saved = f"~{saved_tokens}" if saved_tokens is not None else "an unknown number of"
+    logger.info(
+        f"Cancelled abandoned run {progress.run_id} on thread {thread_id} after ~{progress.streamed_tokens} "
+        f"streamed tokens, saving {saved} completion tokens"
+    )
+
+
 async def stream_file_content(content: bytes) -> AsyncIterable[bytes]:
     yield content
\ No newline at end of file
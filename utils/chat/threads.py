@@ -1,15 +1,71 @@
+import os
 import logging
-from openai import AsyncOpenAI
+from collections import OrderedDict
+from typing import Iterable, Optional
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, NotFoundError
 from openai.types.beta import Thread
+from openai.types.beta.thread_create_params import Message
+
+load_dotenv(override=True)
 
 logger = logging.getLogger("uvicorn.error")
 
-async def create_thread() -> str:
-    """Create a new assistant chat thread using OpenAI's API and return the thread ID."""
+# Owners of recently created or checked threads, so paging through a thread's
+# history does not retrieve the thread again for every page
+THREAD_OWNER_CACHE_MAX_ENTRIES = int(os.getenv("THREAD_OWNER_CACHE_MAX_ENTRIES") or "10000")
+
+_thread_owners: "OrderedDict[str, Optional[int]]" = OrderedDict()
+
+
+def remember_owner(thread_id: str, user_id: Optional[int]) -> None:
+    _thread_owners[thread_id] = user_id
+    _thread_owners.move_to_end(thread_id)
+    while len(_thread_owners) > THREAD_OWNER_CACHE_MAX_ENTRIES:
+        _thread_owners.popitem(last=False)
+
+
+async def create_thread(
+    openai_client: AsyncOpenAI,
+    messages: Optional[Iterable[Message]] = None,
+    user_id: Optional[int] = None
+) -> str:
+    """
+    Create a new assistant chat thread using OpenAI's API and return the thread ID.
+    Initial messages, if given, are added in the same request. The creating
+    user's ID is stored in the thread's metadata, so that only they can read it.
+    """
+    metadata = {"user_id": str(user_id)} if user_id is not None else {}
     try:
-        openai_client: AsyncOpenAI = AsyncOpenAI()
-        thread: Thread = await openai_client.beta.threads.create()
+        if messages is not None:
+            thread: Thread = await openai_client.beta.threads.create(messages=messages, metadata=metadata)
+        else:
+            thread = await openai_client.beta.threads.create(metadata=metadata)
+        remember_owner(thread.id, user_id)
         return thread.id
     except Exception as e:
         logger.error(f"Error creating assistant chat thread: {e}")
         return ""
+
+
+async def get_thread_owner(openai_client: AsyncOpenAI, thread_id: str) -> Optional[int]:
+    """
+    Returns the ID of the user who created a thread, or None if the thread does
+    not exist or was created without an owner.
+    """
+    if thread_id in _thread_owners:
+        _thread_owners.move_to_end(thread_id)
+        return _thread_owners[thread_id]
+    try:
+        thread: Thread = await openai_client.beta.threads.retrieve(thread_id)
+    except NotFoundError:
+        return None
+    owner = (thread.metadata or {}).get("user_id")
+    user_id = int(owner) if isinstance(owner, str) and owner.isdigit() else None
+    remember_owner(thread_id, user_id)
+    return user_id
+
+
+async def is_thread_owner(openai_client: AsyncOpenAI, thread_id: str, user_id: Optional[int]) -> bool:
+    """Returns True if user_id created the thread."""
+    return user_id is not None and await get_thread_owner(openai_client, thread_id) == user_id
@@ -0,0 +1,188 @@
+import os
+import time
+import html
+import json
+import asyncio
+import inspect
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type, TypeVar
+from dotenv import load_dotenv
+from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel, ValidationError
+from openai.types.beta.threads.required_action_function_tool_call import RequiredActionFunctionToolCall
+from utils.chat.metrics import TOOL_EXECUTION_SECONDS
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+# Jinja2 templates
+templates = Jinja2Templates(directory="templates")
+
+
+# --- Constants ---
+
+
+TOOL_THREAD_POOL_SIZE = int(os.getenv("TOOL_THREAD_POOL_SIZE") or "8")
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("DEFAULT_TOOL_TIMEOUT") or "30")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+# --- Helper Classes ---
+
+
+@dataclass
+class Tool:
+    """A function the assistant can call, with its argument schema, timeout and output widget."""
+    name: str
+    function: Callable[..., Any]
+    arguments: Type[BaseModel]
+    is_async: bool
+    timeout: float
+    template: Optional[str] = None
+
+
+@dataclass
+class ToolResult:
+    """The result of a tool call: HTML for the toolOutput event and the output submitted to the run."""
+    tool_name: str
+    output_html: str
+    output: str
+    ok: bool
+    # "ok", "unknown_tool", "invalid_arguments", "timeout" or "error"
+    outcome: str = "ok"
+
+
+class ToolRegistry:
+    """
+    Maps assistant function names to executors. Async tools are awaited on the
+    event loop; sync tools run in a dedicated thread pool so a slow or CPU-heavy
+    tool never stalls the other SSE streams served by the worker.
+    """
+
+    def __init__(self, max_workers: int = TOOL_THREAD_POOL_SIZE):
+        self._tools: Dict[str, Tool] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    def register(
+        self,
+        name: str,
+        arguments: Type[BaseModel],
+        template: Optional[str] = None,
+        timeout: float = DEFAULT_TOOL_TIMEOUT
+    ) -> Callable[[F], F]:
+        """
+        Decorator that registers a sync or async function as the executor for the
+        named tool. The function is called with the validated arguments as keyword
+        arguments. If a template is given, it is rendered with `output` and
+        `arguments` to produce the toolOutput widget.
+        """
+        def decorator(function: F) -> F:
+            self._tools[name] = Tool(
+                name=name,
+                function=function,
+                arguments=arguments,
+                is_async=inspect.iscoroutinefunction(function),
+                timeout=timeout,
+                template=template
+            )
+            return function
+        return decorator
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    async def _call(self, tool: Tool, arguments: BaseModel) -> Any:
+        kwargs = arguments.model_dump()
+        if tool.is_async:
+            return await tool.function(**kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(tool.function, **kwargs))
+
+    async def execute(self, tool_call: RequiredActionFunctionToolCall, render_html: bool = True) -> ToolResult:
+        """
+        Executes a function tool call requested by the assistant. Errors, including
+        unknown tools, invalid arguments and timeouts, are returned as the tool output
+        so the run can continue. The execution time is recorded by tool and outcome.
+        With render_html=False, the output widget is not rendered (output_html is empty).
+        """
+        start = time.perf_counter()
+        result = await self._execute(tool_call, render_html)
+        # Unknown names come from the model, so they share one label to bound the label set
+        tool_label = result.tool_name if result.outcome != "unknown_tool" else "unknown"
+        TOOL_EXECUTION_SECONDS.observe(time.perf_counter() - start, tool_label, result.outcome)
+        return result
+
+    async def execute_all(
+        self,
+        tool_calls: Sequence[RequiredActionFunctionToolCall],
+        render_html: bool = True
+    ) -> List[ToolResult]:
+        """
+        Executes the parallel tool calls of a run concurrently and returns one
+        result per call, in order, so all outputs can be submitted together. A
+        call that raises anyway gives an error result instead of dropping the
+        others' outputs and leaving the run waiting.
+        """
+        results = await asyncio.gather(
+            *(self.execute(tool_call, render_html) for tool_call in tool_calls), return_exceptions=True
+        )
+        tool_results: List[ToolResult] = []
+        for tool_call, result in zip(tool_calls, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                error_message = f"Failed to get {tool_call.function.name} output: {result}"
+                logger.error(error_message)
+                result = ToolResult(tool_call.function.name, html.escape(error_message), error_message, ok=False, outcome="error")
+            tool_results.append(result)
+        return tool_results
+
+    async def _execute(self, tool_call: RequiredActionFunctionToolCall, render_html: bool) -> ToolResult:
+        name = tool_call.function.name
+        tool = self.get(name)
+        if tool is None:
+            error_message = f"Unknown tool: {name}"
+            logger.error(error_message)
+            return ToolResult(name, html.escape(error_message), error_message, ok=False, outcome="unknown_tool")
+
+        try:
+            arguments = tool.arguments.model_validate(json.loads(tool_call.function.arguments or "{}"))
+        except (json.JSONDecodeError, ValidationError) as err:
+            error_message = f"Invalid arguments for {name}: {err}"
+            logger.error(error_message)
+            return ToolResult(name, html.escape(error_message), error_message, ok=False, outcome="invalid_arguments")
+
+        try:
+            # A timed-out sync tool keeps its worker thread until it returns, but no longer blocks the run
+            output = await asyncio.wait_for(self._call(tool, arguments), timeout=tool.timeout)
+        except asyncio.TimeoutError:
+            error_message = f"Tool {name} timed out after {tool.timeout:g} seconds"
+            logger.error(error_message)
+            return ToolResult(name, html.escape(error_message), error_message, ok=False, outcome="timeout")
+        except Exception as err:
+            error_message = f"Failed to get {name} output: {err}"
+            logger.error(error_message)
+            return ToolResult(name, html.escape(error_message), error_message, ok=False, outcome="error")
+
+        logger.info(f"{name} output: {output}")
+        try:
+            output_text = output if isinstance(output, str) else json.dumps(output, default=str)
+            if not render_html:
+                output_html = ""
+            elif tool.template:
+                output_html = templates.get_template(tool.template).render(output=output, arguments=arguments)
+            else:
+                output_html = f"<pre>{html.escape(output_text)}</pre>"
+        except Exception as err:
+            error_message = f"Failed to render {name} output: {err}"
+            logger.error(error_message)
+            return ToolResult(name, html.escape(error_message), error_message, ok=False, outcome="error")
+        return ToolResult(name, output_html, output_text, ok=True)
+
+
+tool_registry = ToolRegistry()
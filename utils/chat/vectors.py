@@ -0,0 +1,210 @@
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple, cast
+import numpy as np
+import numpy.typing as npt
+from dotenv import load_dotenv
+from sqlmodel import Session, select
+from utils.chat.models import Embedding
+
+load_dotenv(override=True)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# --- Constants ---
+
+
+# Rows fetched per round trip when loading embeddings from the database
+VECTOR_LOAD_BATCH_SIZE = int(os.getenv("VECTOR_LOAD_BATCH_SIZE") or "5000")
+# Upper bound on the query-by-row score block computed at once, in float32 elements
+# (16M elements is 64 MiB); larger query batches are scored in chunks
+VECTOR_SEARCH_MAX_BLOCK = int(os.getenv("VECTOR_SEARCH_MAX_BLOCK") or str(1 << 24))
+# Rows converted to float32 at a time when scoring a float16 matrix
+VECTOR_SEARCH_ROW_BLOCK = 1 << 16
+
+
+# --- Helper Functions ---
+
+
+def normalize_rows(vectors: npt.ArrayLike) -> npt.NDArray[np.float32]:
+    """
+    Returns the vectors as a C-contiguous float32 matrix with unit-length rows,
+    so that cosine similarity is a dot product. Zero rows are left as zeros.
+    """
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2, order="C")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+    return matrix
+
+
+def top_k_rows(scores: npt.NDArray[np.float32], k: int) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.float32]]:
+    """
+    Returns the column indices and values of the k highest scores in each row of
+    a score matrix, best first. A partial sort (argpartition) finds each row's
+    top k in linear time, and only those k are sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.intp), empty.astype(np.float32)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+# --- Helper Classes ---
+
+
+class VectorIndex:
+    """
+    Exact cosine similarity search over the embeddings of one embedding model.
+
+    The embeddings are held in a contiguous float32 matrix with one unit-length
+    row per content node, so a batch of queries is scored against the whole
+    corpus with a single matrix product, and the top k of each query are found
+    with a partial sort. Queries are normalized the same way, so scores are
+    cosine similarities in [-1, 1].
+
+    An index can also wrap a matrix that is already normalized, such as a
+    memory-mapped float32 or float16 embedding store, without copying it.
+    """
+
+    def __init__(self, model_name: str, node_ids: Sequence[str], vectors: npt.ArrayLike):
+        self.model_name: str = model_name
+        self.matrix: npt.NDArray[np.floating] = normalize_rows(vectors) if len(node_ids) else np.zeros((0, 0), np.float32)
+        if self.matrix.shape[0] != len(node_ids):
+            raise ValueError(f"Got {len(node_ids)} node IDs for {self.matrix.shape[0]} vectors")
+        self.node_ids: npt.NDArray[np.str_ | np.bytes_] = np.asarray(node_ids, dtype=np.str_)
+        self._rows: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_normalized(
+        cls,
+        model_name: str,
+        node_ids: npt.NDArray[np.str_ | np.bytes_],
+        matrix: npt.NDArray[np.floating]
+    ) -> "VectorIndex":
+        """
+        Wraps a matrix whose rows are already unit-length, and an array of node IDs
+        (str or UTF-8 bytes), without copying either.
+        """
+        if matrix.ndim != 2 or matrix.shape[0] != node_ids.shape[0]:
+            raise ValueError(f"Got {node_ids.shape[0]} node IDs for a matrix of shape {matrix.shape}")
+        index = cls.__new__(cls)
+        index.model_name = model_name
+        index.matrix = matrix
+        index.node_ids = node_ids
+        index._rows = None
+        return index
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dimensions(self) -> int:
+        return self.matrix.shape[1]
+
+    @classmethod
+    def load(cls, session: Session, model_name: str, batch_size: int = VECTOR_LOAD_BATCH_SIZE) -> "VectorIndex":
+        """
+        Loads the embeddings of model_name from the Embedding table. If a node has
+        several embeddings from the model, the most recent one is used. Vectors
+        whose length differs from the first vector's are skipped with a warning.
+        """
+        start = time.perf_counter()
+        rows: Dict[str, int] = {}
+        vectors: List[npt.NDArray[np.float32]] = []
+        dimensions: Optional[int] = None
+        skipped = 0
+        statement = (
+            select(Embedding.node_id, Embedding.embedding_vector)
+            .where(Embedding.model_name == model_name)
+            .order_by(Embedding.created_at)  # type: ignore[arg-type]
+            .execution_options(yield_per=batch_size)
+        )
+        for node_id, embedding_vector in session.exec(statement):
+            vector = np.asarray(embedding_vector, dtype=np.float32)
+            if dimensions is None:
+                dimensions = vector.shape[0]
+            if vector.shape != (dimensions,):
+                skipped += 1
+                continue
+            if node_id in rows:
+                vectors[rows[node_id]] = vector
+            else:
+                rows[node_id] = len(vectors)
+                vectors.append(vector)
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} {model_name} embeddings whose length is not {dimensions}")
+        index = cls(model_name, list(rows), np.stack(vectors) if vectors else np.zeros((0, 0), np.float32))
+        logger.info(
+            f"Loaded {len(index)} {model_name} embeddings ({index.matrix.nbytes / 2**20:.1f} MiB) "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return index
+
+    def rows(self, node_ids: Sequence[str]) -> npt.NDArray[np.intp]:
+        """Returns the matrix row of each node ID, or -1 for nodes without an embedding."""
+        if self._rows is None:
+            node_ids_array = self.node_ids
+            if node_ids_array.dtype.kind == "S":
+                node_ids_array = np.char.decode(cast(npt.NDArray[np.bytes_], node_ids_array), "utf-8")
+            self._rows = {node_id: row for row, node_id in enumerate(node_ids_array.tolist())}
+        return np.fromiter((self._rows.get(node_id, -1) for node_id in node_ids), dtype=np.intp, count=len(node_ids))
+
+    def _scores(self, queries: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+        """Scores normalized queries against every row, converting a float16 matrix a block of rows at a time."""
+        if self.matrix.dtype == np.float32:
+            return queries @ self.matrix.T
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for begin in range(0, len(self), VECTOR_SEARCH_ROW_BLOCK):
+            end = begin + VECTOR_SEARCH_ROW_BLOCK
+            scores[:, begin:end] = queries @ self.matrix[begin:end].astype(np.float32).T
+        return scores
+
+    def search_rows(
+        self,
+        queries: npt.ArrayLike,
+        k: int = 10,
+        max_block: int = VECTOR_SEARCH_MAX_BLOCK
+    ) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.float32]]:
+        """
+        Returns the matrix rows of the k nearest embeddings to each query and
+        their cosine similarities, as (queries x k) arrays, best first.
+        """
+        query_matrix = normalize_rows(queries)
+        if not len(self):
+            return top_k_rows(np.empty((query_matrix.shape[0], 0), np.float32), k)
+        if query_matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Queries have {query_matrix.shape[1]} dimensions; {self.model_name} has {self.dimensions}")
+        k = min(k, len(self))
+        rows = np.empty((query_matrix.shape[0], k), dtype=np.intp)
+        scores = np.empty((query_matrix.shape[0], k), dtype=np.float32)
+        block = max(1, max_block // max(len(self), 1))
+        for begin in range(0, query_matrix.shape[0], block):
+            end = begin + block
+            rows[begin:end], scores[begin:end] = top_k_rows(self._scores(query_matrix[begin:end]), k)
+        return rows, scores
+
+    def search_many(self, queries: npt.ArrayLike, k: int = 10) -> List[List[Tuple[str, float]]]:
+        """Returns the (node ID, cosine similarity) of the k nearest nodes to each query, best first."""
+        rows, scores = self.search_rows(queries, k)
+        results = []
+        for query_rows, query_scores in zip(rows, scores):
+            node_ids = self.node_ids[query_rows]
+            if node_ids.dtype.kind == "S":
+                node_ids = np.char.decode(node_ids, "utf-8")
+            results.append(list(zip(node_ids.tolist(), query_scores.tolist())))
+        return results
+
+    def search(self, query: npt.ArrayLike, k: int = 10) -> List[Tuple[str, float]]:
+        """Returns the (node ID, cosine similarity) of the k nearest nodes to a query vector, best first."""
+        return self.search_many(np.asarray(query, dtype=np.float32).reshape(1, -1), k)[0]
@@ -0,0 +1,195 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# --- Constants ---
+
+
+# Latency buckets in seconds, from 5 ms to 2 minutes
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- Helper Functions ---
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# --- Helper Classes ---
+
+
+class Metric(ABC):
+    """Base class for metrics rendered in the Prometheus text exposition format."""
+    type: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """Return the sample lines for this metric, without the HELP and TYPE header."""
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def collect(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labelnames, labelvalues)} {format_value(value)}"
+            for labelvalues, value in sorted(self._values.items())
+        ]
+
+
+class CallbackMetric(Metric):
+    """
+    A gauge or counter whose samples are read from a callback when the metrics
+    are rendered, for values that are already tracked elsewhere.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+        labelnames: Sequence[str] = (),
+        type: str = "gauge"
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self._callback = callback
+
+    def collect(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labelnames, labelvalues)} {format_value(value)}"
+            for labelvalues, value in self._callback()
+        ]
+
+
+class Histogram(Metric):
+    """
+    Cumulative histogram with fixed bucket bounds. Observing a value costs a
+    binary search and two additions, so it is cheap enough to call once per run
+    or tool call; per-delta code should aggregate first and observe once.
+    Observations must be made from the event loop thread.
+    """
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Per label set: counts per bucket (the last one is +Inf), and the sum of observed values
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        counts = self._counts.get(labelvalues)
+        if counts is None:
+            counts = self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+            self._sums[labelvalues] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labelvalues] += value
+
+    def count(self, *labelvalues: str) -> int:
+        return sum(self._counts.get(labelvalues, ()))
+
+    def collect(self) -> List[str]:
+        lines: List[str] = []
+        for labelvalues, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                bucket_labels = format_labels(self.labelnames, labelvalues, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {format_value(self._sums[labelvalues])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collects metrics and renders them for a Prometheus-style /metrics endpoint."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+        labelnames: Sequence[str] = (),
+        type: str = "gauge"
+    ) -> CallbackMetric:
+        metric = CallbackMetric(name, documentation, callback, labelnames, type)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()